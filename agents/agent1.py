@@ -1,8 +1,31 @@
+import asyncio
+import time
 import google.generativeai as genai
 from core.vector_db import VectorDatabase
-from core.config import GEMINI_API_KEY_AGENT1
+from core.config import (
+    GEMINI_API_KEY_AGENT1, DEEPSEEK_API_KEY, LLM_HEDGING_ENABLED, GEMINI_CONTEXT_CACHE,
+    GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS
+)
 from datetime import datetime
-from core.model_helper import get_gemini_model, get_response_text, generate_content_with_retry
+from core.model_helper import (
+    get_task_model,
+    get_response_text,
+    generate_content_with_retry,
+    generate_content_async,
+    get_hedge_partner,
+    generate_content_hedged,
+    generate_content_hedged_async,
+    is_context_cacheable,
+    with_cached_prefix_extension,
+    call_label
+)
+from core.prompts import AGENT_ANSWER, STORE_SUMMARY
+from core.deadline import Deadline, deadline_scope
+from core.context_budget import build_schedule_context
+from core.task_profiles import get_task_profile
+
+# Answer format shown to the model (part of the stable prompt prefix)
+FORMAT_EXAMPLE = "User 1 is free before 9:30 AM, from 12:00 PM to 12:30 PM, and after 1:00 PM"
 
 class Agent1:
     """Agent for managing User 1's daily routine and schedule"""
@@ -10,8 +33,13 @@ class Agent1:
     def __init__(self, api_key=None):
         # Use provided API key or default to AGENT1 key (same as orchestrator)
         api_key = api_key or GEMINI_API_KEY_AGENT1
-        # Initialize Gemini with best available model
-        self.model = get_gemini_model(api_key)
+        self.api_key = api_key
+        # Initialize Gemini with the answer profile's model (summaries use the fast tier)
+        self.model = get_task_model("answer", api_key)
+        # Optionally hedge slow Gemini calls with DeepSeek
+        self.hedge_partner = get_hedge_partner("deepseek", DEEPSEEK_API_KEY) if LLM_HEDGING_ENABLED else None
+        # Whole-schedule block of the prompt prefix (None = rebuild on next query)
+        self._schedule_block = None
         
         # Initialize vector database
         self.vector_db = VectorDatabase(agent_name="agent1")
@@ -43,14 +71,12 @@ class Agent1:
             metadata['timestamp'] = datetime.now().isoformat()
         
         doc_id = self.vector_db.add_data(schedule_data, metadata)
+        self._schedule_block = None
         
-        prompt = f"""Summarize this schedule/routine information and store it:
-        
-        {schedule_data}
+        prompt = STORE_SUMMARY.render(schedule_data=schedule_data)
         
-        Provide a brief confirmation that the information has been stored."""
-        
-        response = generate_content_with_retry(self.model, prompt)
+        with call_label("agent1.store"):
+            response = generate_content_with_retry(get_task_model("summarize", self.api_key), prompt)
         response_text = get_response_text(response)
         
         return {
@@ -99,83 +125,43 @@ class Agent1:
         
         return result
     
-    def query_schedule(self, query: str):
-        """Query the schedule database using natural language"""
-        try:
-            search_results = self.vector_db.search(query, n_results=3)
-        except Exception as e:
-            print(f"Error searching vector database: {str(e)}")
-            search_results = {'documents': [[]], 'metadatas': [[]], 'ids': [[]]}
+    def query_schedule(self, query: str, deadline: Deadline = None):
+        """Query the schedule database using natural language (within the request deadline, if given)"""
+        search_results = self._search(query, deadline)
+        prompt = self._build_prompt(query, search_results)
         
-        context = ""
         try:
-            if search_results.get('documents') and len(search_results['documents']) > 0 and len(search_results['documents'][0]) > 0:
-                context = "\n\nRelevant schedule information:\n"
-                for i, doc in enumerate(search_results['documents'][0]):
-                    metadata = search_results.get('metadatas', [[]])[0][i] if search_results.get('metadatas') and len(search_results['metadatas']) > 0 and i < len(search_results['metadatas'][0]) else {}
-                    context += f"- {doc}\n"
-                    if metadata:
-                        context += f"  Metadata: {metadata}\n"
-            else:
-                context = "\n\nNo relevant schedule information found in the database."
+            with call_label("agent1.query"), deadline_scope(deadline):
+                response_text = self._generate(prompt)
+            response_text = self._finalize_response(response_text)
         except Exception as e:
-            print(f"Error processing search results: {str(e)}")
-            context = "\n\nNo relevant schedule information found in the database."
+            print(f"Error generating response from Gemini API: {str(e)}")
+            response_text = self._fallback_response(query, search_results, e)
         
-        # Conversational, precise prompt - no markdown formatting
-        prompt = f"""You are managing User 1's schedule. Answer this query naturally and precisely.
-
-Query: {query}
-
-{context}
-
-Provide a clear, helpful answer with specific details (times, days, activities) when available. Be conversational and friendly. If information is missing, say so clearly.
-
-IMPORTANT: 
-- Do NOT use markdown formatting (no asterisks *, no bold **, no bullet points •)
-- Write in plain text only
-- Use simple sentences and commas to separate items
-- Format: "User 1 is free before 9:30 AM, from 12:00 PM to 12:30 PM, and after 1:00 PM"."""
+        return {
+            "query": query,
+            "response": response_text,
+            "relevant_data": search_results
+        }
+    
+    async def query_schedule_async(self, query: str, deadline: Deadline = None, search_results: dict = None):
+        """
+        Async variant of query_schedule (the vector search runs in a worker thread)
+        
+        search_results can be passed in when the orchestrator already searched
+        (speculatively, while routing the query).
+        """
+        if search_results is None:
+            search_results = await asyncio.to_thread(self._search, query, deadline)
+        prompt = self._build_prompt(query, search_results)
         
         try:
-            # Try with more retries and better delays
-            response = generate_content_with_retry(self.model, prompt, max_retries=3, base_delay=1.0)
-            response_text = get_response_text(response)
-            
-            # Clean markdown formatting from response
-            response_text = self._clean_markdown(response_text)
-            
-            if not response_text or response_text.strip() == "":
-                response_text = "I couldn't generate a response. Please try again or check your API configuration."
+            with call_label("agent1.query"), deadline_scope(deadline):
+                response_text = await self._generate_async(prompt)
+            response_text = self._finalize_response(response_text)
         except Exception as e:
-            error_msg = str(e).lower()
             print(f"Error generating response from Gemini API: {str(e)}")
-            
-            # If we have context from vector DB, generate a useful answer from it
-            if context and "Relevant schedule information" in context:
-                # Extract schedule data and format it nicely
-                schedule_lines = []
-                if search_results.get('documents') and len(search_results['documents']) > 0:
-                    for i, doc in enumerate(search_results['documents'][0][:3]):  # Use first 3 results
-                        schedule_lines.append(f"• {doc}")
-                
-                if schedule_lines:
-                    # Generate a simple, useful answer from the data
-                    response_text = f"Based on User 1's schedule:\n\n" + "\n".join(schedule_lines)
-                    
-                    # Add a note about the query if relevant
-                    if "free" in query.lower() or "available" in query.lower():
-                        response_text += "\n\nThis shows the scheduled activities. Free time would be between these activities."
-                    elif "when" in query.lower() or "time" in query.lower():
-                        response_text += "\n\nThese are the scheduled times found in the database."
-                else:
-                    response_text = f"Based on the available schedule information for User 1, I found relevant data for your query: '{query}'. The schedule data is available, but I'm having trouble processing it right now. Please try again in a moment."
-            else:
-                # No context found
-                if "rate limit" in error_msg or "quota" in error_msg or "429" in error_msg:
-                    response_text = f"I couldn't find specific schedule information for '{query}' in User 1's schedule. Please try again in a moment or add more schedule data."
-                else:
-                    response_text = f"I couldn't find any relevant schedule information for your query: '{query}'. Please add schedule information or try a different query."
+            response_text = self._fallback_response(query, search_results, e)
         
         return {
             "query": query,
@@ -183,6 +169,132 @@ IMPORTANT:
             "relevant_data": search_results
         }
     
+    def _generate(self, prompt: str):
+        """Generate an answer with Gemini (hedged with DeepSeek when enabled) and return its text"""
+        if self.hedge_partner is not None:
+            response_text, _ = generate_content_hedged(self.model, self.hedge_partner, prompt, max_retries=3, base_delay=1.0, task="answer")
+            return response_text
+        # Serve the stable prefix (with the whole schedule) from Gemini cached content when it is big enough
+        model, prompt = with_cached_prefix_extension(self.model, prompt, self._prompt_prefix(), self._cached_schedule_prefix(), self.api_key)
+        # Try with more retries and better delays
+        response = generate_content_with_retry(model, prompt, max_retries=3, base_delay=1.0)
+        return get_response_text(response)
+    
+    async def _generate_async(self, prompt: str):
+        """Async variant of _generate"""
+        if self.hedge_partner is not None:
+            response_text, _ = await generate_content_hedged_async(self.model, self.hedge_partner, prompt, max_retries=3, base_delay=1.0, task="answer")
+            return response_text
+        model, prompt = await asyncio.to_thread(with_cached_prefix_extension, self.model, prompt, self._prompt_prefix(), self._cached_schedule_prefix(), self.api_key)
+        response = await generate_content_async(model, prompt, max_retries=3, base_delay=1.0)
+        return get_response_text(response)
+    
+    def search_schedule(self, query: str, deadline: Deadline = None):
+        """Vector search for a query, as used by query_schedule (empty results on error)"""
+        return self._search(query, deadline)
+    
+    def _search(self, query: str, deadline: Deadline = None):
+        """Search the vector database for schedule entries relevant to a query"""
+        try:
+            return self.vector_db.search(query, n_results=3, deadline=deadline)
+        except Exception as e:
+            print(f"Error searching vector database: {str(e)}")
+            return {'documents': [[]], 'metadatas': [[]], 'ids': [[]]}
+    
+    def _build_prompt(self, query: str, search_results: dict):
+        """Build the LLM prompt for a query from the search results"""
+        # Compact timeline of the results, most relevant entries first up to the answer budget
+        context = ""
+        try:
+            timeline = build_schedule_context(search_results, get_task_profile("answer").context_tokens)
+            if timeline:
+                context = "Relevant schedule information:\n" + timeline
+        except Exception as e:
+            print(f"Error processing search results: {str(e)}")
+        if not context:
+            context = "No relevant schedule information found in the database."
+        
+        # Conversational, precise prompt - no markdown formatting; instructions first, query last
+        return AGENT_ANSWER.render(**self._prefix_values(), context=context.strip(), query=query)
+    
+    def _prefix_values(self, full_schedule: str = ""):
+        """Values of the stable prompt prefix"""
+        return {"user": "User 1", "format_example": FORMAT_EXAMPLE, "full_schedule": full_schedule}
+    
+    def _prompt_prefix(self):
+        """Stable prefix shared by every query prompt"""
+        return AGENT_ANSWER.prefix_text(**self._prefix_values())
+    
+    def _cached_schedule_prefix(self):
+        """Prefix with User 1's whole schedule, to be sent only as Gemini cached content ("" = none)"""
+        block = self._full_schedule_block()
+        return AGENT_ANSWER.prefix_text(**self._prefix_values(block)) if block else ""
+    
+    def _full_schedule_block(self):
+        """
+        User 1's whole schedule for the prompt prefix
+        
+        Only built when it is big enough to be stored as Gemini cached content
+        (and calls are not hedged with DeepSeek, which needs the full prompt),
+        and only sent when that cached content exists. The block is rebuilt
+        after this agent's own writes, and otherwise at most once per
+        GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS to pick up writes from other
+        processes (e.g. the populate scripts), so queries don't scan the DB.
+        """
+        if self.hedge_partner is not None or not GEMINI_CONTEXT_CACHE:
+            return ""
+        if self._schedule_block is not None and time.monotonic() < self._schedule_block[0]:
+            return self._schedule_block[1]
+        try:
+            documents = self.vector_db.get_all().get('documents') or []
+        except Exception as e:
+            print(f"Error loading User 1's schedule for the prompt prefix: {str(e)}")
+            return ""
+        schedule = "\n".join(f"- {doc}" for doc in documents)
+        block = f"\n\nComplete schedule of User 1:\n{schedule}" if is_context_cacheable(schedule) else ""
+        self._schedule_block = (time.monotonic() + GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS, block)
+        return block
+    
+    def _finalize_response(self, response_text: str):
+        """Clean markdown formatting from an LLM answer"""
+        response_text = self._clean_markdown(response_text)
+        
+        if not response_text or response_text.strip() == "":
+            response_text = "I couldn't generate a response. Please try again or check your API configuration."
+        return response_text
+    
+    def _fallback_response(self, query: str, search_results: dict, error: Exception):
+        """Answer from the raw search results when the LLM call fails"""
+        error_msg = str(error).lower()
+        has_context = bool(search_results.get('documents') and search_results['documents'][0])
+        
+        # If we have context from vector DB, generate a useful answer from it
+        if has_context:
+            # Extract schedule data and format it nicely
+            schedule_lines = []
+            if search_results.get('documents') and len(search_results['documents']) > 0:
+                for i, doc in enumerate(search_results['documents'][0][:3]):  # Use first 3 results
+                    schedule_lines.append(f"• {doc}")
+            
+            if schedule_lines:
+                # Generate a simple, useful answer from the data
+                response_text = f"Based on User 1's schedule:\n\n" + "\n".join(schedule_lines)
+                
+                # Add a note about the query if relevant
+                if "free" in query.lower() or "available" in query.lower():
+                    response_text += "\n\nThis shows the scheduled activities. Free time would be between these activities."
+                elif "when" in query.lower() or "time" in query.lower():
+                    response_text += "\n\nThese are the scheduled times found in the database."
+            else:
+                response_text = f"Based on the available schedule information for User 1, I found relevant data for your query: '{query}'. The schedule data is available, but I'm having trouble processing it right now. Please try again in a moment."
+        else:
+            # No context found
+            if "rate limit" in error_msg or "quota" in error_msg or "429" in error_msg:
+                response_text = f"I couldn't find specific schedule information for '{query}' in User 1's schedule. Please try again in a moment or add more schedule data."
+            else:
+                response_text = f"I couldn't find any relevant schedule information for your query: '{query}'. Please add schedule information or try a different query."
+        return response_text
+    
     def get_all_schedules(self):
         """Get all stored schedules"""
         return self.vector_db.get_all()
@@ -190,6 +302,7 @@ IMPORTANT:
     def delete_schedule(self, doc_id: str):
         """Delete a schedule entry"""
         self.vector_db.delete(doc_id)
+        self._schedule_block = None
         return {"message": f"Schedule entry {doc_id} deleted successfully"}
     
     def get_schedules_for_comparison(self):
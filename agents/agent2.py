@@ -1,14 +1,37 @@
+import asyncio
+import time
 from core.vector_db import VectorDatabase
-from core.config import DEEPSEEK_API_KEY, GEMINI_API_KEY_AGENT2
+from core.config import (
+    DEEPSEEK_API_KEY, GEMINI_API_KEY, GEMINI_API_KEY_AGENT2, LLM_HEDGING_ENABLED, GEMINI_CONTEXT_CACHE,
+    GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS
+)
 from datetime import datetime
 from core.model_helper import (
     get_deepseek_model, 
+    get_async_deepseek_model,
     get_deepseek_response_text, 
     generate_content_with_deepseek,
-    get_gemini_model,
+    generate_content_with_deepseek_async,
+    get_task_model,
     get_response_text,
-    generate_content_with_retry
+    generate_content_with_retry,
+    generate_content_async,
+    get_hedge_partner,
+    generate_content_hedged,
+    generate_content_hedged_async,
+    is_provider_available,
+    is_context_cacheable,
+    with_cached_prefix_extension,
+    call_label
 )
+from core.circuit_breaker import CircuitOpenError
+from core.prompts import AGENT_ANSWER, STORE_SUMMARY
+from core.deadline import Deadline, deadline_scope
+from core.context_budget import build_schedule_context
+from core.task_profiles import get_task_profile
+
+# Answer format shown to the model (part of the stable prompt prefix)
+FORMAT_EXAMPLE = "User 2 is free before 11:00 AM, from 1:00 PM to 2:30 PM, and after 9:00 PM"
 
 class Agent2:
     """Agent for managing User 2's daily routine and schedule"""
@@ -21,20 +44,29 @@ class Agent2:
             try:
                 # Try to initialize DeepSeek
                 self.client = get_deepseek_model(DEEPSEEK_API_KEY)
+                self.async_client = get_async_deepseek_model(DEEPSEEK_API_KEY)
                 self.use_deepseek = True
+                self.gemini_api_key = GEMINI_API_KEY_AGENT2 or GEMINI_API_KEY
                 print("Agent 2: Using DeepSeek API")
             except Exception as e:
                 print(f"Agent 2: DeepSeek initialization failed: {e}, falling back to Gemini")
                 self.use_deepseek = False
                 # Fallback to Gemini
-                api_key = api_key or GEMINI_API_KEY_AGENT2
-                self.model = get_gemini_model(api_key)
+                self.gemini_api_key = api_key or GEMINI_API_KEY_AGENT2
+                self.model = get_task_model("answer", self.gemini_api_key)
         else:
             # Use Gemini as fallback
-            api_key = api_key or GEMINI_API_KEY_AGENT2
-            self.model = get_gemini_model(api_key)
+            self.gemini_api_key = api_key or GEMINI_API_KEY_AGENT2
+            self.model = get_task_model("answer", self.gemini_api_key)
             print("Agent 2: Using Gemini API (DeepSeek key not provided)")
         
+        # Optionally hedge slow DeepSeek calls with Gemini
+        self.hedge_partner = None
+        if LLM_HEDGING_ENABLED and self.use_deepseek:
+            self.hedge_partner = get_hedge_partner("gemini", GEMINI_API_KEY_AGENT2 or GEMINI_API_KEY)
+        # Whole-schedule block of the prompt prefix (None = rebuild on next query)
+        self._schedule_block = None
+        
         # Initialize vector database (separate from Agent1)
         self.vector_db = VectorDatabase(agent_name="agent2")
         
@@ -75,16 +107,13 @@ class Agent2:
         
         # Store in vector database
         doc_id = self.vector_db.add_data(schedule_data, metadata)
+        self._schedule_block = None
         
-        # Generate a summary using Gemini
-        prompt = f"""Summarize this schedule/routine information and store it:
-        
-        {schedule_data}
-        
-        Provide a brief confirmation that the information has been stored."""
+        # Generate a summary with the fast summarize profile
+        prompt = STORE_SUMMARY.render(schedule_data=schedule_data)
         
-        response = generate_content_with_retry(self.model, prompt)
-        response_text = get_response_text(response)
+        with call_label("agent2.store"):
+            response_text = self._generate(prompt, task="summarize")
         
         return {
             "doc_id": doc_id,
@@ -132,103 +161,226 @@ class Agent2:
         
         return result
     
-    def query_schedule(self, query: str):
+    def query_schedule(self, query: str, deadline: Deadline = None):
         """
         Query the schedule database using natural language
         
         Args:
             query: Natural language query about the schedule
+            deadline: Optional request deadline; retries stop once it is spent
             
         Returns:
             Response from the agent with relevant schedule information
         """
+        search_results = self._search(query, deadline)
+        prompt = self._build_prompt(query, search_results)
+        
+        try:
+            # Use DeepSeek or Gemini based on initialization
+            with call_label("agent2.query"), deadline_scope(deadline):
+                response_text = self._generate(prompt)
+            response_text = self._finalize_response(response_text)
+        except Exception as e:
+            print(f"Error generating response from Gemini API: {str(e)}")
+            response_text = self._fallback_response(query, search_results, e)
+        
+        return {
+            "query": query,
+            "response": response_text,
+            "relevant_data": search_results
+        }
+    
+    async def query_schedule_async(self, query: str, deadline: Deadline = None, search_results: dict = None):
+        """
+        Async variant of query_schedule (the vector search runs in a worker thread)
+        
+        search_results can be passed in when the orchestrator already searched
+        (speculatively, while routing the query).
+        """
+        if search_results is None:
+            search_results = await asyncio.to_thread(self._search, query, deadline)
+        prompt = self._build_prompt(query, search_results)
+        
+        try:
+            with call_label("agent2.query"), deadline_scope(deadline):
+                response_text = await self._generate_async(prompt)
+            response_text = self._finalize_response(response_text)
+        except Exception as e:
+            print(f"Error generating response from Gemini API: {str(e)}")
+            response_text = self._fallback_response(query, search_results, e)
+        
+        return {
+            "query": query,
+            "response": response_text,
+            "relevant_data": search_results
+        }
+    
+    def _generate(self, prompt: str, task: str = "answer"):
+        """
+        Generate text for a task profile ("answer" or "summarize") and return it
+        
+        Uses DeepSeek when configured, switching straight to Gemini while the
+        DeepSeek circuit breaker rejects calls (CircuitOpenError leads to the
+        deterministic fallback answer only when no Gemini key is configured).
+        """
+        if self._deepseek_available():
+            try:
+                if self.hedge_partner is not None:
+                    response_text, _ = generate_content_hedged(self.async_client, self.hedge_partner, prompt, max_retries=3, base_delay=1.0, task=task)
+                    return response_text
+                response = generate_content_with_deepseek(self.client, prompt, max_retries=3, base_delay=1.0, task=task)
+                return get_deepseek_response_text(response)
+            except CircuitOpenError:
+                # Another call took the half-open probe - fail over to Gemini
+                pass
+        model = self._gemini_model(task)
+        if task == "answer":
+            # Serve the stable prefix (with the whole schedule) from Gemini cached content when it is big enough
+            model, prompt = with_cached_prefix_extension(model, prompt, self._prompt_prefix(), self._cached_schedule_prefix(), self.gemini_api_key)
+        response = generate_content_with_retry(model, prompt, max_retries=3, base_delay=1.0)
+        return get_response_text(response)
+    
+    async def _generate_async(self, prompt: str, task: str = "answer"):
+        """Async variant of _generate"""
+        if self._deepseek_available():
+            try:
+                if self.hedge_partner is not None:
+                    response_text, _ = await generate_content_hedged_async(self.async_client, self.hedge_partner, prompt, max_retries=3, base_delay=1.0, task=task)
+                    return response_text
+                response = await generate_content_with_deepseek_async(self.async_client, prompt, max_retries=3, base_delay=1.0, task=task)
+                return get_deepseek_response_text(response)
+            except CircuitOpenError:
+                pass
+        model = self._gemini_model(task)
+        if task == "answer":
+            model, prompt = await asyncio.to_thread(with_cached_prefix_extension, model, prompt, self._prompt_prefix(), self._cached_schedule_prefix(), self.gemini_api_key)
+        response = await generate_content_async(model, prompt, max_retries=3, base_delay=1.0)
+        return get_response_text(response)
+    
+    def _deepseek_available(self):
+        """DeepSeek is configured and its circuit breaker would let a call through"""
+        return self.use_deepseek and is_provider_available("deepseek")
+    
+    def _gemini_model(self, task: str = "answer"):
+        """Gemini model of Agent 2 for a task profile (created on first use when DeepSeek is the primary provider)"""
+        if task == "answer":
+            if getattr(self, 'model', None) is None:
+                self.model = self._task_model(task)
+            return self.model
+        return self._task_model(task)
+    
+    def _task_model(self, task: str):
+        if self.use_deepseek and (not self.gemini_api_key or self.gemini_api_key == "your_gemini_api_key_here"):
+            raise CircuitOpenError("deepseek circuit is open and no Gemini fallback key is configured")
+        return get_task_model(task, self.gemini_api_key)
+    
+    def search_schedule(self, query: str, deadline: Deadline = None):
+        """Vector search for a query, as used by query_schedule (empty results on error)"""
+        return self._search(query, deadline)
+    
+    def _search(self, query: str, deadline: Deadline = None):
+        """Search the vector database for schedule entries relevant to a query"""
         try:
             # Search vector database
-            search_results = self.vector_db.search(query, n_results=5)
+            return self.vector_db.search(query, n_results=5, deadline=deadline)
         except Exception as e:
             print(f"Error searching vector database: {str(e)}")
-            search_results = {'documents': [[]], 'metadatas': [[]], 'ids': [[]]}
-        
-        # Prepare context from search results
+            return {'documents': [[]], 'metadatas': [[]], 'ids': [[]]}
+    
+    def _build_prompt(self, query: str, search_results: dict):
+        """Build the LLM prompt for a query from the search results"""
+        # Compact timeline of the results, most relevant entries first up to the answer budget
         context = ""
         try:
-            if search_results.get('documents') and len(search_results['documents']) > 0 and len(search_results['documents'][0]) > 0:
-                context = "\n\nRelevant schedule information:\n"
-                for i, doc in enumerate(search_results['documents'][0]):
-                    metadata = search_results.get('metadatas', [[]])[0][i] if search_results.get('metadatas') and len(search_results['metadatas']) > 0 and i < len(search_results['metadatas'][0]) else {}
-                    context += f"- {doc}\n"
-                    if metadata:
-                        context += f"  Metadata: {metadata}\n"
-            else:
-                context = "\n\nNo relevant schedule information found in the database."
+            timeline = build_schedule_context(search_results, get_task_profile("answer").context_tokens)
+            if timeline:
+                context = "Relevant schedule information:\n" + timeline
         except Exception as e:
             print(f"Error processing search results: {str(e)}")
-            context = "\n\nNo relevant schedule information found in the database."
+        if not context:
+            context = "No relevant schedule information found in the database."
         
-        # Conversational, precise prompt - no markdown formatting
-        prompt = f"""You are managing User 2's schedule. Answer this query naturally and precisely.
-
-Query: {query}
-
-{context}
-
-Provide a clear, helpful answer with specific details (times, days, activities) when available. Be conversational and friendly. If information is missing, say so clearly.
-
-IMPORTANT: 
-- Do NOT use markdown formatting (no asterisks *, no bold **, no bullet points •)
-- Write in plain text only
-- Use simple sentences and commas to separate items
-- Format: "User 2 is free before 11:00 AM, from 1:00 PM to 2:30 PM, and after 9:00 PM"."""
+        # Conversational, precise prompt - no markdown formatting; instructions first, query last
+        return AGENT_ANSWER.render(**self._prefix_values(), context=context.strip(), query=query)
+    
+    def _prefix_values(self, full_schedule: str = ""):
+        """Values of the stable prompt prefix"""
+        return {"user": "User 2", "format_example": FORMAT_EXAMPLE, "full_schedule": full_schedule}
+    
+    def _prompt_prefix(self):
+        """Stable prefix shared by every query prompt"""
+        return AGENT_ANSWER.prefix_text(**self._prefix_values())
+    
+    def _cached_schedule_prefix(self):
+        """Prefix with User 2's whole schedule, to be sent only as Gemini cached content ("" = none)"""
+        block = self._full_schedule_block()
+        return AGENT_ANSWER.prefix_text(**self._prefix_values(block)) if block else ""
+    
+    def _full_schedule_block(self):
+        """
+        User 2's whole schedule for the prompt prefix
         
+        Only built when Gemini is the primary provider and the schedule is
+        big enough to be stored as Gemini cached content (DeepSeek caches
+        prompt prefixes automatically, so it keeps the shorter prompt), and
+        only sent when that cached content exists. The block is rebuilt
+        after this agent's own writes, and otherwise at most once per
+        GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS to pick up writes from other
+        processes (e.g. the populate scripts), so queries don't scan the DB.
+        """
+        if self.use_deepseek or not GEMINI_CONTEXT_CACHE:
+            return ""
+        if self._schedule_block is not None and time.monotonic() < self._schedule_block[0]:
+            return self._schedule_block[1]
         try:
-            # Use DeepSeek or Gemini based on initialization
-            if self.use_deepseek:
-                response = generate_content_with_deepseek(self.client, prompt, max_retries=3, base_delay=1.0)
-                response_text = get_deepseek_response_text(response)
-            else:
-                response = generate_content_with_retry(self.model, prompt, max_retries=3, base_delay=1.0)
-                response_text = get_response_text(response)
-            
-            # Clean markdown formatting from response
-            response_text = self._clean_markdown(response_text)
-            
-            if not response_text or response_text.strip() == "":
-                response_text = "I couldn't generate a response. Please try again or check your API configuration."
+            documents = self.vector_db.get_all().get('documents') or []
         except Exception as e:
-            error_msg = str(e).lower()
-            print(f"Error generating response from Gemini API: {str(e)}")
+            print(f"Error loading User 2's schedule for the prompt prefix: {str(e)}")
+            return ""
+        schedule = "\n".join(f"- {doc}" for doc in documents)
+        block = f"\n\nComplete schedule of User 2:\n{schedule}" if is_context_cacheable(schedule) else ""
+        self._schedule_block = (time.monotonic() + GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS, block)
+        return block
+    
+    def _finalize_response(self, response_text: str):
+        """Clean markdown formatting from an LLM answer"""
+        response_text = self._clean_markdown(response_text)
+        
+        if not response_text or response_text.strip() == "":
+            response_text = "I couldn't generate a response. Please try again or check your API configuration."
+        return response_text
+    
+    def _fallback_response(self, query: str, search_results: dict, error: Exception):
+        """Answer from the raw search results when the LLM call fails"""
+        error_msg = str(error).lower()
+        has_context = bool(search_results.get('documents') and search_results['documents'][0])
+        
+        # If we have context from vector DB, generate a useful answer from it
+        if has_context:
+            # Extract schedule data and format it nicely
+            schedule_lines = []
+            if search_results.get('documents') and len(search_results['documents']) > 0:
+                for i, doc in enumerate(search_results['documents'][0][:3]):  # Use first 3 results
+                    schedule_lines.append(f"• {doc}")
             
-            # If we have context from vector DB, generate a useful answer from it
-            if context and "Relevant schedule information" in context:
-                # Extract schedule data and format it nicely
-                schedule_lines = []
-                if search_results.get('documents') and len(search_results['documents']) > 0:
-                    for i, doc in enumerate(search_results['documents'][0][:3]):  # Use first 3 results
-                        schedule_lines.append(f"• {doc}")
+            if schedule_lines:
+                # Generate a simple, useful answer from the data
+                response_text = f"Based on User 2's schedule:\n\n" + "\n".join(schedule_lines)
                 
-                if schedule_lines:
-                    # Generate a simple, useful answer from the data
-                    response_text = f"Based on User 2's schedule:\n\n" + "\n".join(schedule_lines)
-                    
-                    # Add a note about the query if relevant
-                    if "free" in query.lower() or "available" in query.lower():
-                        response_text += "\n\nThis shows the scheduled activities. Free time would be between these activities."
-                    elif "when" in query.lower() or "time" in query.lower():
-                        response_text += "\n\nThese are the scheduled times found in the database."
-                else:
-                    response_text = f"Based on the available schedule information for User 2, I found relevant data for your query: '{query}'. The schedule data is available, but I'm having trouble processing it right now. Please try again in a moment."
+                # Add a note about the query if relevant
+                if "free" in query.lower() or "available" in query.lower():
+                    response_text += "\n\nThis shows the scheduled activities. Free time would be between these activities."
+                elif "when" in query.lower() or "time" in query.lower():
+                    response_text += "\n\nThese are the scheduled times found in the database."
             else:
-                # No context found
-                if "rate limit" in error_msg or "quota" in error_msg or "429" in error_msg:
-                    response_text = f"I couldn't find specific schedule information for '{query}' in User 2's schedule. Please try again in a moment or add more schedule data."
-                else:
-                    response_text = f"I couldn't find any relevant schedule information for your query: '{query}'. Please add schedule information or try a different query."
-        
-        return {
-            "query": query,
-            "response": response_text,
-            "relevant_data": search_results
-        }
+                response_text = f"Based on the available schedule information for User 2, I found relevant data for your query: '{query}'. The schedule data is available, but I'm having trouble processing it right now. Please try again in a moment."
+        else:
+            # No context found
+            if "rate limit" in error_msg or "quota" in error_msg or "429" in error_msg:
+                response_text = f"I couldn't find specific schedule information for '{query}' in User 2's schedule. Please try again in a moment or add more schedule data."
+            else:
+                response_text = f"I couldn't find any relevant schedule information for your query: '{query}'. Please add schedule information or try a different query."
+        return response_text
     
     def get_all_schedules(self):
         """
@@ -247,6 +399,7 @@ IMPORTANT:
             doc_id: ID of the document to delete
         """
         self.vector_db.delete(doc_id)
+        self._schedule_block = None
         return {"message": f"Schedule entry {doc_id} deleted successfully"}
     
     def clear_all_schedules(self):
@@ -257,6 +410,7 @@ IMPORTANT:
             Dictionary with count of deleted entries
         """
         deleted_count = self.vector_db.delete_all()
+        self._schedule_block = None
         return {"message": f"All schedules cleared successfully", "deleted_count": deleted_count}
     
     def get_schedules_for_comparison(self):
@@ -1,18 +1,150 @@
 
 from core.model_helper import (
     get_gemini_model, 
+    get_task_model,
     get_response_text, 
     generate_content_with_retry,
     get_deepseek_model,
     get_deepseek_response_text,
-    generate_content_with_deepseek
+    generate_content_with_deepseek,
+    stream_content_with_retry,
+    stream_content_with_deepseek,
+    get_async_deepseek_model,
+    get_hedge_partner,
+    generate_content_hedged,
+    is_provider_available,
+    call_label
 )
-from core.config import DEEPSEEK_API_KEY_ORCHESTRATOR, GEMINI_API_KEY_ORCHESTRATOR, GEMINI_API_KEY_AGENT1
+from core.circuit_breaker import CircuitOpenError
+from core.config import (
+    DEEPSEEK_API_KEY_ORCHESTRATOR,
+    GEMINI_API_KEY_ORCHESTRATOR,
+    GEMINI_API_KEY_AGENT1,
+    LLM_HEDGING_ENABLED,
+    INTENT_ROUTER_ENABLED,
+    INTENT_ROUTER_MIN_CONFIDENCE,
+    INTENT_ROUTER_MIN_MARGIN,
+    SPECULATIVE_RETRIEVAL,
+    LLM_AGGREGATION_POLICY,
+    AGENT_BULKHEAD_MAX_CONCURRENT,
+    AGENT_BULKHEAD_MAX_QUEUE
+)
+from core.schedule_engine import (
+    parse_schedule_times,
+    merge_time_ranges,
+    find_common_free_time,
+    format_time,
+    format_intervals,
+    format_free_time_summary,
+    schedule_busy_by_day,
+    busy_for_day,
+    default_days,
+    days_from_query,
+    DAILY
+)
+from core.availability import AvailabilityMatrix
+from core.prompts import ROUTE, GENERAL_QUESTION, AGGREGATE_COMPARISON, AGGREGATE_SUMMARY, COMMON_TIME_PHRASING
+from core.async_runtime import run_async, submit_async, get_executor_stats
+from core.bulkhead import Bulkhead, BulkheadFull
+from core.deadline import Deadline, deadline_scope, current_deadline
+from core.context_budget import build_schedule_context
+from core.task_profiles import get_task_profile
+from core.keyword_matcher import KeywordMatcher
+from core.intent_router import IntentRouter, QueryEmbeddings
 from agents.agent1 import Agent1
 from agents.agent2 import Agent2
 from datetime import datetime
+import asyncio
+import functools
+import re
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeoutError
+
+def aggregate_comparisons(user_query: str, clean_responses: dict, is_comparison_query: bool) -> bool:
+    """Aggregation policy: merge with the LLM only when several agents answered a comparison query"""
+    return len(clean_responses) > 1 and is_comparison_query
+
+def aggregate_multi_agent(user_query: str, clean_responses: dict, is_comparison_query: bool) -> bool:
+    """Aggregation policy: merge with the LLM whenever several agents answered"""
+    return len(clean_responses) > 1
+
+AGGREGATION_POLICIES = {
+    "comparison": aggregate_comparisons,
+    "multi_agent": aggregate_multi_agent
+}
+
+# Routing keywords (agent aliases come from agent_aliases)
+ALL_AGENTS_KEYWORDS = ['both', 'all users', 'all agents', 'everyone', 'each user', 'all of them', 'together', 'common', 'compare', 'between', 'shared']
+SCHEDULE_KEYWORDS = [
+    'schedule', 'availability', 'free time', 'busy', 'meeting', 'appointment',
+    'when', 'what time', 'calendar', 'routine', 'plan', 'commitment',
+    'free', 'available', 'occupied', 'booked', 'slot', 'time slot',
+    'compare', 'common', 'overlap', 'conflict', 'both users', 'all users'
+]
+COMPARISON_KEYWORDS = [
+    'common', 'both', 'all', 'together', 'everyone', 'compare',
+    'free time', 'available', 'meeting', 'when', 'schedule'
+]
+# Example utterances for the embedding router (agents are also described by their stored schedules)
+ALL_AGENTS_EXAMPLES = [
+    "When can everyone get together?",
+    "Find a time that works for the whole team",
+    "Which evenings are free for us?",
+    "Set up a group call this week",
+    "Is there a slot where nobody is busy?",
+    "Plan a dinner we can all attend",
+    "Who is available for a meeting at 3 PM?",
+    "Do our lunch breaks overlap?"
+]
+SCHEDULE_EXAMPLES = [
+    "What's on the agenda for tomorrow?",
+    "Is there time for lunch on Friday?",
+    "What happens after the morning workout?",
+    "Find a slot for a call",
+    "What does the evening look like?",
+    "Are there any conflicts on Wednesday?",
+    "What time does work start?",
+    "Which days have the gym session?"
+]
+GENERAL_EXAMPLES = [
+    "What is the capital of France?",
+    "Explain how photosynthesis works",
+    "Write a short poem about the sea",
+    "How do I reverse a list in Python?",
+    "Tell me a joke",
+    "Who wrote Pride and Prejudice?",
+    "Translate hello into Spanish",
+    "What is the square root of 144?"
+]
+ROUTER_SCHEDULE_SAMPLES = 30  # Stored schedule documents per agent used as routing examples
+
+ALL_INTENT = ("intent", "all")
+COMPARISON_INTENT = ("intent", "comparison")
+SCHEDULE_INTENT = ("intent", "schedule")
+
+_NUMBER_WORDS = ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten']
+_ORDINAL_WORDS = ['first', 'second', 'third', 'fourth', 'fifth', 'sixth', 'seventh', 'eighth', 'ninth', 'tenth']
+
+def agent_aliases(agent_name: str, agent=None):
+    """
+    Ways a query can refer to an agent's user
+    
+    "Agent 2" gives "user 2", "user2", "agent 2", "agent2", "2nd user",
+    "second user" and "user two"; agents can add their own with an
+    `aliases` attribute.
+    """
+    aliases = {agent_name.lower()}
+    number = ''.join(char for char in agent_name if char.isdigit())
+    if number:
+        n = int(number)
+        suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+        aliases.update({f"user {n}", f"user{n}", f"agent {n}", f"agent{n}", f"{n}{suffix} user"})
+        if 1 <= n <= len(_NUMBER_WORDS):
+            aliases.update({f"{_ORDINAL_WORDS[n - 1]} user", f"user {_NUMBER_WORDS[n - 1]}"})
+    aliases.update(alias.lower() for alias in getattr(agent, 'aliases', ()) or ())
+    return sorted(aliases)
 
 class OrchestratorAgent:
     """Master orchestrator agent that coordinates queries across all agents"""
@@ -37,6 +169,17 @@ class OrchestratorAgent:
             self.model = get_gemini_model(GEMINI_API_KEY_ORCHESTRATOR)
             print("Orchestrator: Using Gemini API (DeepSeek key not provided)")
         
+        # Optionally hedge slow DeepSeek aggregation calls with Gemini
+        self.hedge_partner = None
+        if LLM_HEDGING_ENABLED and self.use_deepseek:
+            self.async_client = get_async_deepseek_model(DEEPSEEK_API_KEY_ORCHESTRATOR)
+            self.hedge_partner = get_hedge_partner("gemini", GEMINI_API_KEY_ORCHESTRATOR)
+        
+        # Resolve the task profile models once at startup when Gemini is the primary provider
+        if not self.use_deepseek:
+            for task in ("route", "answer", "aggregate", "summarize"):
+                get_task_model(task, GEMINI_API_KEY_ORCHESTRATOR)
+        
         # Initialize all sub-agents with different API keys for parallel processing
         # Agent 1 uses Gemini, Agent 2 uses DeepSeek, Orchestrator uses DeepSeek
         self.agent1 = Agent1(api_key=GEMINI_API_KEY_AGENT1)
@@ -48,9 +191,34 @@ class OrchestratorAgent:
             "Agent 2": self.agent2
         }
         
+        # One bulkhead per agent: a slow agent fails fast instead of tying up the shared workers
+        self.bulkheads = {
+            agent_name: Bulkhead(agent_name, AGENT_BULKHEAD_MAX_CONCURRENT, AGENT_BULKHEAD_MAX_QUEUE)
+            for agent_name in self.agents
+        }
+        
         # Conversation history for context awareness
         self.conversation_history = []
         
+        # Routing keywords and agent aliases compiled once; each text is scanned in one pass
+        # (results are cached, so history messages are not rescanned on every query)
+        self._keyword_matcher = self._build_keyword_matcher()
+        self._scan = functools.lru_cache(maxsize=1024)(self._keyword_matcher.scan)
+        
+        # Embedding routers for queries the keywords can't place (built on first use)
+        self._agent_router = None
+        self._intent_router = None
+        self._routers_lock = threading.Lock()
+        self._routers_state = "pending" if INTENT_ROUTER_ENABLED else "disabled"
+        
+        # Speculative vector searches started before routing: used by routed agents, cancelled otherwise
+        self._speculation_lock = threading.Lock()
+        self._speculation_stats = {"started": 0, "used": 0, "discarded": 0}
+        
+        # Decides whether agent answers need the aggregation LLM call; replaceable with any
+        # callable (user_query, clean_responses, is_comparison_query) -> bool
+        self.aggregation_policy = AGGREGATION_POLICIES.get(LLM_AGGREGATION_POLICY, aggregate_multi_agent)
+        
         # System prompt for orchestrator
         self.system_prompt = """You are an Orchestrator Agent, a master coordinator that manages multiple specialized agents.
         Your role is to:
@@ -65,73 +233,154 @@ class OrchestratorAgent:
         
         Always provide precise, concise responses. Focus on the answer, not explanations."""
     
+    def _build_keyword_matcher(self):
+        """Compile the routing keywords and every agent's aliases into one matcher"""
+        matcher = KeywordMatcher()
+        for keyword in ALL_AGENTS_KEYWORDS:
+            matcher.add(keyword, ALL_INTENT)
+        for keyword in SCHEDULE_KEYWORDS:
+            matcher.add(keyword, SCHEDULE_INTENT)
+        for keyword in COMPARISON_KEYWORDS:
+            matcher.add(keyword, COMPARISON_INTENT)
+        for word in ('user', 'agent'):
+            # Questions about a specific user are likely schedule-related
+            matcher.add(word, SCHEDULE_INTENT, whole_word=True)
+        for agent_name, agent in self.agents.items():
+            for alias in agent_aliases(agent_name, agent):
+                matcher.add(alias, ("agent", agent_name))
+                matcher.add(alias, SCHEDULE_INTENT)
+        matcher.build()
+        return matcher
+    
+    def _build_routers(self):
+        """Embed the routing examples (schedules included) with the vector DB's embedding function"""
+        embeddings = QueryEmbeddings(self.agent1.vector_db.embed)
+        agent_router = IntentRouter("agents", embeddings, INTENT_ROUTER_MIN_CONFIDENCE, INTENT_ROUTER_MIN_MARGIN)
+        for agent_name, agent in self.agents.items():
+            documents = agent.get_all_schedules().get('documents') or []
+            agent_router.add_examples(agent_name, documents[:ROUTER_SCHEDULE_SAMPLES])
+            agent_router.add_examples(agent_name, getattr(agent, 'routing_examples', ()) or ())
+        agent_router.add_examples("all", ALL_AGENTS_EXAMPLES)
+        agent_router.build()
+        
+        intent_router = IntentRouter("intent", embeddings, INTENT_ROUTER_MIN_CONFIDENCE, INTENT_ROUTER_MIN_MARGIN)
+        intent_router.add_examples("schedule", SCHEDULE_EXAMPLES)
+        intent_router.add_examples("general", GENERAL_EXAMPLES)
+        intent_router.build()
+        return agent_router, intent_router
+    
+    def _routers(self):
+        """The (agent, intent) embedding routers, or (None, None) when unavailable"""
+        if self._routers_state == "pending":
+            with self._routers_lock:
+                if self._routers_state == "pending":
+                    try:
+                        started = time.perf_counter()
+                        self._agent_router, self._intent_router = self._build_routers()
+                        self._routers_state = "ready"
+                        print(f"🧭 Intent router ready ({(time.perf_counter() - started) * 1000:.0f}ms to embed examples)")
+                    except Exception as e:
+                        # e.g. the embedding model can't be loaded - route with the LLM as before
+                        self._routers_state = "unavailable"
+                        print(f"⚠️  Intent router unavailable, using LLM routing: {e}")
+        return self._agent_router, self._intent_router
+    
+    def get_router_stats(self):
+        """Decisions, fallbacks and latency of the embedding routers"""
+        stats = {"state": self._routers_state}
+        for router in (self._agent_router, self._intent_router):
+            if router is not None:
+                stats[router.name] = router.stats()
+        return stats
+    
+    def _start_speculative_searches(self, user_query: str, conversation_history: list, deadline: Deadline):
+        """
+        Start the vector search of every candidate agent before the query is routed
+        
+        Candidates are the agents the query or history names (found by a
+        keyword scan, which costs microseconds), else all agents, skipping
+        agents whose bulkhead is saturated. The searches
+        run in worker threads while the intent check and routing (possibly an
+        LLM call) are decided, so their latency is hidden behind routing.
+        
+        Returns:
+            Dictionary of agent name to the future of its search results
+            (empty when speculation is disabled)
+        """
+        if not SPECULATIVE_RETRIEVAL:
+            return {}
+        candidates = self._infer_user_from_context(user_query, conversation_history) or self.agents
+        searches = {
+            agent_name: submit_async(asyncio.to_thread(agent.search_schedule, user_query, deadline))
+            for agent_name, agent in candidates.items()
+            # Don't add speculative work for an agent that is already backed up
+            if not self.bulkheads[agent_name].saturated
+        }
+        with self._speculation_lock:
+            self._speculation_stats["started"] += len(searches)
+        return searches
+    
+    def _settle_speculative_searches(self, searches: dict, agents_to_query: dict):
+        """Keep the searches of the routed agents and cancel those routing ruled out"""
+        kept = {}
+        for agent_name, future in searches.items():
+            if agent_name in agents_to_query:
+                kept[agent_name] = future
+            else:
+                # A search already running in its thread finishes, but its result is dropped
+                future.cancel()
+        with self._speculation_lock:
+            self._speculation_stats["used"] += len(kept)
+            self._speculation_stats["discarded"] += len(searches) - len(kept)
+        return kept
+    
+    def get_bulkhead_stats(self):
+        """Per-agent in-flight and queued queries, rejections, plus the shared worker pool's queue depth"""
+        stats = {agent_name: bulkhead.stats() for agent_name, bulkhead in self.bulkheads.items()}
+        stats["executor"] = get_executor_stats()
+        return stats
+    
+    def get_speculation_stats(self):
+        """Speculative vector searches started, used by a routed agent, and discarded"""
+        with self._speculation_lock:
+            return dict(self._speculation_stats)
+    
+    def _mentioned_agents(self, matches: frozenset):
+        """Agents a scanned text refers to ("both"/"everyone" means all of them), or None"""
+        if ALL_INTENT in matches:
+            return self.agents
+        mentioned = {name: agent for name, agent in self.agents.items() if ("agent", name) in matches}
+        return mentioned or None
+    
     def _infer_user_from_context(self, user_query: str, conversation_history: list = None):
         """
-        Infer which user is being discussed from conversation history if not explicitly mentioned
+        Infer which users are being discussed, from the query or else the conversation history
         
         Args:
             user_query: Current user query
             conversation_history: List of previous conversation messages
+                                  (defaults to the stored history)
             
         Returns:
-            'user1', 'user2', 'both', or None if cannot infer
+            Dictionary of the agents being discussed, or None if it cannot be inferred
         """
-        query_lower = user_query.lower()
-        
-        # Check current query first
-        user1_keywords = ['user 1', 'user1', 'agent 1', 'agent1', 'first user', 'user one', '1st user', 'user one\'s', 'user1\'s']
-        user2_keywords = ['user 2', 'user2', 'agent 2', 'agent2', 'second user', 'user two', '2nd user', 'user two\'s', 'user2\'s']
-        all_keywords = ['both', 'all users', 'all agents', 'everyone', 'each user', 'all of them', 'together', 'common', 'compare', 'between', 'shared']
-        
-        mentions_user1 = any(keyword in query_lower for keyword in user1_keywords)
-        mentions_user2 = any(keyword in query_lower for keyword in user2_keywords)
-        mentions_all = any(keyword in query_lower for keyword in all_keywords)
-        
-        # If explicitly mentioned in current query, return immediately
-        if mentions_all or (mentions_user1 and mentions_user2):
-            return 'both'
-        if mentions_user1:
-            return 'user1'
-        if mentions_user2:
-            return 'user2'
-        
-        # If no explicit mention, check conversation history
-        if conversation_history:
-            # Look through recent history (last 5 messages) for user mentions
-            recent_history = conversation_history[-5:] if len(conversation_history) > 5 else conversation_history
-            
-            for msg in reversed(recent_history):  # Check most recent first
-                # Handle different message formats (frontend uses 'content', backend might use 'message' or 'query')
-                msg_text = str(msg.get('content', '') or msg.get('message', '') or msg.get('query', '') or msg if isinstance(msg, str) else '').lower()
-                if not msg_text:
-                    continue
-                
-                # Check if this message mentioned a user
-                hist_mentions_user1 = any(keyword in msg_text for keyword in user1_keywords)
-                hist_mentions_user2 = any(keyword in msg_text for keyword in user2_keywords)
-                hist_mentions_all = any(keyword in msg_text for keyword in all_keywords)
-                
-                if hist_mentions_all or (hist_mentions_user1 and hist_mentions_user2):
-                    return 'both'
-                if hist_mentions_user1:
-                    return 'user1'
-                if hist_mentions_user2:
-                    return 'user2'
-        
-        # Check stored conversation history if provided
-        if self.conversation_history:
-            for msg in reversed(self.conversation_history[-5:]):
-                msg_text = str(msg).lower()
-                hist_mentions_user1 = any(keyword in msg_text for keyword in user1_keywords)
-                hist_mentions_user2 = any(keyword in msg_text for keyword in user2_keywords)
-                hist_mentions_all = any(keyword in msg_text for keyword in all_keywords)
-                
-                if hist_mentions_all or (hist_mentions_user1 and hist_mentions_user2):
-                    return 'both'
-                if hist_mentions_user1:
-                    return 'user1'
-                if hist_mentions_user2:
-                    return 'user2'
+        mentioned = self._mentioned_agents(self._scan(user_query))
+        if mentioned is not None:
+            return mentioned
+        
+        # Look through recent history (last 5 messages), most recent first
+        history = conversation_history or self.conversation_history
+        for msg in reversed(history[-5:]):
+            # Frontend messages use 'content', backend ones 'message' or 'query'
+            if isinstance(msg, dict):
+                msg_text = msg.get('content', '') or msg.get('message', '') or msg.get('query', '')
+            else:
+                msg_text = msg
+            if not msg_text:
+                continue
+            mentioned = self._mentioned_agents(self._scan(str(msg_text)))
+            if mentioned is not None:
+                return mentioned
         
         return None
     
@@ -145,25 +394,15 @@ class OrchestratorAgent:
         Returns:
             True if schedule-related, False if general question
         """
-        query_lower = user_query.lower()
-        
-        # Schedule-related keywords
-        schedule_keywords = [
-            'schedule', 'availability', 'free time', 'busy', 'meeting', 'appointment',
-            'when', 'what time', 'calendar', 'routine', 'plan', 'commitment',
-            'free', 'available', 'occupied', 'booked', 'slot', 'time slot',
-            'compare', 'common', 'overlap', 'conflict', 'both users', 'all users',
-            'user 1', 'user 2', 'user1', 'user2', 'agent 1', 'agent 2'
-        ]
-        
-        # Check if query contains schedule-related keywords
-        is_schedule = any(keyword in query_lower for keyword in schedule_keywords)
-        
-        # Also check if it's asking about specific users (likely schedule-related)
-        query_words = query_lower.split()
-        user_mentions = any(word in ['user', 'agent'] for word in query_words)
-        
-        return is_schedule or user_mentions
+        if SCHEDULE_INTENT in self._scan(user_query):
+            return True
+        
+        # No schedule keyword - the embedding router can still recognize schedule questions
+        _, intent_router = self._routers()
+        if intent_router is not None:
+            intent, _ = intent_router.classify(user_query)
+            return intent == "schedule"
+        return False
     
     def _determine_relevant_agents(self, user_query: str, conversation_history: list = None):
         """
@@ -177,53 +416,25 @@ class OrchestratorAgent:
         Returns:
             Dictionary of relevant agents to query
         """
-        # First, infer user from context (including conversation history)
-        inferred_user = self._infer_user_from_context(user_query, conversation_history)
-        
-        # First, do a quick keyword check for common patterns
-        query_lower = user_query.lower()
-        
-        # Expanded keyword matching for faster routing (skip LLM when possible)
-        user1_keywords = ['user 1', 'user1', 'agent 1', 'agent1', 'first user', 'user one', '1st user', 'user one\'s', 'user1\'s']
-        user2_keywords = ['user 2', 'user2', 'agent 2', 'agent2', 'second user', 'user two', '2nd user', 'user two\'s', 'user2\'s']
-        all_keywords = ['both', 'all users', 'all agents', 'everyone', 'each user', 'all of them', 'together', 'common', 'compare', 'between', 'shared']
-        
-        mentions_user1 = any(keyword in query_lower for keyword in user1_keywords)
-        mentions_user2 = any(keyword in query_lower for keyword in user2_keywords)
-        mentions_all = any(keyword in query_lower for keyword in all_keywords)
-        
-        # Use inferred user if current query doesn't explicitly mention a user
-        if not mentions_user1 and not mentions_user2 and not mentions_all:
-            if inferred_user == 'user1':
-                return {'Agent 1': self.agent1}
-            elif inferred_user == 'user2':
-                return {'Agent 2': self.agent2}
-            elif inferred_user == 'both':
-                return self.agents
-        
-        # Fast routing based on keywords - skip LLM call when possible
-        if mentions_user1 and not mentions_user2 and not mentions_all:
-            return {'Agent 1': self.agent1}
-        elif mentions_user2 and not mentions_user1 and not mentions_all:
-            return {'Agent 2': self.agent2}
-        elif mentions_all or (mentions_user1 and mentions_user2):
-            return self.agents
-        
-        # Only use LLM if keywords are unclear - with shorter, faster prompt
-        routing_prompt = f"""Query: "{user_query[:100]}"
-
-Route to: agent1 (User 1 only), agent2 (User 2 only), or all (both/multiple).
-
-One word only: agent1/agent2/all"""
+        # Fast routing on keywords in the query, then in the conversation history - skip LLM call when possible
+        agents_to_query = self._infer_user_from_context(user_query, conversation_history)
+        if agents_to_query is not None:
+            return agents_to_query
+        
+        # Then the local embedding router (about a millisecond, no API call)
+        agent_router, _ = self._routers()
+        if agent_router is not None:
+            label, confidence = agent_router.classify(user_query)
+            if label is not None:
+                print(f"🧭 [ORCHESTRATOR] Embedding router picked {label} (confidence {confidence:.2f})")
+                return self.agents if label == "all" else {label: self.agents[label]}
+        
+        # Only use LLM if keywords and the router are unclear - with shorter, faster prompt
+        routing_prompt = ROUTE.render(user_query=user_query[:100])
 
         try:
-            # Use DeepSeek or Gemini based on initialization
-            if self.use_deepseek:
-                routing_response = generate_content_with_deepseek(self.client, routing_prompt, max_retries=1, base_delay=0.5)
-                routing_decision = get_deepseek_response_text(routing_response).strip().lower().replace('"', '').replace("'", '')
-            else:
-                routing_response = generate_content_with_retry(self.model, routing_prompt, max_retries=1, base_delay=0.5)
-                routing_decision = get_response_text(routing_response).strip().lower().replace('"', '').replace("'", '')
+            routing_text = self._generate_text(routing_prompt, max_retries=1, base_delay=0.5, task="route", label="orchestrator.route")
+            routing_decision = routing_text.strip().lower().replace('"', '').replace("'", '')
             
             agents_to_query = {}
             if 'agent1' in routing_decision or ('1' in routing_decision and '2' not in routing_decision):
@@ -239,6 +450,10 @@ One word only: agent1/agent2/all"""
             # Fast fallback - default to all
             return self.agents
     
+    def _general_question_prompt(self, user_query: str):
+        """Build the prompt for answering a general question directly"""
+        return GENERAL_QUESTION.render(user_query=user_query)
+    
     def _answer_general_question(self, user_query: str):
         """
         Answer general (non-schedule) questions directly using LLM without agent coordination
@@ -249,19 +464,11 @@ One word only: agent1/agent2/all"""
         Returns:
             Direct LLM response
         """
-        prompt = f"""You are a helpful AI assistant. Answer the following question naturally and conversationally.
-
-Question: {user_query}
-
-Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversational. Do not use markdown formatting."""
+        prompt = self._general_question_prompt(user_query)
         
         try:
-            if self.use_deepseek:
-                response = generate_content_with_deepseek(self.client, prompt, max_retries=2, base_delay=0.5)
-                answer = get_deepseek_response_text(response).strip()
-            else:
-                response = generate_content_with_retry(self.model, prompt, max_retries=2, base_delay=0.5)
-                answer = get_response_text(response).strip()
+            # General questions can depend on the current date/time - don't serve them from cache
+            answer = self._generate_text(prompt, max_retries=2, base_delay=0.5, use_cache=False, task="answer", label="orchestrator.general").strip()
             
             # Clean markdown
             answer = answer.replace('**', '').replace('*', '').replace('__', '').replace('_', '').replace('•', '')
@@ -269,7 +476,7 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
         except Exception as e:
             return f"I apologize, but I encountered an error while processing your question: {str(e)}"
     
-    def query_all_agents(self, user_query: str, conversation_history: list = None):
+    def query_all_agents(self, user_query: str, conversation_history: list = None, deadline: Deadline = None):
         """
         Intelligently query relevant agents based on the user's query
         Only queries agents that are relevant to the query
@@ -278,16 +485,26 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
         Args:
             user_query: The user's query
             conversation_history: Optional conversation history for context
+            deadline: Optional request deadline; agents that haven't answered
+                      by then are reported as timed out and left out of the answer
             
         Returns:
             Aggregated response from relevant agents or direct LLM response for general questions
         """
+        with deadline_scope(deadline) as deadline:
+            return self._query_all_agents(user_query, conversation_history, deadline)
+    
+    def _query_all_agents(self, user_query: str, conversation_history: list, deadline: Deadline):
         # Store in conversation history
         if conversation_history:
             self.conversation_history = conversation_history[-10:]  # Keep last 10 messages
         
+        # Retrieval for the candidate agents overlaps with intent detection and routing
+        searches = self._start_speculative_searches(user_query, conversation_history, deadline)
+        
         # Check if this is a general question (not schedule-related)
         if not self._is_schedule_related_query(user_query):
+            self._settle_speculative_searches(searches, {})
             print(f"\n{'='*70}")
             print("💬 ORCHESTRATOR AGENT - GENERAL QUESTION")
             print(f"{'='*70}")
@@ -318,6 +535,7 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
         
         # Determine which agents are relevant (with context awareness)
         agents_to_query = self._determine_relevant_agents(user_query, conversation_history)
+        searches = self._settle_speculative_searches(searches, agents_to_query)
         
         if len(agents_to_query) == len(self.agents):
             print("📡 [ORCHESTRATOR → AGENTS] Routing query to all agents...\n")
@@ -327,92 +545,9 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
         
         print("-" * 70)
         
-        # Collect responses from relevant agents in PARALLEL for faster communication
-        agent_responses = {}
-        
-        def query_agent_parallel(agent_name, agent):
-            """Query a single agent and return the response"""
-            try:
-                print(f"📤 [ORCHESTRATOR → {agent_name}]")
-                print(f"   Sending query: \"{user_query}\"")
-                print(f"   Status: Processing in parallel...")
-                sys.stdout.flush()
-                
-                # Call agent with timeout handling
-                try:
-                    response = agent.query_schedule(user_query)
-                except Exception as agent_error:
-                    raise Exception(f"Agent query failed: {str(agent_error)}")
-                
-                # Validate response structure
-                if not response or 'response' not in response:
-                    raise Exception(f"Invalid response format from {agent_name}")
-                
-                print(f"📥 [{agent_name} → ORCHESTRATOR]")
-                print(f"   Status: ✓ Success")
-                print(f"   Response length: {len(response['response'])} characters")
-                if response.get('relevant_data', {}).get('documents') and response['relevant_data']['documents'][0]:
-                    print(f"   Found {len(response['relevant_data']['documents'][0])} relevant results")
-                sys.stdout.flush()
-                
-                result = {
-                    "agent_name": agent_name,
-                    "response": response['response'],
-                    "relevant_data": response.get('relevant_data', {}),
-                    "status": "success"
-                }
-                
-                print(f"   Preview: {response['response'][:100]}...")
-                print("-" * 70 + "\n")
-                sys.stdout.flush()
-                
-                return result
-                
-            except Exception as e:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"📥 [{agent_name} → ORCHESTRATOR]")
-                print(f"   Status: ✗ Error")
-                print(f"   Error: {str(e)}")
-                print("-" * 70 + "\n")
-                sys.stdout.flush()
-                
-                return {
-                    "agent_name": agent_name,
-                    "response": f"Error: {str(e)}",
-                    "relevant_data": None,
-                    "status": "error",
-                    "error": str(e)
-                }
-        
-        # Query all agents in parallel using ThreadPoolExecutor
+        # Query all agents concurrently on the shared event loop
         print("⚡ [ORCHESTRATOR] Querying agents in parallel for faster response...\n")
-        with ThreadPoolExecutor(max_workers=len(agents_to_query)) as executor:
-            # Submit all agent queries simultaneously
-            future_to_agent = {
-                executor.submit(query_agent_parallel, agent_name, agent): agent_name
-                for agent_name, agent in agents_to_query.items()
-            }
-            
-            # Collect results as they complete
-            for future in as_completed(future_to_agent):
-                agent_name = future_to_agent[future]
-                try:
-                    result = future.result()
-                    agent_responses[result["agent_name"]] = {
-                        "response": result["response"],
-                        "relevant_data": result.get("relevant_data", {}),
-                        "status": result["status"]
-                    }
-                    if result.get("error"):
-                        agent_responses[result["agent_name"]]["error"] = result["error"]
-                except Exception as e:
-                    agent_responses[agent_name] = {
-                        "response": f"Error: {str(e)}",
-                        "relevant_data": None,
-                        "status": "error",
-                        "error": str(e)
-                    }
+        agent_responses = run_async(self.query_agents_async(user_query, agents_to_query, deadline, searches))
         
         if agent_responses:
             print("🔄 [ORCHESTRATOR] Aggregating responses from queried agents...")
@@ -436,6 +571,314 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
             "timestamp": datetime.now().isoformat()
         }
     
+    def stream_query_all_agents(self, user_query: str, conversation_history: list = None, deadline: Deadline = None):
+        """
+        Streaming variant of query_all_agents
+        
+        Yields (event, data) tuples as work completes:
+            ("routing", {...}) once the query type and target agents are known
+            ("agent", {...}) as each agent finishes (or times out)
+            ("token", {"text": ...}) for each chunk of the final answer
+            ("done", result) with the same result query_all_agents returns
+        
+        The final answer in "done" may differ slightly from the streamed tokens
+        (aggregation post-processing runs on the complete text).
+        """
+        with deadline_scope(deadline) as deadline:
+            yield from self._stream_query_all_agents(user_query, conversation_history, deadline)
+    
+    def _stream_query_all_agents(self, user_query: str, conversation_history: list, deadline: Deadline):
+        if conversation_history:
+            self.conversation_history = conversation_history[-10:]
+        
+        searches = self._start_speculative_searches(user_query, conversation_history, deadline)
+        
+        if not self._is_schedule_related_query(user_query):
+            self._settle_speculative_searches(searches, {})
+            print("💬 [ORCHESTRATOR] General question - streaming direct answer")
+            yield "routing", {"query_type": "general", "agents": []}
+            
+            chunks = []
+            try:
+                # General questions can depend on the current date/time - don't serve them from cache
+                for text in self._stream_llm(self._general_question_prompt(user_query), max_retries=2, base_delay=0.5, use_cache=False, task="answer", label="orchestrator.general"):
+                    chunks.append(text)
+                    yield "token", {"text": text}
+                answer = ''.join(chunks).strip()
+            except Exception as e:
+                answer = f"I apologize, but I encountered an error while processing your question: {str(e)}"
+                if not chunks:
+                    yield "token", {"text": answer}
+            
+            yield "done", {
+                "user_query": user_query,
+                "agent_responses": {},
+                "aggregated_response": answer,
+                "timestamp": datetime.now().isoformat(),
+                "query_type": "general"
+            }
+            return
+        
+        agents_to_query = self._determine_relevant_agents(user_query, conversation_history)
+        searches = self._settle_speculative_searches(searches, agents_to_query)
+        print(f"📡 [ORCHESTRATOR → AGENTS] Streaming query to: {', '.join(agents_to_query.keys())}")
+        yield "routing", {"query_type": "agents", "agents": list(agents_to_query.keys())}
+        
+        # Run agents concurrently on the shared loop and report each as it finishes
+        futures = {
+            submit_async(self._query_agent_async(agent_name, agent, user_query, deadline, searches.get(agent_name))): agent_name
+            for agent_name, agent in agents_to_query.items()
+        }
+        agent_responses = {}
+        try:
+            for future in as_completed(futures, timeout=deadline.remaining() if deadline else None):
+                agent_name = futures[future]
+                agent_responses[agent_name] = future.result()
+                yield "agent", {
+                    "agent_name": agent_name,
+                    "status": agent_responses[agent_name]["status"],
+                    "response": agent_responses[agent_name]["response"]
+                }
+        except FuturesTimeoutError:
+            for future, agent_name in futures.items():
+                if agent_name not in agent_responses:
+                    future.cancel()
+                    agent_responses[agent_name] = self._timed_out_response(agent_name, deadline)
+                    yield "agent", {
+                        "agent_name": agent_name,
+                        "status": "timeout",
+                        "response": agent_responses[agent_name]["response"]
+                    }
+        # Keep the original agent order in the result
+        agent_responses = {name: agent_responses[name] for name in agents_to_query}
+        
+        if not agent_responses:
+            aggregated_response = "No relevant agents were queried. Please try rephrasing your query."
+            yield "token", {"text": aggregated_response}
+        else:
+            plan = self._prepare_aggregation(user_query, agent_responses)
+            if plan["answer"] is not None:
+                aggregated_response = plan["answer"]
+                yield "token", {"text": aggregated_response}
+            else:
+                chunks = []
+                try:
+                    for text in self._stream_llm(plan["prompt"], max_retries=3, base_delay=1.0, task="aggregate", label="orchestrator.aggregate"):
+                        chunks.append(text)
+                        yield "token", {"text": text}
+                    aggregated_response = self._finish_aggregation(user_query, plan, ''.join(chunks).strip())
+                except Exception as e:
+                    print(f"⚠️  [ORCHESTRATOR] Streaming aggregation failed: {e}")
+                    aggregated_response = self._aggregation_fallback(user_query, plan)
+                    if not chunks:
+                        yield "token", {"text": aggregated_response}
+        
+        yield "done", {
+            "user_query": user_query,
+            "agent_responses": agent_responses,
+            "aggregated_response": aggregated_response,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _generate_text(self, prompt: str, max_retries: int = 3, base_delay: float = 1.0, use_cache: bool = True, hedge: bool = False,
+                       task: str = None, label: str = "orchestrator"):
+        """
+        Generate text with the orchestrator's LLM
+        
+        Uses DeepSeek when configured, switching straight to Gemini while the
+        DeepSeek circuit breaker rejects calls. Raises CircuitOpenError when no
+        healthy provider is left so callers use their deterministic fallbacks.
+        
+        Args:
+            hedge: Hedge slow DeepSeek calls with Gemini (when hedging is enabled)
+            task: Task profile ("route", "answer", "aggregate", "summarize") selecting model tier and output limits
+            label: Stage name the call is accounted to in the LLM metrics
+        """
+        with call_label(label):
+            if self.use_deepseek and is_provider_available("deepseek"):
+                try:
+                    if hedge and self.hedge_partner is not None:
+                        text, _ = generate_content_hedged(self.async_client, self.hedge_partner, prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache, task=task)
+                        return text
+                    response = generate_content_with_deepseek(self.client, prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache, task=task)
+                    return get_deepseek_response_text(response)
+                except CircuitOpenError:
+                    # Another call took the half-open probe - fail over to Gemini
+                    pass
+            
+            response = generate_content_with_retry(self._gemini_model(task), prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache)
+            return get_response_text(response)
+    
+    def _gemini_model(self, task: str = None):
+        """Gemini model of the orchestrator, or of a task profile (created on first use when DeepSeek is the primary provider)"""
+        if getattr(self, 'model', None) is None:
+            if GEMINI_API_KEY_ORCHESTRATOR and GEMINI_API_KEY_ORCHESTRATOR != "your_gemini_api_key_here":
+                self.model = get_gemini_model(GEMINI_API_KEY_ORCHESTRATOR)
+            else:
+                raise CircuitOpenError("deepseek circuit is open and no Gemini fallback key is configured")
+        if task is None:
+            return self.model
+        return get_task_model(task, GEMINI_API_KEY_ORCHESTRATOR)
+    
+    def _stream_llm(self, prompt: str, max_retries: int = 3, base_delay: float = 1.0, use_cache: bool = True, task: str = None,
+                    label: str = "orchestrator"):
+        """Stream text chunks from the orchestrator's LLM with markdown characters removed"""
+        gemini_stream = lambda: stream_content_with_retry(self._gemini_model(task), prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache)
+        use_deepseek = self.use_deepseek and is_provider_available("deepseek")
+        if use_deepseek:
+            stream = stream_content_with_deepseek(self.client, prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache, task=task)
+        else:
+            stream = gemini_stream()
+        
+        # The label is read when the provider stream starts (on the first chunk)
+        with call_label(label):
+            try:
+                text = next(stream, None)
+            except CircuitOpenError:
+                if not use_deepseek:
+                    raise
+                # Another call took the half-open probe - fail over to Gemini
+                stream = gemini_stream()
+                text = next(stream, None)
+        while text is not None:
+            text = text.replace('*', '').replace('_', '').replace('•', '')
+            if text:
+                yield text
+            text = next(stream, None)
+    
+    async def query_agents_async(self, user_query: str, agents_to_query: dict = None, deadline: Deadline = None,
+                                 searches: dict = None):
+        """
+        Query agents concurrently, waiting at most until the deadline
+        
+        Args:
+            user_query: The user's query
+            agents_to_query: Mapping of agent name to agent (defaults to all agents)
+            deadline: Optional request deadline (defaults to the active one)
+            searches: Optional futures of vector searches already started, by agent name
+            
+        Returns:
+            Dictionary of responses keyed by agent name; agents still running
+            at the deadline are cancelled and get a "timeout" entry
+        """
+        if agents_to_query is None:
+            agents_to_query = self.agents
+        if not agents_to_query:
+            return {}
+        deadline = deadline or current_deadline()
+        
+        tasks = {
+            agent_name: asyncio.ensure_future(
+                self._query_agent_async(agent_name, agent, user_query, deadline, (searches or {}).get(agent_name))
+            )
+            for agent_name, agent in agents_to_query.items()
+        }
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline.remaining() if deadline else None)
+        for task in pending:
+            task.cancel()
+        
+        return {
+            agent_name: self._timed_out_response(agent_name, deadline) if task in pending else task.result()
+            for agent_name, task in tasks.items()
+        }
+    
+    def _timed_out_response(self, agent_name: str, deadline: Deadline):
+        """Response entry of an agent that didn't answer before the deadline"""
+        error = f"No answer within the {deadline.seconds:.1f}s request deadline"
+        print(f"📥 [{agent_name} → ORCHESTRATOR]")
+        print(f"   Status: ⏱ Timed out")
+        print(f"   {error}")
+        print("-" * 70 + "\n")
+        sys.stdout.flush()
+        
+        return {
+            "response": f"Timed out: {error}",
+            "relevant_data": None,
+            "status": "timeout",
+            "error": error
+        }
+    
+    async def _query_agent_async(self, agent_name: str, agent, user_query: str, deadline: Deadline = None, search=None):
+        """
+        Query a single agent within its bulkhead and return its response entry (errors are captured, not raised)
+        
+        search is the future of a vector search already started for this agent, if any.
+        """
+        bulkhead = self.bulkheads.get(agent_name)
+        if bulkhead is None:
+            return await self._call_agent_async(agent_name, agent, user_query, deadline, search)
+        try:
+            await bulkhead.acquire(timeout=deadline.remaining() if deadline else None)
+        except BulkheadFull as e:
+            if search is not None:
+                search.cancel()
+            return self._overloaded_response(agent_name, str(e))
+        try:
+            return await self._call_agent_async(agent_name, agent, user_query, deadline, search)
+        finally:
+            bulkhead.release()
+    
+    def _overloaded_response(self, agent_name: str, error: str):
+        """Response entry of an agent whose bulkhead rejected the query"""
+        print(f"📥 [{agent_name} → ORCHESTRATOR]")
+        print(f"   Status: ⛔ Overloaded")
+        print(f"   {error}")
+        print("-" * 70 + "\n")
+        sys.stdout.flush()
+        
+        return {
+            "response": f"Overloaded: {error}",
+            "relevant_data": None,
+            "status": "overloaded",
+            "error": error
+        }
+    
+    async def _call_agent_async(self, agent_name: str, agent, user_query: str, deadline: Deadline = None, search=None):
+        """Send the query to an agent and wrap its answer (or error) in a response entry"""
+        try:
+            print(f"📤 [ORCHESTRATOR → {agent_name}]")
+            print(f"   Sending query: \"{user_query}\"")
+            print(f"   Status: Processing in parallel...")
+            sys.stdout.flush()
+            
+            try:
+                search_results = await asyncio.wrap_future(search) if search is not None else None
+                response = await agent.query_schedule_async(user_query, deadline, search_results=search_results)
+            except Exception as agent_error:
+                raise Exception(f"Agent query failed: {str(agent_error)}")
+            
+            # Validate response structure
+            if not response or 'response' not in response:
+                raise Exception(f"Invalid response format from {agent_name}")
+            
+            print(f"📥 [{agent_name} → ORCHESTRATOR]")
+            print(f"   Status: ✓ Success")
+            print(f"   Response length: {len(response['response'])} characters")
+            if response.get('relevant_data', {}).get('documents') and response['relevant_data']['documents'][0]:
+                print(f"   Found {len(response['relevant_data']['documents'][0])} relevant results")
+            print(f"   Preview: {response['response'][:100]}...")
+            print("-" * 70 + "\n")
+            sys.stdout.flush()
+            
+            return {
+                "response": response['response'],
+                "relevant_data": response.get('relevant_data', {}),
+                "status": "success"
+            }
+        except Exception as e:
+            print(f"📥 [{agent_name} → ORCHESTRATOR]")
+            print(f"   Status: ✗ Error")
+            print(f"   Error: {str(e)}")
+            print("-" * 70 + "\n")
+            sys.stdout.flush()
+            
+            return {
+                "response": f"Error: {str(e)}",
+                "relevant_data": None,
+                "status": "error",
+                "error": str(e)
+            }
+    
     def _aggregate_responses(self, user_query: str, agent_responses: dict):
         """
         Aggregate responses from all agents into a coherent, precise answer
@@ -448,6 +891,26 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
         Returns:
             Aggregated response string
         """
+        plan = self._prepare_aggregation(user_query, agent_responses)
+        if plan["answer"] is not None:
+            return plan["answer"]
+        
+        try:
+            # Use more retries for aggregation to ensure we get a response
+            aggregated_text = self._generate_text(plan["prompt"], max_retries=3, base_delay=1.0, hedge=True, task="aggregate", label="orchestrator.aggregate").strip()
+            
+            return self._finish_aggregation(user_query, plan, aggregated_text)
+        except Exception as e:
+            return self._aggregation_fallback(user_query, plan)
+    
+    def _prepare_aggregation(self, user_query: str, agent_responses: dict):
+        """
+        Collect usable agent responses and build the aggregation prompt
+        
+        Returns:
+            Dictionary with the aggregation prompt and inputs; "answer" is set
+            when no LLM call is needed
+        """
         # Extract both responses and raw schedule data
         clean_responses = {}
         schedule_data = {}
@@ -466,13 +929,27 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
                         if docs:
                             schedule_data[agent_name] = docs
         
-        # If no clean responses, return helpful message
-        if not clean_responses:
-            return "I couldn't retrieve schedule information at this time. Please try again in a moment."
+        is_comparison_query = COMPARISON_INTENT in self._scan(user_query)
         
-        # If only one agent responded, return their response directly
-        if len(clean_responses) == 1:
-            return list(clean_responses.values())[0]
+        if not clean_responses:
+            # No clean responses - answer with a helpful message
+            answer = "I couldn't retrieve schedule information at this time. Please try again in a moment."
+        elif not self.aggregation_policy(user_query, clean_responses, is_comparison_query):
+            # Nothing to merge (e.g. a single agent answered) - skip the aggregation LLM call
+            print(f"⚡ [ORCHESTRATOR] Passing through {len(clean_responses)} agent answer(s) without an aggregation call")
+            answer = self._passthrough_answer(clean_responses)
+        else:
+            answer = None
+        
+        plan = {
+            "answer": answer,
+            "clean_responses": clean_responses,
+            "schedule_data": schedule_data,
+            "is_comparison_query": is_comparison_query,
+            "prompt": None
+        }
+        if answer is not None:
+            return plan
         
         # Prepare detailed context with both responses and raw schedule data
         context_parts = []
@@ -480,6 +957,9 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
         
         user1_schedules = []
         user2_schedules = []
+        # The aggregation context budget is shared by the agents' schedule timelines
+        budget = get_task_profile("aggregate").context_tokens
+        agent_budget = budget // max(len(schedule_data), 1) if budget else None
         
         for agent_name, resp in clean_responses.items():
             user_name = "User 1" if "Agent 1" in agent_name or "1" in agent_name else "User 2"
@@ -488,12 +968,10 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
             # Extract and organize schedule data
             if agent_name in schedule_data:
                 schedules = schedule_data[agent_name]
-                schedule_list = []
-                for doc in schedules[:5]:  # Use first 5 results
-                    schedule_list.append(f"- {doc}")
+                timeline = build_schedule_context(agent_responses[agent_name]['relevant_data'], agent_budget)
                 
-                if schedule_list:
-                    schedule_info_parts.append(f"{user_name} Schedule Data:\n" + "\n".join(schedule_list))
+                if timeline:
+                    schedule_info_parts.append(f"{user_name} Schedule Data:\n{timeline}")
                     # Store for comparison
                     if "1" in agent_name or "Agent 1" in agent_name:
                         user1_schedules = schedules
@@ -504,216 +982,106 @@ Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversa
         schedule_info = "\n\n---\n\n".join(schedule_info_parts) if schedule_info_parts else ""
         
         # Enhanced prompt that specifically asks for comparison and merging
-        query_lower = user_query.lower()
-        is_comparison_query = any(word in query_lower for word in [
-            'common', 'both', 'all', 'together', 'everyone', 'compare', 
-            'free time', 'available', 'meeting', 'when', 'schedule'
-        ])
-        
         if is_comparison_query and len(schedule_data) >= 2:
             # Concise comparison prompt - only summary
-            prompt = f"""You are an Orchestrator Agent that COMPARES schedules from multiple users.
-
-User's Question: "{user_query}"
-
-Individual Agent Responses:
-{context}
-
-Raw Schedule Data from Database:
-{schedule_info}
-
-CRITICAL: Provide ONLY a concise summary answer. NO detailed breakdowns, NO bullet points, NO sections.
-
-Instructions:
-1. Compare both users' schedules
-2. Find common free times (when both users are free)
-3. Provide ONLY a brief summary (2-3 sentences maximum)
-
-Format: Write a simple, conversational answer stating when both users are free together. If no common time, say so briefly.
-
-Example: "Based on comparing both schedules, you both have free time on Sunday from 1:00 PM to 2:30 PM, and after 9:00 PM."
-
-Provide ONLY the summary answer (no bullet points, no sections, no detailed breakdowns):"""
+            prompt = AGGREGATE_COMPARISON.render(user_query=user_query, context=context, schedule_info=schedule_info)
         else:
             # Standard aggregation for non-comparison queries - concise summary only
-            prompt = f"""You are an Orchestrator Agent coordinating between multiple users' schedules.
-
-User's Question: "{user_query}"
-
-Responses from agents:
-{context}
-
-{schedule_info if schedule_info else ""}
-
-Your task: Provide ONLY a concise summary answer (2-3 sentences maximum).
-
-Guidelines:
-- Be conversational and natural
-- Provide specific information (times, days, activities) when available
-- Keep it brief - just the essential answer
-- NO bullet points, NO sections, NO detailed breakdowns
-- Just a simple, direct answer to the question
-
-Provide your concise response:"""
-
-        try:
-            # Use more retries for aggregation to ensure we get a response
-            # Use DeepSeek or Gemini based on initialization
-            if self.use_deepseek:
-                response = generate_content_with_deepseek(self.client, prompt, max_retries=3, base_delay=1.0)
-                aggregated_text = get_deepseek_response_text(response).strip()
-            else:
-                response = generate_content_with_retry(self.model, prompt, max_retries=3, base_delay=1.0)
-                aggregated_text = get_response_text(response).strip()
-            
-            # Post-process to clean up response - remove ALL markdown formatting
-            aggregated_text = aggregated_text.replace('**', '').replace('*', '').replace('__', '').replace('_', '').replace('•', '')
-            
-            if is_comparison_query:
-                # If response has too much detail (multiple lines, sections), extract just the summary
-                if aggregated_text.count('\n') > 5:
-                    # Try to extract just the summary part
-                    lines = aggregated_text.split('\n')
-                    summary_lines = []
-                    in_summary = False
+            prompt = AGGREGATE_SUMMARY.render(user_query=user_query, context=context, schedule_info=schedule_info)
+        
+        plan["prompt"] = prompt
+        return plan
+    
+    def _passthrough_answer(self, clean_responses: dict):
+        """
+        Combine agent answers deterministically (no LLM call)
+        
+        A single answer is returned as is, tidied; several are listed under their user's name.
+        """
+        answers = {
+            agent_name: re.sub(r'\n{3,}', '\n\n', response.replace('**', '').replace('__', '').strip())
+            for agent_name, response in clean_responses.items()
+        }
+        if len(answers) == 1:
+            return next(iter(answers.values()))
+        return "\n\n".join(f"{self._user_label(agent_name)}: {answer}" for agent_name, answer in answers.items())
+    
+    def _finish_aggregation(self, user_query: str, plan: dict, aggregated_text: str):
+        """Post-process the aggregation LLM output into the final answer"""
+        # Post-process to clean up response - remove ALL markdown formatting
+        aggregated_text = aggregated_text.replace('**', '').replace('*', '').replace('__', '').replace('_', '').replace('•', '')
+        
+        if plan["is_comparison_query"]:
+            # If response has too much detail (multiple lines, sections), extract just the summary
+            if aggregated_text.count('\n') > 5:
+                # Try to extract just the summary part
+                lines = aggregated_text.split('\n')
+                summary_lines = []
+                in_summary = False
+                
+                for line in lines:
+                    line_lower = line.lower()
+                    # Look for summary section
+                    if 'summary' in line_lower or 'best' in line_lower or 'common free time' in line_lower:
+                        in_summary = True
+                        # Extract the actual summary text (skip headers)
+                        if ':' in line and len(line.split(':')) > 1:
+                            summary_lines.append(line.split(':', 1)[1].strip())
+                        continue
                     
-                    for line in lines:
-                        line_lower = line.lower()
-                        # Look for summary section
-                        if 'summary' in line_lower or 'best' in line_lower or 'common free time' in line_lower:
-                            in_summary = True
-                            # Extract the actual summary text (skip headers)
-                            if ':' in line and len(line.split(':')) > 1:
-                                summary_lines.append(line.split(':', 1)[1].strip())
-                            continue
-                        
-                        # If we're in summary and hit another section, stop
-                        if in_summary and (line.strip().startswith('**') or line.strip().startswith('•') or 
-                                          'conflict' in line_lower or 'schedule' in line_lower and ':' in line):
-                            break
-                        
-                        if in_summary and line.strip():
-                            summary_lines.append(line.strip())
+                    # If we're in summary and hit another section, stop
+                    if in_summary and (line.strip().startswith('**') or line.strip().startswith('•') or 
+                                      'conflict' in line_lower or 'schedule' in line_lower and ':' in line):
+                        break
                     
-                    if summary_lines:
-                        aggregated_text = ' '.join(summary_lines)
-                    else:
-                        # Fallback: use computation-based summary
-                        aggregated_text = self._create_comparison_fallback(
-                            user_query, clean_responses, schedule_data
-                        )
-                elif not any(word in aggregated_text.lower() for word in ['free time', 'common', 'available', 'overlap', 'conflict']):
-                    # Response doesn't seem to compare - use our computation
+                    if in_summary and line.strip():
+                        summary_lines.append(line.strip())
+                
+                if summary_lines:
+                    aggregated_text = ' '.join(summary_lines)
+                else:
+                    # Fallback: use computation-based summary
                     aggregated_text = self._create_comparison_fallback(
-                        user_query, clean_responses, schedule_data
+                        user_query, plan["clean_responses"], plan["schedule_data"]
                     )
-            
-            return aggregated_text
-        except Exception as e:
-            # Fallback: create comparison manually
-            if is_comparison_query and len(schedule_data) >= 2:
-                return self._create_comparison_fallback(user_query, clean_responses, schedule_data)
-            
-            # Standard fallback
-            if len(clean_responses) == 1:
-                return list(clean_responses.values())[0]
-            
-            responses_list = list(clean_responses.values())
-            if len(responses_list) == 2:
-                return f"{responses_list[0]}\n\n{responses_list[1]}"
-            return "\n\n".join(responses_list)
+            elif not any(word in aggregated_text.lower() for word in ['free time', 'common', 'available', 'overlap', 'conflict']):
+                # Response doesn't seem to compare - use our computation
+                aggregated_text = self._create_comparison_fallback(
+                    user_query, plan["clean_responses"], plan["schedule_data"]
+                )
+        
+        return aggregated_text
+    
+    def _aggregation_fallback(self, user_query: str, plan: dict):
+        """Answer without the aggregation LLM call (used when it fails)"""
+        # Fallback: create comparison manually
+        if plan["is_comparison_query"] and len(plan["schedule_data"]) >= 2:
+            return self._create_comparison_fallback(user_query, plan["clean_responses"], plan["schedule_data"])
+        
+        # Standard fallback
+        if len(plan["clean_responses"]) == 1:
+            return list(plan["clean_responses"].values())[0]
+        
+        responses_list = list(plan["clean_responses"].values())
+        if len(responses_list) == 2:
+            return f"{responses_list[0]}\n\n{responses_list[1]}"
+        return "\n\n".join(responses_list)
     
     def _parse_schedule_times(self, schedule_text: str):
         """Parse schedule text to extract time ranges"""
-        import re
-        time_ranges = []
-        
-        # Pattern to match time ranges like "09:30-10:00" or "11:00-13:00"
-        time_pattern = r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})'
-        matches = re.findall(time_pattern, schedule_text)
-        
-        for match in matches:
-            start_hour, start_min = int(match[0]), int(match[1])
-            end_hour, end_min = int(match[2]), int(match[3])
-            
-            start_minutes = start_hour * 60 + start_min
-            end_minutes = end_hour * 60 + end_min
-            
-            time_ranges.append((start_minutes, end_minutes))
-        
-        # Also look for single times like "Break 14:30" - treat as 30 min block
-        single_time_pattern = r'(\d{1,2}):(\d{2})(?!\s*-\s*\d)'
-        single_matches = re.findall(single_time_pattern, schedule_text)
-        
-        for match in single_matches:
-            hour, minute = int(match[0]), int(match[1])
-            start_minutes = hour * 60 + minute
-            end_minutes = start_minutes + 30  # Default 30 min for single times
-            time_ranges.append((start_minutes, end_minutes))
-        
-        return sorted(time_ranges)
+        return parse_schedule_times(schedule_text)
     
     def _merge_time_ranges(self, time_ranges):
         """Merge overlapping time ranges"""
-        if not time_ranges:
-            return []
-        
-        sorted_ranges = sorted(time_ranges)
-        merged = [sorted_ranges[0]]
-        
-        for current_start, current_end in sorted_ranges[1:]:
-            last_start, last_end = merged[-1]
-            
-            # If current range overlaps or is adjacent to last range, merge them
-            if current_start <= last_end:
-                merged[-1] = (last_start, max(last_end, current_end))
-            else:
-                merged.append((current_start, current_end))
-        
-        return merged
+        return merge_time_ranges(time_ranges)
     
-    def _find_common_free_time(self, user1_times, user2_times):
-        """Find common free time between two users' schedules"""
-        # Merge overlapping intervals for each user
-        user1_merged = self._merge_time_ranges(user1_times)
-        user2_merged = self._merge_time_ranges(user2_times)
-        
-        # Combine all busy times
-        all_busy = sorted(user1_merged + user2_merged)
-        
-        # Merge overlapping intervals across both users
-        merged = self._merge_time_ranges(all_busy)
-        
-        # Find free time gaps (assuming day is 0-1440 minutes = 24 hours)
-        free_times = []
-        day_start = 0  # 00:00
-        day_end = 1440  # 24:00
-        
-        if not merged:
-            return [(day_start, day_end)]
-        
-        # Check before first busy period
-        if merged[0][0] > day_start:
-            free_times.append((day_start, merged[0][0]))
-        
-        # Check between busy periods
-        for i in range(len(merged) - 1):
-            gap_start = merged[i][1]
-            gap_end = merged[i + 1][0]
-            if gap_end > gap_start:
-                free_times.append((gap_start, gap_end))
-        
-        # Check after last busy period
-        if merged[-1][1] < day_end:
-            free_times.append((merged[-1][1], day_end))
-        
-        return free_times
+    def _find_common_free_time(self, *user_times, day_start: int = 0, day_end: int = 1440):
+        """Find common free time between any number of users' schedules"""
+        return find_common_free_time(user_times, day_start=day_start, day_end=day_end)
     
     def _format_time(self, minutes):
         """Convert minutes since midnight to HH:MM format"""
-        hours = minutes // 60
-        mins = minutes % 60
-        return f"{hours:02d}:{mins:02d}"
+        return format_time(minutes)
     
     def _create_comparison_fallback(self, user_query: str, clean_responses: dict, schedule_data: dict):
         """Create a comparison answer by actually computing overlaps and free times"""
@@ -775,7 +1143,7 @@ Provide your concise response:"""
         
         return answer if answer else "I couldn't extract schedule times for comparison. Please ensure schedules include time information."
     
-    def smart_query(self, user_query: str, conversation_history: list = None):
+    def smart_query(self, user_query: str, conversation_history: list = None, deadline: Deadline = None):
         """
         Intelligently route query to relevant agents or query all
         This method now uses the same intelligent routing as query_all_agents
@@ -783,12 +1151,13 @@ Provide your concise response:"""
         Args:
             user_query: The user's query
             conversation_history: Optional conversation history for context
+            deadline: Optional request deadline
             
         Returns:
             Response from relevant agents
         """
         # Use the same intelligent routing logic
-        return self.query_all_agents(user_query, conversation_history)
+        return self.query_all_agents(user_query, conversation_history, deadline)
     
     def get_all_agent_data_summary(self):
         """
@@ -814,12 +1183,49 @@ Provide your concise response:"""
         
         return summary
     
-    def find_common_free_time(self, user_query: str):
+    def build_availability_matrix(self, busy_by_agent: dict, days: list = None, slot_minutes: int = 1):
+        """
+        Pack every agent's busy intervals into a vectorized availability matrix
+        
+        Args:
+            busy_by_agent: Mapping of agent name to schedule_busy_by_day() output
+            days: Day labels to track (defaults to default_days())
+            slot_minutes: Slot granularity in minutes (1 keeps results exact)
+            
+        Returns:
+            AvailabilityMatrix keyed by user label (e.g. "User 1")
+        """
+        return AvailabilityMatrix.from_busy_by_day(
+            {self._user_label(agent_name): busy for agent_name, busy in busy_by_agent.items()},
+            days=days or default_days(busy_by_agent),
+            slot_minutes=slot_minutes
+        )
+    
+    def _user_label(self, agent_name: str):
+        """Map an agent name to the user it represents (e.g. "Agent 2" -> "User 2")"""
+        if agent_name.startswith('Agent'):
+            return agent_name.replace('Agent', 'User', 1)
+        return agent_name
+    
+    def find_common_free_time(self, user_query: str, response_mode: str = "llm", min_duration: int = 30,
+                              day_start: int = 0, day_end: int = 1440, deadline: Deadline = None):
         """
         Enable agents to communicate with each other to find common free time
         
+        Busy intervals are extracted from every agent's stored schedules and
+        intersected per day in one availability matrix, for any number of
+        agents, without an LLM call.
+        The LLM is used at most once to phrase the computed slots.
+        
         Args:
             user_query: User's query about finding common time
+            response_mode: "llm" to phrase the result with a single LLM call,
+                           "plain" to return the computed summary directly
+            min_duration: Minimum length (minutes) of a reported free slot
+            day_start: Start of the daily search window (minutes since midnight)
+            day_end: End of the daily search window (minutes since midnight)
+            deadline: Optional request deadline for the phrasing call (the
+                      computed summary is used once it is spent)
             
         Returns:
             Result with common free time analysis
@@ -877,137 +1283,65 @@ Provide your concise response:"""
                         print(f"   Error: {str(e)}")
                         print("-" * 70 + "\n")
         
-        # Step 3: Each agent analyzes for common free time
-        print("🔍 [AGENTS] Analyzing schedules for common free time...\n")
+        # Step 3: Compute busy and common free time deterministically
+        print("🧮 [ORCHESTRATOR] Computing common free time from schedule intervals...\n")
+        
+        engine_start = time.perf_counter()
+        busy_by_agent = {
+            agent_name: schedule_busy_by_day(schedules)
+            for agent_name, schedules in all_agent_schedules.items()
+        }
+        matrix = self.build_availability_matrix(busy_by_agent, days=days_from_query(user_query))
+        common_free = matrix.common_free_slots(min_duration=min_duration, day_start=day_start, day_end=day_end)
+        plain_response = format_free_time_summary(common_free)
+        engine_time_ms = (time.perf_counter() - engine_start) * 1000
         
         agent_analyses = {}
+        for agent_name, busy_by_day in busy_by_agent.items():
+            user_name = self._user_label(agent_name)
+            busy_times = {}
+            for day in common_free:
+                busy = busy_for_day(busy_by_day, day)
+                if busy:
+                    busy_times[day] = format_intervals(busy)
+            
+            if busy_times:
+                analysis = f"{user_name} is busy at " + "; ".join(
+                    intervals if day == DAILY else f"{day} {intervals}"
+                    for day, intervals in busy_times.items()
+                )
+            else:
+                analysis = f"{user_name} has no scheduled commitments"
+            
+            agent_analyses[agent_name] = {
+                "analysis": analysis,
+                "busy_times": busy_times,
+                "status": "success"
+            }
+            print(f"✓ [{agent_name}] {analysis[:150]}")
         
-        for agent_name, agent in self.agents.items():
+        print(f"\n   Computed in {engine_time_ms * 1000:.0f} µs")
+        print(f"   {plain_response}")
+        print("-" * 70 + "\n")
+        
+        # Step 4: Phrase the computed result (at most one LLM call)
+        if response_mode == "plain" or not any(common_free.values()):
+            aggregated_response = plain_response
+        else:
+            print("🔄 [ORCHESTRATOR] Phrasing computed free time...\n")
+            users = ', '.join(self._user_label(agent_name) for agent_name in all_agent_schedules)
+            phrasing_prompt = COMMON_TIME_PHRASING.render(user_query=user_query, users=users, plain_response=plain_response)
+            
             try:
-                print(f"🧠 [{agent_name}] Analyzing all schedules...")
-                
-                # Prepare context with all schedules, clearly labeled by user
-                user_assignment = {
-                    "Agent 1": "User 1",
-                    "Agent 2": "User 2"
-                }
-                
-                all_schedules_context = ""
-                for agent_name_schedule, schedules in all_agent_schedules.items():
-                    user_name = user_assignment.get(agent_name_schedule, "Unknown User")
-                    all_schedules_context += f"\n[{agent_name_schedule} - {user_name}'s Schedule]:\n"
-                    if schedules['documents']:
-                        for idx, doc in enumerate(schedules['documents']):
-                            metadata = schedules['metadatas'][idx] if schedules['metadatas'] else {}
-                            all_schedules_context += f"- {doc}\n"
-                            if metadata:
-                                all_schedules_context += f"  Metadata: {metadata}\n"
-                    else:
-                        all_schedules_context += f"  {user_name} has no scheduled commitments\n"
-                
-                # Query agent to analyze common free time
-                # Each agent represents a different user
-                user_assignment = {
-                    "Agent 1": "User 1",
-                    "Agent 2": "User 2"
-                }
-                
-                analysis_prompt = f"""You are {agent_name}, managing schedules for {user_assignment.get(agent_name, 'your user')}.
-
-User Query: {user_query}
-
-IMPORTANT: Each agent represents a DIFFERENT user:
-- Agent 1 manages User 1's schedule
-- Agent 2 manages User 2's schedule
-
-All User Schedules (from all agents):
-{all_schedules_context}
-
-Your task:
-1. Identify which schedules belong to which user (based on which agent provided them)
-2. Extract busy times for each user separately
-3. Find time slots when ALL users are free simultaneously
-4. Provide SPECIFIC time recommendations when all users are available
-
-Consider:
-- Agent 1's schedules = User 1's commitments
-- Agent 2's schedules = User 2's commitments
-- Find overlapping FREE periods (not busy periods)
-- Give specific time recommendations (e.g., "Both users are free from 2 PM to 3 PM")
-
-Respond with a clear answer showing when ALL users are free together."""
-                
-                # Use DeepSeek or Gemini based on initialization
-                if self.use_deepseek:
-                    response = generate_content_with_deepseek(self.client, analysis_prompt, max_retries=2, base_delay=0.5)
-                    analysis_text = get_deepseek_response_text(response)
-                else:
-                    response = generate_content_with_retry(self.model, analysis_prompt)
-                    analysis_text = get_response_text(response)
-                
-                agent_analyses[agent_name] = {
-                    "analysis": analysis_text,
-                    "status": "success"
-                }
-                
-                print(f"✓ [{agent_name}] Analysis complete")
-                print(f"  Preview: {analysis_text[:150]}...")
-                print("-" * 70 + "\n")
+                with deadline_scope(deadline):
+                    aggregated_response = self._generate_text(phrasing_prompt, max_retries=2, base_delay=0.5, task="summarize", label="orchestrator.common_time").strip()
                 
+                aggregated_response = aggregated_response.replace('**', '').replace('*', '').replace('__', '').replace('•', '')
+                if not aggregated_response:
+                    aggregated_response = plain_response
             except Exception as e:
-                agent_analyses[agent_name] = {
-                    "analysis": f"Error: {str(e)}",
-                    "status": "error",
-                    "error": str(e)
-                }
-                print(f"✗ [{agent_name}] Analysis failed: {str(e)}")
-                print("-" * 70 + "\n")
-        
-        # Step 4: Aggregate final response
-        print("🔄 [ORCHESTRATOR] Aggregating agent-to-agent communication results...\n")
-        
-        # Create final aggregated response
-        aggregation_prompt = f"""You are the Orchestrator Agent. The agents have communicated with each other.
-
-User Query: {user_query}
-
-IMPORTANT CONTEXT:
-- Agent 1 manages User 1's schedule
-- Agent 2 manages User 2's schedule
-- Each agent represents a DIFFERENT user
-
-Agent Analyses:
-"""
-        
-        for agent_name, analysis in agent_analyses.items():
-            aggregation_prompt += f"\n[{agent_name} - Represents {('User 1' if '1' in agent_name else 'User 2')}]:\n{analysis['analysis']}\n"
-        
-        aggregation_prompt += """
-
-Provide ONLY a PRECISE, CONCISE answer. No explanations, no theory, just the answer.
-
-Format your response as:
-"Common free time: [specific times when all users are free]"
-
-If no common time exists, respond: "No common free time available"
-
-Keep it brief - maximum 2-3 sentences. Just the answer."""
-        
-        try:
-            # Use DeepSeek or Gemini based on initialization
-            if self.use_deepseek:
-                final_response = generate_content_with_deepseek(self.client, aggregation_prompt, max_retries=3, base_delay=1.0)
-                aggregated_response = get_deepseek_response_text(final_response)
-            else:
-                final_response = generate_content_with_retry(self.model, aggregation_prompt)
-                aggregated_response = get_response_text(final_response)
-        except Exception as e:
-            # Fallback aggregation
-            aggregated_response = "\n\n".join([
-                f"{name}: {analysis['analysis']}"
-                for name, analysis in agent_analyses.items()
-                if analysis['status'] == 'success'
-            ])
+                print(f"⚠️  [ORCHESTRATOR] Phrasing failed, using computed summary: {str(e)}")
+                aggregated_response = plain_response
         
         print(f"📤 [ORCHESTRATOR → USER]")
         print(f"   Status: ✓ Ready")
@@ -1019,7 +1353,14 @@ Keep it brief - maximum 2-3 sentences. Just the answer."""
             "agent_schedules": all_agent_schedules,
             "agent_comparisons": agent_comparisons,
             "agent_analyses": agent_analyses,
+            "common_free_time": {
+                day: [
+                    {"start": format_time(start), "end": format_time(end), "minutes": end - start}
+                    for start, end in slots
+                ]
+                for day, slots in common_free.items()
+            },
+            "engine_time_ms": engine_time_ms,
             "aggregated_response": aggregated_response,
             "timestamp": datetime.now().isoformat()
         }
-
@@ -0,0 +1,131 @@
+"""
+Shared background event loop for async LLM calls
+
+Synchronous code (Flask handlers, CLI) submits coroutines to one
+long-lived event loop running in a daemon thread, so async clients and
+their connection pools are created once and reused across requests.
+
+Blocking work the loop offloads (asyncio.to_thread: vector searches,
+context cache lookups) runs on one bounded, process-wide worker pool.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Awaitable, Dict, Optional
+
+from core.config import AGENT_EXECUTOR_WORKERS
+
+_loop = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get (and start on first use) the shared background event loop"""
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _loop.set_default_executor(get_executor())
+            thread = threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True)
+            thread.start()
+        return _loop
+
+
+class _CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    """ThreadPoolExecutor that counts submitted, running and completed work items"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counts_lock = threading.Lock()
+        self._counts = {"submitted": 0, "running": 0, "completed": 0}
+
+    def submit(self, fn, *args, **kwargs):
+        with self._counts_lock:
+            self._counts["submitted"] += 1
+        try:
+            future = super().submit(self._run, fn, *args, **kwargs)
+        except BaseException:
+            with self._counts_lock:
+                self._counts["submitted"] -= 1
+            raise
+        # Also fires for items cancelled while still queued
+        future.add_done_callback(self._completed)
+        return future
+
+    def _run(self, fn, *args, **kwargs):
+        with self._counts_lock:
+            self._counts["running"] += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._counts_lock:
+                self._counts["running"] -= 1
+
+    def _completed(self, future):
+        with self._counts_lock:
+            self._counts["completed"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._counts_lock:
+            stats = dict(self._counts)
+        stats["queue_depth"] = max(stats["submitted"] - stats["running"] - stats["completed"], 0)
+        return stats
+
+
+def get_executor() -> "concurrent.futures.ThreadPoolExecutor":
+    """The shared worker pool (AGENT_EXECUTOR_WORKERS threads) used by the background loop"""
+    global _executor
+    if _executor is None:
+        _executor = _CountingExecutor(max_workers=AGENT_EXECUTOR_WORKERS, thread_name_prefix="agent-worker")
+    return _executor
+
+
+def get_executor_stats() -> Dict[str, int]:
+    """Size, load and queue depth of the shared worker pool"""
+    executor = _executor
+    if executor is None:
+        stats = {"submitted": 0, "running": 0, "completed": 0, "queue_depth": 0}
+    else:
+        stats = executor.stats()
+    stats["max_workers"] = AGENT_EXECUTOR_WORKERS
+    return stats
+
+
+def submit_async(coro: Awaitable[Any]) -> "concurrent.futures.Future":
+    """Schedule a coroutine on the shared background loop and return a concurrent.futures.Future"""
+    loop = get_background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("Cannot block on the background loop from inside it - await the coroutine instead")
+
+    return asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), loop)
+
+
+async def _in_context(coro: Awaitable[Any], context: contextvars.Context) -> Any:
+    """Await coro with the submitting thread's context variables (e.g. LLM call labels)"""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run_async(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared background loop and wait for its result
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait before giving up (the coroutine is cancelled)
+    """
+    future = submit_async(coro)
+    try:
+        return future.result(timeout)
+    except Exception:
+        future.cancel()
+        raise
@@ -0,0 +1,110 @@
+"""
+Vectorized availability matrix for large groups of users
+
+Each user's busy time is stored as a packed bit array with one bit per
+slot (5 minutes by default) per weekday. Group questions such as "when
+are these 40 people free this week" become a single bitwise OR over the
+user axis instead of pairwise interval merging.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.schedule_engine import WEEKDAYS, DAY_MINUTES, busy_for_day
+
+Interval = Tuple[int, int]
+
+
+class AvailabilityMatrix:
+    """Busy bitmaps for many users, shaped (users, days, slots) and bit-packed along slots"""
+
+    def __init__(self, users: List[str], days: Optional[List[str]] = None, slot_minutes: int = 5):
+        if DAY_MINUTES % slot_minutes:
+            raise ValueError(f"slot_minutes must divide {DAY_MINUTES}, got {slot_minutes}")
+
+        self.users = list(users)
+        self.days = list(days or WEEKDAYS)
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = DAY_MINUTES // slot_minutes
+        self._user_index = {user: idx for idx, user in enumerate(self.users)}
+
+        # One bit per slot; 288 five-minute slots pack into 36 bytes per user per day
+        self.packed = np.zeros(
+            (len(self.users), len(self.days), (self.slots_per_day + 7) // 8),
+            dtype=np.uint8
+        )
+
+    @classmethod
+    def from_busy_by_day(cls, user_busy: Dict[str, dict], days: Optional[List[str]] = None, slot_minutes: int = 5):
+        """Build from a mapping of user name to schedule_busy_by_day() output"""
+        matrix = cls(list(user_busy), days=days, slot_minutes=slot_minutes)
+        for user, busy_by_day in user_busy.items():
+            bits = np.zeros((len(matrix.days), matrix.slots_per_day), dtype=bool)
+            for day_idx, day in enumerate(matrix.days):
+                for start, end in busy_for_day(busy_by_day, day):
+                    first, last = matrix._slot_range(start, end)
+                    bits[day_idx, first:last] = True
+            matrix.packed[matrix._user_index[user]] = np.packbits(bits, axis=-1)
+        return matrix
+
+    def _slot_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Slots touched by [start, end) - partially busy slots count as busy"""
+        first = max(start, 0) // self.slot_minutes
+        last = -(-min(end, DAY_MINUTES) // self.slot_minutes)
+        return first, last
+
+    def _rows(self, users: Optional[List[str]]):
+        """Index of the selected users (all users when None)"""
+        if users is None:
+            return slice(None)
+        return [self._user_index[user] for user in users]
+
+    def _window(self, day_start: int, day_end: int) -> np.ndarray:
+        """Boolean slot mask for [day_start, day_end), rounded inwards"""
+        mask = np.zeros(self.slots_per_day, dtype=bool)
+        first = -(-day_start // self.slot_minutes)
+        last = day_end // self.slot_minutes
+        mask[first:last] = True
+        return mask
+
+    def busy(self, users: Optional[List[str]] = None) -> np.ndarray:
+        """Unpacked busy bits, shaped (users, days, slots)"""
+        return np.unpackbits(self.packed[self._rows(users)], axis=-1, count=self.slots_per_day).astype(bool)
+
+    def free_mask(self, users: Optional[List[str]] = None, day_start: int = 0, day_end: int = DAY_MINUTES) -> np.ndarray:
+        """Slots where every selected user is free, shaped (days, slots)"""
+        busy_any = np.bitwise_or.reduce(self.packed[self._rows(users)], axis=0)
+        free = ~np.unpackbits(busy_any, axis=-1, count=self.slots_per_day).astype(bool)
+        return free & self._window(day_start, day_end)
+
+    def heatmap(self, users: Optional[List[str]] = None) -> np.ndarray:
+        """Number of free users per slot, shaped (days, slots)"""
+        busy = self.busy(users)
+        return busy.shape[0] - busy.sum(axis=0, dtype=np.int32)
+
+    def common_free_slots(
+        self,
+        users: Optional[List[str]] = None,
+        min_duration: int = 0,
+        day_start: int = 0,
+        day_end: int = DAY_MINUTES
+    ) -> Dict[str, List[Interval]]:
+        """Common free intervals (minutes since midnight) per day for the selected users"""
+        free = self.free_mask(users, day_start, day_end)
+
+        # Run boundaries: +1 where a free run starts, -1 where it ends
+        padded = np.zeros((free.shape[0], free.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = free
+        edges = np.diff(padded, axis=1)
+
+        result = {}
+        for day_idx, day in enumerate(self.days):
+            starts = np.flatnonzero(edges[day_idx] == 1)
+            ends = np.flatnonzero(edges[day_idx] == -1)
+            result[day] = [
+                (int(start) * self.slot_minutes, int(end) * self.slot_minutes)
+                for start, end in zip(starts, ends)
+                if (end - start) * self.slot_minutes >= min_duration
+            ]
+        return result
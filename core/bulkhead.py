@@ -0,0 +1,133 @@
+"""
+Bulkheads: per-agent limits on concurrent queries
+
+Every agent gets its own compartment of at most max_concurrent queries in
+flight and max_queue waiting. When both are full the query fails fast with
+BulkheadFull instead of piling up on the shared worker threads, so one slow
+agent can't starve the others under concurrent web traffic. Waiting queries
+are admitted in arrival order.
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class BulkheadFull(Exception):
+    """Raised when an agent's bulkhead has no free slot and no room in its queue"""
+
+
+class Bulkhead:
+    """Asyncio concurrency limit with a bounded FIFO queue (thread-safe bookkeeping)"""
+
+    def __init__(self, name: str, max_concurrent: int = 8, max_queue: int = 16):
+        """
+        Args:
+            name: Label used in errors and stats (e.g. the agent name)
+            max_concurrent: Queries allowed in flight
+            max_queue: Queries allowed to wait for a slot (0 = reject as soon as all slots are busy)
+        """
+        self.name = name
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_queue = max(max_queue, 0)
+        self._lock = threading.Lock()
+        self._waiters = deque()  # (event loop, future) of queued queries
+        self._in_flight = 0
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "timeouts": 0,
+                       "wait_seconds": 0.0, "peak_in_flight": 0, "peak_queue": 0}
+
+    @property
+    def saturated(self) -> bool:
+        """True when a new query would have to wait (or be rejected)"""
+        with self._lock:
+            return self._in_flight >= self.max_concurrent or bool(self._waiters)
+
+    def _admit(self):
+        self._in_flight += 1
+        self._stats["admitted"] += 1
+        self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Wait for a slot (pair with release)
+
+        Raises:
+            BulkheadFull: The queue is full, or no slot freed up within timeout
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self.max_concurrent and not self._waiters:
+                self._admit()
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise BulkheadFull(
+                    f"{self.name} is overloaded ({self._in_flight} in flight, {len(self._waiters)} queued)"
+                )
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+            self._stats["queued"] += 1
+            self._stats["peak_queue"] = max(self._stats["peak_queue"], len(self._waiters))
+
+        started = time.monotonic()
+        try:
+            # release() hands its slot straight to the first waiter
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            with self._lock:
+                if (loop, waiter) in self._waiters:
+                    self._waiters.remove((loop, waiter))
+                    granted = False
+                else:
+                    granted = waiter.done() and not waiter.cancelled()
+            if granted:
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise BulkheadFull(f"No slot for {self.name} within {timeout:.1f}s") from None
+            raise
+        finally:
+            with self._lock:
+                self._stats["wait_seconds"] += time.monotonic() - started
+
+    def release(self):
+        """Free a slot, handing it to the longest-waiting query if there is one"""
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if not waiter.done():
+                    loop.call_soon_threadsafe(self._grant, waiter)
+                    return
+            self._in_flight = max(self._in_flight - 1, 0)
+
+    def _grant(self, waiter: "asyncio.Future"):
+        if waiter.done():
+            # Cancelled while the slot was on its way - pass it on
+            self.release()
+        else:
+            with self._lock:
+                self._stats["admitted"] += 1
+            waiter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """Hold a slot for the duration of the block"""
+        await self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+            stats["queue_depth"] = sum(1 for _, waiter in self._waiters if not waiter.done())
+        stats["max_concurrent"] = self.max_concurrent
+        stats["max_queue"] = self.max_queue
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        return stats
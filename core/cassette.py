@@ -0,0 +1,156 @@
+"""
+Record/replay cassette for LLM calls
+
+In record mode every provider call (below the response cache and
+single-flight layers) is appended to a JSONL file with its response text,
+token usage and provider latency. In replay mode the same prompts are
+answered from the file, optionally sleeping for the recorded latency, so
+orchestrator changes can be benchmarked against real-shaped outputs
+without network access, and our own overhead can be separated from
+provider time.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from core.llm_cache import CachedResponse
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when a prompt was never recorded"""
+
+
+class ReplayedResponse(CachedResponse):
+    """Response served from a cassette (works with both text extractors and get_token_usage)"""
+
+    def __init__(self, text: str, provider: str = None, usage: Optional[Dict[str, int]] = None):
+        super().__init__(text, provider=provider)
+        self.cached = False
+        self.replayed = True
+        if usage:
+            self.usage = SimpleNamespace(
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+                total_tokens=usage.get("total_tokens"),
+                prompt_cache_hit_tokens=usage.get("cached_prompt_tokens")
+            )
+
+
+class LLMCassette:
+    """Thread-safe JSONL cassette of prompt -> response pairs with timing"""
+
+    def __init__(self, path: str, mode: str = REPLAY, replay_timing: bool = True, on_miss: str = "error"):
+        """
+        Args:
+            path: JSONL file to append to (record) or read from (replay)
+            mode: "record" or "replay"
+            replay_timing: Sleep for the recorded provider latency when replaying
+            on_miss: "error" raises CassetteMissError for unknown prompts, "live" calls the provider
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Invalid cassette mode '{mode}' (use record or replay)")
+        self.path = path
+        self.mode = mode
+        self.replay_timing = replay_timing
+        self.on_miss = on_miss
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._stats = {
+            "recorded": 0,
+            "replayed": 0,
+            "misses": 0,
+            "recorded_provider_seconds": 0.0,
+            "replayed_provider_seconds": 0.0
+        }
+
+        if mode == REPLAY:
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @staticmethod
+    def make_key(provider: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Key on provider, prompt and params (not the model, which depends on model discovery)"""
+        payload = json.dumps([provider, prompt, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            print(f"LLM cassette: {self.path} not found, nothing to replay")
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._entries[entry["key"]].append(entry)
+        print(f"LLM cassette: loaded {sum(len(e) for e in self._entries.values())} recorded calls from {self.path}")
+
+    def record(self, provider: str, model: str, prompt: str, params: Optional[Dict[str, Any]],
+               text: str, latency: float, usage: Optional[Dict[str, int]] = None):
+        """Append one provider call to the cassette"""
+        entry = {
+            "key": self.make_key(provider, prompt, params),
+            "provider": provider,
+            "model": model,
+            "prompt_preview": prompt[:120],
+            "response": text,
+            "latency": round(latency, 4),
+            "usage": usage or {},
+            "recorded_at": time.time()
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self._entries[entry["key"]].append(entry)
+            self._stats["recorded"] += 1
+            self._stats["recorded_provider_seconds"] += latency
+
+    def lookup(self, provider: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next recorded entry for this prompt, or None on a miss
+
+        Repeated prompts are replayed in recording order; the last recording
+        is reused once they run out.
+        """
+        key = self.make_key(provider, prompt, params)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self._stats["misses"] += 1
+                return None
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            entry = entries[min(position, len(entries) - 1)]
+            self._stats["replayed"] += 1
+            self._stats["replayed_provider_seconds"] += entry.get("latency", 0.0)
+            return entry
+
+    def miss(self, provider: str, prompt: str):
+        """Handle a replay miss: raise, or return so the caller goes live"""
+        if self.on_miss != "live":
+            raise CassetteMissError(f"No recorded {provider} response for prompt: {prompt[:80]!r}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["mode"] = self.mode
+            stats["path"] = self.path
+            stats["recorded_prompts"] = len(self._entries)
+        return stats
@@ -0,0 +1,146 @@
+"""
+Circuit breakers for LLM providers
+
+Each provider gets a breaker that watches the outcome of its recent calls.
+When too many of them fail or are too slow, the breaker opens and calls
+are rejected immediately (CircuitOpenError) instead of paying for the full
+retry ladder, so callers can switch to another provider or a deterministic
+fallback right away. After a cool-down one probe call is let through
+(half-open); if it succeeds the breaker closes again.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by the error and slow-call rate of recent calls"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_requests: int = 5,
+        window: int = 20,
+        slow_call_seconds: float = 30.0,
+        open_seconds: float = 30.0,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            name: Provider name used in errors and stats
+            failure_rate: Share of failed or slow calls in the window that opens the breaker
+            min_requests: Calls needed in the window before the rate is evaluated
+            window: Number of recent calls considered
+            slow_call_seconds: Successful calls slower than this count as failures
+            open_seconds: Time the breaker stays open before letting a probe through
+            enabled: When False the breaker only records stats and never rejects calls
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # True = healthy call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._next_probe_at = 0.0
+        self._stats = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        """State with the open -> half-open transition applied (lock must be held)"""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._next_probe_at = now
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may be sent now (half-open lets one probe through per cool-down)"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and now >= self._next_probe_at:
+                self._next_probe_at = now + self.open_seconds
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def would_allow(self) -> bool:
+        """Whether allow_request() would let a call through now, without using up the half-open probe"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return state == CLOSED or (state == HALF_OPEN and now >= self._next_probe_at)
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be sent"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit is open - provider marked unhealthy")
+
+    def record_success(self, latency: float):
+        """Record a successful call (slow calls count against the breaker)"""
+        slow = latency > self.slow_call_seconds
+        with self._lock:
+            self._stats["successes"] += 1
+            if slow:
+                self._stats["slow_calls"] += 1
+            if self._state == HALF_OPEN and not slow:
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._record(not slow)
+
+    def record_failure(self):
+        """Record a failed call (rate limit errors should not be recorded)"""
+        with self._lock:
+            self._stats["failures"] += 1
+            self._record(False)
+
+    def _record(self, healthy: bool):
+        """Add an outcome and open the breaker if needed (lock must be held)"""
+        self._outcomes.append(healthy)
+        now = time.monotonic()
+        if self._current_state(now) == HALF_OPEN and not healthy:
+            self._open(now)
+            return
+        if self._state == CLOSED and len(self._outcomes) >= self.min_requests:
+            unhealthy = self._outcomes.count(False)
+            if unhealthy / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._stats["opened"] += 1
+        print(f"Circuit breaker: {self.name} opened after repeated failures")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self._current_state(time.monotonic())
+            stats["window_calls"] = len(self._outcomes)
+            stats["window_failures"] = self._outcomes.count(False)
+        return stats
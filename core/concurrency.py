@@ -0,0 +1,267 @@
+"""
+Adaptive (AIMD) concurrency limits per API key
+
+Each API key gets a cap on the number of LLM calls in flight. Like TCP
+congestion control, the cap grows additively (about +1 per cap's worth of
+healthy calls) while latency stays near its smoothed baseline and few calls
+fail, and is cut multiplicatively on a 429 or a latency spike. Callers over
+the cap wait (threads on a condition, coroutines on a future) instead of
+sending requests that would only be rejected.
+
+Cuts happen at most once per smoothed latency, so a burst of 429s from
+calls that were already in flight counts as one congestion signal.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+SUCCESS = "success"
+RATE_LIMITED = "rate_limited"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+
+class ConcurrencyLimitTimeout(Exception):
+    """Raised when no call slot frees up within the allowed wait"""
+
+
+class AdaptiveConcurrencyLimiter:
+    """Thread-safe, asyncio-compatible AIMD limit on in-flight calls of one API key"""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_error_rate: float = 0.2,
+        smoothing: float = 0.1
+    ):
+        """
+        Args:
+            name: Label used in stats (never the raw API key)
+            initial_limit: Calls allowed in flight before any feedback
+            min_limit: Lowest cap (always at least one call)
+            max_limit: Highest cap
+            backoff: Factor the cap is multiplied by on congestion
+            latency_tolerance: Calls slower than this multiple of the baseline latency count as congestion
+            max_error_rate: Smoothed error rate above which the cap stops growing
+            smoothing: Weight of the newest sample in the latency and error averages
+        """
+        self.name = name
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._async_waiters = deque()  # (event loop, future) of coroutines waiting for a slot
+        self._limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self._in_flight = 0
+        self._sync_waiting = 0
+        self._baseline_latency = None
+        self._error_rate = 0.0
+        self._last_decrease = 0.0
+        self._stats = {"calls": 0, "waited": 0, "wait_seconds": 0.0, "increases": 0, "decreases": 0,
+                       "timeouts": 0, "peak_in_flight": 0}
+
+    @property
+    def limit(self) -> int:
+        """Current cap on calls in flight"""
+        with self._lock:
+            return self._cap()
+
+    def _cap(self) -> int:
+        return max(int(math.floor(self._limit)), 1)
+
+    def _take(self) -> bool:
+        if self._in_flight >= self._cap():
+            return False
+        self._in_flight += 1
+        self._stats["calls"] += 1
+        self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+        return True
+
+    def _waited(self, started: float):
+        self._stats["waited"] += 1
+        self._stats["wait_seconds"] += time.monotonic() - started
+
+    def _timed_out(self, timeout: float):
+        self._stats["timeouts"] += 1
+        return ConcurrencyLimitTimeout(
+            f"No call slot for {self.name} within {timeout:.1f}s ({self._in_flight}/{self._cap()} in flight)"
+        )
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Block until a call may be sent (pair with release)"""
+        with self._changed:
+            if self._take():
+                return
+            started = time.monotonic()
+            self._sync_waiting += 1
+            try:
+                has_slot = self._changed.wait_for(lambda: self._in_flight < self._cap(), timeout)
+            finally:
+                self._sync_waiting -= 1
+            if not has_slot:
+                raise self._timed_out(timeout)
+            self._take()
+            self._waited(started)
+
+    async def acquire_async(self, timeout: Optional[float] = None):
+        """Asyncio variant of acquire() that yields to the event loop while waiting"""
+        loop = asyncio.get_running_loop()
+        started = None
+        while True:
+            with self._lock:
+                if self._take():
+                    if started is not None:
+                        self._waited(started)
+                    return
+                if started is None:
+                    started = time.monotonic()
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            remaining = None if timeout is None else timeout - (time.monotonic() - started)
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise asyncio.TimeoutError()
+                # Woken by release(); the slot may be taken again by then, so loop
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    raise self._timed_out(timeout)
+
+    def release(self, latency: Optional[float] = None, outcome: str = SUCCESS):
+        """
+        Free a call slot and adjust the cap from the call's outcome
+
+        Args:
+            latency: Wall time of a successful call (None skips the latency check)
+            outcome: "success", "rate_limited", "error" or "cancelled" (no feedback)
+        """
+        with self._changed:
+            self._in_flight = max(self._in_flight - 1, 0)
+            if outcome != CANCELLED:
+                self._adjust(latency, outcome)
+            self._changed.notify_all()
+            waiters, self._async_waiters = self._async_waiters, deque()
+        for loop, waiter in waiters:
+            if not waiter.done():
+                loop.call_soon_threadsafe(_wake, waiter)
+
+    def _adjust(self, latency: Optional[float], outcome: str):
+        now = time.monotonic()
+        failed = outcome != SUCCESS
+        self._error_rate += self.smoothing * ((1.0 if failed else 0.0) - self._error_rate)
+
+        congested = outcome == RATE_LIMITED
+        window = self._baseline_latency or 1.0
+        if outcome == SUCCESS and latency is not None:
+            if self._baseline_latency is None:
+                self._baseline_latency = latency
+            else:
+                congested = latency > self._baseline_latency * self.latency_tolerance
+                # Lasting shifts (e.g. longer prompts) move the baseline within ~1/smoothing calls
+                self._baseline_latency += self.smoothing * (latency - self._baseline_latency)
+
+        if congested:
+            # One cut per smoothed latency: calls already in flight report the same congestion
+            if now - self._last_decrease >= window:
+                self._limit = max(self._limit * self.backoff, self.min_limit)
+                self._last_decrease = now
+                self._stats["decreases"] += 1
+        elif outcome == SUCCESS and self._error_rate <= self.max_error_rate:
+            previous = self._cap()
+            self._limit = min(self._limit + 1.0 / self._limit, self.max_limit)
+            if self._cap() > previous:
+                self._stats["increases"] += 1
+
+    @contextlib.contextmanager
+    def lease(self, timeout: Optional[float] = None, measure_latency: bool = True):
+        """
+        Hold a call slot for the duration of one call, reporting its outcome
+
+        Args:
+            timeout: Longest wait for a slot (None waits indefinitely)
+            measure_latency: False for streams, whose duration depends on the consumer
+        """
+        self.acquire(timeout)
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(outcome=classify_outcome(e))
+            raise
+        self.release(time.monotonic() - started if measure_latency else None)
+
+    @contextlib.asynccontextmanager
+    async def lease_async(self, timeout: Optional[float] = None):
+        """Asyncio variant of lease()"""
+        await self.acquire_async(timeout)
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(outcome=classify_outcome(e))
+            raise
+        self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["limit"] = self._cap()
+            stats["in_flight"] = self._in_flight
+            stats["waiting"] = self._sync_waiting + sum(1 for _, waiter in self._async_waiters if not waiter.done())
+            stats["baseline_latency"] = self._baseline_latency
+            stats["error_rate"] = round(self._error_rate, 3)
+        return stats
+
+
+def _wake(waiter: "asyncio.Future"):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def classify_outcome(error: BaseException) -> str:
+    """Map an exception raised by a call to the feedback it gives the limiter"""
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit, KeyboardInterrupt)):
+        return CANCELLED
+    message = str(error).lower()
+    if "429" in message or "quota" in message or "rate limit" in message:
+        return RATE_LIMITED
+    return ERROR
+
+
+class ConcurrencyLimiterRegistry:
+    """Hands out one shared AdaptiveConcurrencyLimiter per (provider, API key)"""
+
+    def __init__(self, **limiter_options):
+        self._options = limiter_options
+        self._limiters: Dict[Tuple[str, str], AdaptiveConcurrencyLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, api_key: Optional[str] = None) -> AdaptiveConcurrencyLimiter:
+        key_id = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8] if api_key else "default"
+        with self._lock:
+            limiter = self._limiters.get((provider, key_id))
+            if limiter is None:
+                limiter = AdaptiveConcurrencyLimiter(f"{provider}:{key_id}", **self._options)
+                self._limiters[(provider, key_id)] = limiter
+            return limiter
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.stats() for limiter in limiters}
@@ -16,6 +16,133 @@ GEMINI_API_KEY_ORCHESTRATOR = os.getenv("GEMINI_API_KEY_ORCHESTRATOR", GEMINI_AP
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 GEMINI_API_KEY_AGENT2 = os.getenv("GEMINI_API_KEY_AGENT2")  # Fallback if DeepSeek not available
 
+# LLM response cache (in-memory LRU + on-disk SQLite)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "10000"))
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llm_cache", "responses.sqlite3")
+)  # Set to an empty string to keep the cache in memory only
+
+# Client-side rate limits per API key (0 disables a budget)
+GEMINI_RATE_LIMIT_RPM = float(os.getenv("GEMINI_RATE_LIMIT_RPM", "60"))
+GEMINI_RATE_LIMIT_TPM = float(os.getenv("GEMINI_RATE_LIMIT_TPM", "0"))
+DEEPSEEK_RATE_LIMIT_RPM = float(os.getenv("DEEPSEEK_RATE_LIMIT_RPM", "60"))
+DEEPSEEK_RATE_LIMIT_TPM = float(os.getenv("DEEPSEEK_RATE_LIMIT_TPM", "0"))
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "60"))
+
+# End-to-end time budget of one web request (agents, retries, aggregation); 0 disables it
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "30"))
+
+# API key pool: calls are spread across every configured key of a provider
+LLM_KEY_POOL_ENABLED = os.getenv("LLM_KEY_POOL_ENABLED", "true").lower() == "true"
+LLM_KEY_POOL_POLICY = os.getenv("LLM_KEY_POOL_POLICY", "least_loaded").lower()  # least_loaded or remaining_quota
+# Extra keys for the pools (comma-separated), on top of the per-agent keys
+GEMINI_API_KEYS = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]
+DEEPSEEK_API_KEYS = [key.strip() for key in os.getenv("DEEPSEEK_API_KEYS", "").split(",") if key.strip()]
+
+# Adaptive (AIMD) cap on LLM calls in flight per API key: grows while calls are fast and healthy,
+# halves on 429s or latency spikes
+LLM_ADAPTIVE_CONCURRENCY = os.getenv("LLM_ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+LLM_CONCURRENCY_INITIAL = float(os.getenv("LLM_CONCURRENCY_INITIAL", "4"))
+LLM_CONCURRENCY_MIN = float(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = float(os.getenv("LLM_CONCURRENCY_MAX", "32"))
+LLM_CONCURRENCY_BACKOFF = float(os.getenv("LLM_CONCURRENCY_BACKOFF", "0.5"))
+LLM_CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("LLM_CONCURRENCY_LATENCY_TOLERANCE", "2.0"))  # Spike = slower than this x baseline
+
+# Shared HTTP connection pool for LLM clients
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "60"))
+
+# Hedged requests: send the prompt to the other provider when the primary is slow
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "2.0"))  # Until enough latencies are known
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.25"))
+LLM_HEDGE_MAX_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MAX_DELAY_SECONDS", "10"))
+
+# Circuit breakers: stop calling a provider after repeated failures or slow calls
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+CIRCUIT_BREAKER_MIN_REQUESTS = int(os.getenv("CIRCUIT_BREAKER_MIN_REQUESTS", "5"))
+CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20"))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "30"))
+CIRCUIT_BREAKER_OPEN_SECONDS = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30"))
+
+# Resolved Gemini model name per API key (skips model discovery on startup)
+GEMINI_MODEL_CACHE_TTL_SECONDS = float(os.getenv("GEMINI_MODEL_CACHE_TTL_SECONDS", "86400"))
+GEMINI_MODEL_CACHE_PATH = os.getenv(
+    "GEMINI_MODEL_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llm_cache", "gemini_models.json")
+)  # Set to an empty string to keep the cache in memory only
+
+# Model tier per task profile, e.g. "answer=fast,route=quality" (see core/task_profiles.py)
+LLM_TASK_TIERS = os.getenv("LLM_TASK_TIERS", "")
+# Token budget of the retrieved schedule context per task, e.g. "answer=400,aggregate=1200" (0 = no limit)
+LLM_CONTEXT_BUDGETS = os.getenv("LLM_CONTEXT_BUDGETS", "")
+
+# Token prices (USD per 1M tokens) used for per-call cost accounting
+GEMINI_INPUT_COST_PER_1M = float(os.getenv("GEMINI_INPUT_COST_PER_1M", "1.25"))
+GEMINI_OUTPUT_COST_PER_1M = float(os.getenv("GEMINI_OUTPUT_COST_PER_1M", "10.0"))
+DEEPSEEK_INPUT_COST_PER_1M = float(os.getenv("DEEPSEEK_INPUT_COST_PER_1M", "0.27"))
+DEEPSEEK_OUTPUT_COST_PER_1M = float(os.getenv("DEEPSEEK_OUTPUT_COST_PER_1M", "1.10"))
+# Prompt tokens served from the provider's context cache
+GEMINI_CACHED_INPUT_COST_PER_1M = float(os.getenv("GEMINI_CACHED_INPUT_COST_PER_1M", "0.31"))
+DEEPSEEK_CACHED_INPUT_COST_PER_1M = float(os.getenv("DEEPSEEK_CACHED_INPUT_COST_PER_1M", "0.07"))
+
+# Gemini explicit context caching of stable prompt prefixes (per-agent schedules)
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "true").lower() == "true"
+# Gemini rejects cached content below a model-dependent minimum size
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "4096"))
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# How long an agent reuses its schedule prefix before re-reading the vector DB (picks up other processes' writes)
+GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS = float(os.getenv("GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS", "60"))
+
+# Record/replay cassette of provider calls (LLM_CASSETTE_MODE=record or replay)
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "").lower()
+LLM_CASSETTE_PATH = os.getenv(
+    "LLM_CASSETTE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "llm_cache", "cassette.jsonl")
+)
+LLM_CASSETTE_REPLAY_TIMING = os.getenv("LLM_CASSETTE_REPLAY_TIMING", "true").lower() == "true"  # Sleep for recorded provider latency
+LLM_CASSETTE_ON_MISS = os.getenv("LLM_CASSETTE_ON_MISS", "error").lower()  # "error" or "live"
+
+# Offline stand-in provider for benchmarks (LLM_PROVIDER=local, no network or keys needed)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "").lower()
+LOCAL_LLM_LATENCY = os.getenv("LOCAL_LLM_LATENCY", "lognormal:0.8,0.4")  # fixed:S, uniform:A,B, normal:M,SD or lognormal:MEDIAN,SIGMA
+LOCAL_LLM_ERROR_RATE = float(os.getenv("LOCAL_LLM_ERROR_RATE", "0"))
+LOCAL_LLM_RATE_LIMIT_RATE = float(os.getenv("LOCAL_LLM_RATE_LIMIT_RATE", "0"))
+LOCAL_LLM_SEED = int(os.getenv("LOCAL_LLM_SEED", "0"))
+
+if LLM_PROVIDER == "local" or LLM_CASSETTE_MODE == "replay":
+    # Calls are served offline (local backend or cassette), so missing keys are filled in
+    GEMINI_API_KEY = GEMINI_API_KEY or "local"
+    GEMINI_API_KEY_AGENT1 = GEMINI_API_KEY_AGENT1 or "local"
+    GEMINI_API_KEY_ORCHESTRATOR = GEMINI_API_KEY_ORCHESTRATOR or "local"
+    GEMINI_API_KEY_AGENT2 = GEMINI_API_KEY_AGENT2 or "local"
+    DEEPSEEK_API_KEY = DEEPSEEK_API_KEY or "local"
+    DEEPSEEK_API_KEY_ORCHESTRATOR = DEEPSEEK_API_KEY_ORCHESTRATOR or "local"
+
+# Embedding-based routing before the routing LLM call (decisions below these scores fall back to the LLM)
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.4"))  # Cosine similarity to the nearest centroid
+INTENT_ROUTER_MIN_MARGIN = float(os.getenv("INTENT_ROUTER_MIN_MARGIN", "0.05"))  # Lead over the runner-up
+
+# Start the vector searches of candidate agents while the query is still being routed
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+
+# When agent answers are merged by the aggregation LLM call: "multi_agent" (whenever several agents
+# answered) or "comparison" (only several answers to a comparison query); otherwise they are passed through
+LLM_AGGREGATION_POLICY = os.getenv("LLM_AGGREGATION_POLICY", "multi_agent").lower()
+
+# Orchestrator fan-out: shared worker threads, and per-agent bulkheads (queries in flight / waiting)
+AGENT_EXECUTOR_WORKERS = int(os.getenv("AGENT_EXECUTOR_WORKERS", "16"))
+AGENT_BULKHEAD_MAX_CONCURRENT = int(os.getenv("AGENT_BULKHEAD_MAX_CONCURRENT", "8"))
+AGENT_BULKHEAD_MAX_QUEUE = int(os.getenv("AGENT_BULKHEAD_MAX_QUEUE", "16"))
+
 # Validate at least one key is set
 if not GEMINI_API_KEY or GEMINI_API_KEY == "your_gemini_api_key_here":
     if not DEEPSEEK_API_KEY or DEEPSEEK_API_KEY == "your_deepseek_api_key_here":
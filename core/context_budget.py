@@ -0,0 +1,181 @@
+"""
+Token-budgeted schedule context for prompts
+
+Search results used to go into prompts one document at a time, each
+followed by the repr of its metadata dict (timestamps included). Here the
+entries are parsed into (day, time, activity) rows, duplicates are dropped,
+the most relevant rows are kept up to a token budget and the rest are
+rendered as a compact timeline table:
+
+    Day | Time | Activity
+    Monday | 09:00 | Start work, team standup meeting at 9:30 AM
+    Monday | 12:30-13:15 | Lunch break
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from core.schedule_engine import (
+    RANGE_PATTERN,
+    SINGLE_PATTERN,
+    WEEKDAYS,
+    WEEKDAY_PATTERN,
+    extract_day,
+    format_time,
+    parse_schedule_times
+)
+
+TABLE_HEADER = "Day | Time | Activity"
+_DAY_ORDER = {day: index for index, day in enumerate(WEEKDAYS)}
+_LABEL_NOISE = re.compile(r'^[\s\-–:,.|]+|[\s\-–:,.|]+$')
+_LEADING_DAY = re.compile(r'^\s*' + WEEKDAY_PATTERN.pattern, re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return len(text or '') // 4 + 1
+
+
+class ScheduleEntry:
+    """One row of the timeline: a weekday (None = every day), a start/end and a label"""
+
+    def __init__(self, day: Optional[str], start: Optional[int], end: Optional[int], label: str, rank: float):
+        self.day = day
+        self.start = start
+        self.end = end  # None when the text only gave a start time
+        self.label = label
+        self.rank = rank  # Lower is more relevant
+
+    def sort_key(self):
+        return (_DAY_ORDER.get(self.day, -1), self.start if self.start is not None else -1, self.label)
+
+    def dedupe_key(self):
+        return (self.day, self.start, ' '.join(self.label.lower().split()))
+
+    def render(self) -> str:
+        if self.start is None:
+            time = "-"
+        elif self.end is None:
+            time = format_time(self.start)
+        else:
+            time = f"{format_time(self.start)}-{format_time(self.end)}"
+        return f"{self.day or 'Daily'} | {time} | {self.label}"
+
+
+def _parse_line(line: str, day: Optional[str], metadata: dict, rank: float) -> Optional[ScheduleEntry]:
+    day = extract_day(line) or day
+    range_match = RANGE_PATTERN.search(line)
+    single_match = SINGLE_PATTERN.search(line)
+    start = end = None
+    match = None
+    if range_match and (not single_match or range_match.start() <= single_match.start()):
+        start, end = parse_schedule_times(range_match.group(0))[0]
+        match = range_match
+    elif single_match:
+        start = parse_schedule_times(single_match.group(0))[0][0]
+        match = single_match
+    elif metadata.get('time'):
+        times = parse_schedule_times(str(metadata['time']))
+        start = times[0][0] if times else None
+
+    if match is None and line.endswith(':'):
+        # Section headers such as "Daily routine:"
+        return None
+    label = line
+    if match is not None:
+        # Drop the leading time (times inside the activity text are kept)
+        label = label[:match.start()] + label[match.end():]
+    label = _LEADING_DAY.sub('', label)
+    label = _LABEL_NOISE.sub('', ' '.join(label.split()))
+    if not label:
+        return None
+    return ScheduleEntry(day, start, end, label, rank)
+
+
+def schedule_entries(documents: List[str], metadatas: Optional[List[dict]] = None,
+                     distances: Optional[List[float]] = None) -> List[ScheduleEntry]:
+    """
+    Parse schedule documents into timeline entries
+
+    Multi-line documents become one entry per line. Entries keep the
+    relevance of their document (its search distance, or its position).
+    """
+    metadatas = metadatas or []
+    entries = []
+    for index, doc in enumerate(documents or []):
+        metadata = metadatas[index] if index < len(metadatas) and metadatas[index] else {}
+        rank = distances[index] if distances and index < len(distances) else index
+        day = extract_day(doc, metadata)
+        for line in re.split(r'[\n;]+', doc or ''):
+            if line.strip():
+                entry = _parse_line(line.strip(), day, metadata, rank)
+                if entry is not None:
+                    entries.append(entry)
+    return entries
+
+
+def dedupe_entries(entries: List[ScheduleEntry]) -> List[ScheduleEntry]:
+    """
+    Drop repeated entries, keeping the most relevant copy
+
+    Entries on the same day and start time are duplicates when one label
+    contains the other (e.g. a daily routine stored twice, once with extra detail).
+    """
+    kept: Dict[tuple, List[ScheduleEntry]] = {}
+    for entry in sorted(entries, key=lambda e: (e.rank, -len(e.label))):
+        day, start, label = entry.dedupe_key()
+        same_slot = kept.setdefault((day, start), [])
+        if any(label in other.dedupe_key()[2] or other.dedupe_key()[2] in label for other in same_slot):
+            continue
+        same_slot.append(entry)
+    return [entry for slot in kept.values() for entry in slot]
+
+
+def render_timeline(entries: List[ScheduleEntry], budget_tokens: Optional[int] = None) -> str:
+    """
+    Render entries as a compact timeline table within a token budget
+
+    The most relevant entries are kept first; the table itself is in
+    chronological order and notes how many entries were left out.
+
+    Args:
+        entries: Parsed (and usually deduplicated) entries
+        budget_tokens: Estimated token budget of the whole table (None = no limit)
+    """
+    if not entries:
+        return ""
+    selected = []
+    used = estimate_tokens(TABLE_HEADER)
+    for entry in sorted(entries, key=lambda e: e.rank):
+        cost = estimate_tokens(entry.render())
+        if budget_tokens is not None and selected and used + cost > budget_tokens:
+            continue
+        selected.append(entry)
+        used += cost
+
+    rows = [TABLE_HEADER] + [entry.render() for entry in sorted(selected, key=ScheduleEntry.sort_key)]
+    omitted = len(entries) - len(selected)
+    if omitted:
+        rows.append(f"({omitted} less relevant entries omitted)")
+    return "\n".join(rows)
+
+
+def build_schedule_context(results: dict, budget_tokens: Optional[int] = None) -> str:
+    """
+    Compact timeline for a VectorDatabase.search() or get_all() result
+
+    Args:
+        results: Chroma result; query results are nested one list per query
+        budget_tokens: Estimated token budget (None = no limit)
+
+    Returns:
+        The timeline table, or "" when there are no entries
+    """
+    documents = results.get('documents') or []
+    metadatas = results.get('metadatas') or []
+    distances = results.get('distances') or []
+    if documents and isinstance(documents[0], list):
+        documents = documents[0]
+        metadatas = metadatas[0] if metadatas else []
+        distances = distances[0] if distances else []
+    return render_timeline(dedupe_entries(schedule_entries(documents, metadatas, distances)), budget_tokens)
@@ -0,0 +1,74 @@
+"""
+Request-scoped deadlines
+
+web_app.py creates one Deadline per request and hands it to the
+orchestrator, which passes it on to the agents, the vector search and the
+LLM helpers. Retries and rate limit waits stop once the budget is spent,
+and the orchestrator aggregates whichever agents answered in time.
+
+Like call labels, the active deadline is also kept in a context variable,
+so code that isn't handed one explicitly (and work submitted to the
+background loop or a worker thread) still sees it.
+"""
+
+import contextlib
+import contextvars
+import time
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request's time budget is spent"""
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a request must finish"""
+
+    def __init__(self, seconds: float):
+        """
+        Args:
+            seconds: Time budget from now
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (0 once expired)"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, what: str = "request"):
+        """Raise DeadlineExceeded if the budget is spent"""
+        if self.expired:
+            raise DeadlineExceeded(f"{what} exceeded the {self.seconds:.1f}s deadline")
+
+    def cap(self, seconds: Optional[float]) -> float:
+        """Limit a timeout or wait to the time left (None means no other limit)"""
+        remaining = self.remaining()
+        return remaining if seconds is None else min(seconds, remaining)
+
+    def __repr__(self):
+        return f"Deadline({self.seconds:.1f}s, remaining={self.remaining():.2f}s)"
+
+
+_current_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make `deadline` the active deadline inside this block (None keeps the current one)"""
+    if deadline is None:
+        yield _current_deadline.get()
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
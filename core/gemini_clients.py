@@ -0,0 +1,121 @@
+"""
+Per-key Gemini service clients
+
+genai.configure() sets one process-global API key, so models built for
+different keys would all send whichever key was configured last. Here every
+API key gets its own service clients and models are bound to them, so the
+parallel agent fan-out (and the key pool) can use several keys at once.
+
+Async gRPC channels are bound to an event loop, so async clients are kept
+per key and per loop.
+"""
+
+import threading
+import weakref
+import asyncio
+from typing import Any, Dict
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+
+
+class GeminiKeyClients:
+    """Lazily created Gemini service clients of one API key"""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._clients: Dict[str, Any] = {}
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> {name: client}
+        self._lock = threading.Lock()
+
+    def _make(self, name: str, is_async: bool):
+        suffix = "ServiceAsyncClient" if is_async else "ServiceClient"
+        cls = getattr(glm, name.title() + suffix)
+        return cls(client_options={"api_key": self.api_key})
+
+    def client(self, name: str):
+        """Sync service client ("generative", "model" or "cache")"""
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                client = self._make(name, is_async=False)
+                self._clients[name] = client
+            return client
+
+    def async_client(self, name: str):
+        """Async service client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(name)
+            if client is None:
+                client = self._make(name, is_async=True)
+                clients[name] = client
+            return client
+
+
+_key_clients: Dict[str, GeminiKeyClients] = {}
+_key_clients_lock = threading.Lock()
+
+
+def get_key_clients(api_key: str) -> GeminiKeyClients:
+    """Get the shared service clients of an API key"""
+    with _key_clients_lock:
+        clients = _key_clients.get(api_key)
+        if clients is None:
+            clients = GeminiKeyClients(api_key)
+            _key_clients[api_key] = clients
+        return clients
+
+
+class KeyedGenerativeModel(genai.GenerativeModel):
+    """GenerativeModel that calls with its own API key instead of the genai.configure() one"""
+
+    def __init__(self, model_name: str = "gemini-pro", api_key: str = None, **kwargs):
+        super().__init__(model_name, **kwargs)
+        self.api_key = None
+        self._key_clients = None
+        if api_key:
+            self.bind_api_key(api_key)
+
+    def bind_api_key(self, api_key: str):
+        self.api_key = api_key
+        self._key_clients = get_key_clients(api_key)
+        self._client = self._key_clients.client("generative")
+        self._async_client = None
+
+    def _use_loop_client(self):
+        if self._key_clients is not None:
+            self._async_client = self._key_clients.async_client("generative")
+
+    async def generate_content_async(self, *args, **kwargs):
+        self._use_loop_client()
+        return await super().generate_content_async(*args, **kwargs)
+
+    async def count_tokens_async(self, *args, **kwargs):
+        self._use_loop_client()
+        return await super().count_tokens_async(*args, **kwargs)
+
+
+def list_models(api_key: str):
+    """List the models available to an API key"""
+    return list(genai.list_models(client=get_key_clients(api_key).client("model")))
+
+
+def create_cached_content(api_key: str, model_name: str, text: str, ttl_seconds: int, display_name: str = None):
+    """
+    Store text as Gemini cached content owned by api_key
+
+    Returns:
+        The CachedContent proto (its .name and .model feed
+        KeyedGenerativeModel.from_cached_content)
+    """
+    request = glm.CreateCachedContentRequest(
+        cached_content=glm.CachedContent(
+            model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+            display_name=display_name,
+            contents=[glm.Content(role="user", parts=[glm.Part(text=text)])],
+            ttl={"seconds": int(ttl_seconds)}
+        )
+    )
+    return get_key_clients(api_key).client("cache").create_cached_content(request)
@@ -0,0 +1,157 @@
+"""
+Hedged requests across LLM providers
+
+The primary provider gets a head start equal to a high percentile of its
+recent latencies. If it hasn't answered by then, the same request is sent
+to the secondary provider; the first successful answer wins and the other
+call is cancelled. Slow outliers of one provider are then capped by the
+other provider's typical latency instead of showing up in p99.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+ProviderCall = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class HedgePolicy:
+    """Tracks per-provider latencies and decides how long the primary may run before hedging"""
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        default_delay: float = 2.0,
+        min_delay: float = 0.25,
+        max_delay: float = 10.0,
+        window: int = 200,
+        min_samples: int = 20
+    ):
+        """
+        Args:
+            percentile: Latency percentile of the primary used as the hedge deadline
+            default_delay: Deadline used until min_samples latencies are known
+            min_delay: Lower bound of the deadline (seconds)
+            max_delay: Upper bound of the deadline (seconds)
+            window: Number of recent latencies kept per provider
+            min_samples: Samples needed before the percentile is trusted
+        """
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window = window
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._stats = {"requests": 0, "hedged": 0, "wins": {}, "hedge_wins": 0, "failures": 0}
+
+    def delay(self, provider: str) -> float:
+        """Seconds to wait for `provider` before sending the hedge request"""
+        with self._lock:
+            samples = sorted(self._latencies.get(provider, ()))
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(int(len(samples) * self.percentile / 100.0), len(samples) - 1)
+        return min(max(samples[index], self.min_delay), self.max_delay)
+
+    def record_latency(self, provider: str, seconds: float):
+        """Record the latency of a successful call (or a lower bound, for a cancelled primary)"""
+        with self._lock:
+            self._latencies.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+
+    def record_result(self, winner: Optional[str], hedged: bool, secondary_won: bool = False):
+        """Count a finished request and which provider answered it (None when all failed)"""
+        with self._lock:
+            self._stats["requests"] += 1
+            if hedged:
+                self._stats["hedged"] += 1
+            if winner is None:
+                self._stats["failures"] += 1
+                return
+            self._stats["wins"][winner] = self._stats["wins"].get(winner, 0) + 1
+            if secondary_won:
+                self._stats["hedge_wins"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Win counters plus the current hedge deadline per provider"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["wins"] = dict(self._stats["wins"])
+            providers = list(self._latencies)
+        stats["delays"] = {provider: self.delay(provider) for provider in providers}
+        return stats
+
+
+async def hedged_call(primary: ProviderCall, secondary: Optional[ProviderCall], policy: HedgePolicy) -> Tuple[Any, str]:
+    """
+    Run primary, hedging with secondary once the primary's deadline passes
+
+    Latencies of successful calls are not recorded here: the calls may be
+    answered from a cache in ~0s, so the caller records real provider
+    latencies with policy.record_latency. Only a cancelled primary adds a
+    (lower bound) sample.
+
+    Args:
+        primary: (provider name, zero-argument coroutine function)
+        secondary: Same for the hedge provider (None disables hedging)
+        policy: HedgePolicy supplying the deadline and recording the outcome
+
+    Returns:
+        (result, winning provider name)
+
+    Raises:
+        The primary's exception if every call fails
+    """
+    calls = {}
+
+    def start(call: ProviderCall):
+        name, fn = call
+
+        async def timed():
+            started = time.monotonic()
+            try:
+                return await fn()
+            except asyncio.CancelledError:
+                if name == primary[0]:
+                    # A primary cut short by the hedge was at least this slow; without the
+                    # sample the percentile would only see fast calls and keep shrinking
+                    policy.record_latency(name, time.monotonic() - started)
+                raise
+
+        calls[asyncio.ensure_future(timed())] = name
+
+    start(primary)
+    first_error = None
+    hedged = False
+    pending = set(calls)
+
+    try:
+        # Give the primary its head start; a fast failure hedges immediately
+        done, pending = await asyncio.wait(pending, timeout=policy.delay(primary[0]))
+        while True:
+            for task in done:
+                if task.exception() is None:
+                    winner = calls[task]
+                    policy.record_result(winner, hedged, secondary_won=winner != primary[0])
+                    return task.result(), winner
+                first_error = first_error or task.exception()
+
+            if not hedged and secondary is not None:
+                hedged = True
+                start(secondary)
+                pending = {task for task in calls if not task.done()}
+
+            if not pending:
+                policy.record_result(None, hedged)
+                raise first_error
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Cancel the loser (or everything, if we were cancelled ourselves)
+        for task in calls:
+            if not task.done():
+                task.cancel()
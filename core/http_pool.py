@@ -0,0 +1,55 @@
+"""
+Shared HTTP connection pools for LLM clients
+
+All DeepSeek (OpenAI-compatible) clients reuse one httpx connection pool
+instead of opening their own. The sync pool is shared process-wide; async
+pools are bound to an event loop, so one is kept per loop.
+"""
+
+import asyncio
+import threading
+import weakref
+
+from core.config import LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE, LLM_HTTP_TIMEOUT_SECONDS
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    httpx = None
+
+_lock = threading.Lock()
+_sync_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE
+    )
+
+
+def get_http_client():
+    """Get the shared, thread-safe httpx.Client (None if httpx is not installed)"""
+    global _sync_client
+    if not HTTPX_AVAILABLE:
+        return None
+    with _lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(limits=_limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS)
+        return _sync_client
+
+
+def get_async_http_client():
+    """Get the httpx.AsyncClient of the running event loop (None if httpx is not installed)"""
+    if not HTTPX_AVAILABLE:
+        return None
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=_limits(), timeout=LLM_HTTP_TIMEOUT_SECONDS)
+            _async_clients[loop] = client
+        return client
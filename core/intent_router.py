@@ -0,0 +1,162 @@
+"""
+Embedding-based intent routing (nearest centroid)
+
+When no keyword names a user, the orchestrator used to ask the LLM for a
+single word ("agent1"/"agent2"/"all"). Here each label gets a few example
+utterances, embedded once with the same embedding function ChromaDB uses
+for the schedules, and averaged into a unit-length centroid. A query is
+embedded and assigned to the centroid with the highest cosine similarity;
+comparing against the centroids is a matrix-vector product, so the cost is
+dominated by the one query embedding.
+
+Decisions below the confidence threshold (or too close to the runner-up)
+return None, and the caller falls back to the LLM.
+"""
+
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class QueryEmbeddings:
+    """Embedding function with an LRU cache of single-text embeddings (shared by routers)"""
+
+    def __init__(self, embed: Callable[[List[str]], Sequence[Sequence[float]]], cache_size: int = 1024):
+        self.embed = embed
+        self.get = functools.lru_cache(maxsize=cache_size)(self._embed_text)
+
+    def _embed_text(self, text: str):
+        return _normalize(np.asarray(self.embed([text]), dtype=np.float32))[0]
+
+
+class IntentRouter:
+    """Nearest-centroid classifier over sentence embeddings"""
+
+    def __init__(
+        self,
+        name: str,
+        embeddings: QueryEmbeddings,
+        min_confidence: float = 0.4,
+        min_margin: float = 0.05
+    ):
+        """
+        Args:
+            name: Label used in stats
+            embeddings: Embedding function (e.g. a ChromaDB one) with its query cache
+            min_confidence: Lowest cosine similarity to the winning centroid that is trusted
+            min_margin: Lowest lead over the runner-up centroid that is trusted
+        """
+        self.name = name
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self._embeddings = embeddings
+        self._examples: Dict[str, List[str]] = {}
+        self._labels: List[str] = []
+        self._centroids = None
+        self._lock = threading.Lock()
+        self._stats = {"routed": 0, "fallbacks": 0, "errors": 0, "seconds": 0.0}
+
+    def add_examples(self, label: str, utterances: Sequence[str]):
+        """Add labeled example utterances (call build() again afterwards)"""
+        self._examples.setdefault(label, []).extend(text for text in utterances if text and text.strip())
+
+    def build(self):
+        """Embed the examples and compute one normalized centroid per label"""
+        labels = [label for label, texts in self._examples.items() if texts]
+        texts = [text for label in labels for text in self._examples[label]]
+        vectors = _normalize(np.asarray(self._embeddings.embed(texts), dtype=np.float32))
+        centroids = []
+        offset = 0
+        for label in labels:
+            count = len(self._examples[label])
+            centroids.append(vectors[offset:offset + count].mean(axis=0))
+            offset += count
+        with self._lock:
+            self._labels = labels
+            self._centroids = _normalize(np.vstack(centroids)) if centroids else None
+
+    @property
+    def ready(self) -> bool:
+        return self._centroids is not None
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Cosine similarity of the text to every label's centroid"""
+        with self._lock:
+            labels, centroids = self._labels, self._centroids
+        if centroids is None:
+            return {}
+        similarities = centroids @ self._embeddings.get(' '.join(text.lower().split()))
+        return {label: float(score) for label, score in zip(labels, similarities)}
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Route a text to its nearest label
+
+        Returns:
+            (label, confidence), with label None when the decision isn't
+            confident enough (or the embedding failed) and the caller should fall back
+        """
+        started = time.perf_counter()
+        try:
+            scores = self.scores(text)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️  Intent router '{self.name}' failed, falling back: {e}")
+            return None, 0.0
+        finally:
+            self._stats["seconds"] += time.perf_counter() - started
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            self._stats["fallbacks"] += 1
+            return None, 0.0
+        label, confidence = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if confidence < self.min_confidence or confidence - runner_up < self.min_margin:
+            self._stats["fallbacks"] += 1
+            return None, confidence
+        self._stats["routed"] += 1
+        return label, confidence
+
+    def evaluate(self, labeled: Sequence[Tuple[str, str]]) -> Dict[str, float]:
+        """
+        Accuracy and latency on held-out (text, expected label) pairs
+
+        Accuracy counts confident decisions only; fallback_rate is the share
+        that would have gone to the LLM.
+        """
+        correct = confident = 0
+        latencies = []
+        for text, expected in labeled:
+            self._embeddings.get.cache_clear()  # Measure the uncached path
+            started = time.perf_counter()
+            label, _ = self.classify(text)
+            latencies.append(time.perf_counter() - started)
+            if label is not None:
+                confident += 1
+                correct += label == expected
+        latencies.sort()
+        total = len(labeled)
+        return {
+            "examples": total,
+            "accuracy": round(correct / confident, 3) if confident else None,
+            "fallback_rate": round(1 - confident / total, 3) if total else None,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+            "p95_ms": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 2) if latencies else None
+        }
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self._stats)
+        decisions = stats["routed"] + stats["fallbacks"] + stats["errors"]
+        stats["ready"] = self.ready
+        stats["labels"] = list(self._labels)
+        stats["avg_ms"] = round(stats.pop("seconds") / decisions * 1000, 3) if decisions else None
+        return stats
+
+
+def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
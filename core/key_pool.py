@@ -0,0 +1,105 @@
+"""
+API key pool per provider
+
+Every configured key of a provider (GEMINI_API_KEY, _AGENT1, _AGENT2,
+_ORCHESTRATOR, GEMINI_API_KEYS, ...) goes into one pool, and each LLM call
+leases the key to use from it instead of always using the key its agent was
+built with. Aggregate throughput then scales with the number of keys rather
+than with whichever agent happens to be busy.
+
+Policies:
+    least_loaded: fewest calls in flight, skipping keys that would have to
+        wait for their rate limiter (e.g. after a 429) while others are free
+    remaining_quota: shortest rate limiter wait, then most budget left
+"""
+
+import contextlib
+import threading
+from typing import Callable, Dict, Iterable, Iterator
+
+from core.rate_limiter import RateLimiter, RateLimiterRegistry
+
+LEAST_LOADED = "least_loaded"
+REMAINING_QUOTA = "remaining_quota"
+POLICIES = (LEAST_LOADED, REMAINING_QUOTA)
+
+
+class KeyPool:
+    """Thread-safe load-balanced dispatch over the API keys of one provider"""
+
+    def __init__(self, provider: str, api_keys: Iterable[str], limiter_for: Callable[[str], RateLimiter],
+                 policy: str = LEAST_LOADED):
+        """
+        Args:
+            provider: "gemini" or "deepseek"
+            api_keys: Configured keys (duplicates are dropped)
+            limiter_for: Returns the shared rate limiter of a key
+            policy: "least_loaded" or "remaining_quota"
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Invalid key pool policy '{policy}' (use {', '.join(POLICIES)})")
+        self.provider = provider
+        self.policy = policy
+        self.api_keys = list(dict.fromkeys(key for key in api_keys if key))
+        if not self.api_keys:
+            raise ValueError(f"No API keys configured for the {provider} key pool")
+        self._limiter_for = limiter_for
+        self._lock = threading.Lock()
+        self._in_flight = {key: 0 for key in self.api_keys}
+        self._calls = {key: 0 for key in self.api_keys}
+        self._next = 0
+
+    def __contains__(self, api_key: str) -> bool:
+        return api_key in self._in_flight
+
+    def __len__(self) -> int:
+        return len(self.api_keys)
+
+    def _score(self, api_key: str, tokens: float):
+        limiter = self._limiter_for(api_key)
+        wait = limiter.peek_wait(tokens)
+        if self.policy == REMAINING_QUOTA:
+            # Budgets within 5% of each other count as equal, so load decides
+            return (round(wait, 1), -round(limiter.remaining_fraction() * 20), self._in_flight[api_key])
+        return (wait > 0, self._in_flight[api_key], wait)
+
+    def acquire(self, tokens: float = 0) -> str:
+        """Pick the key for the next call and count it as in flight (pair with release)"""
+        with self._lock:
+            count = len(self.api_keys)
+            # Rotating the start position breaks ties round-robin
+            candidates = []
+            for offset in range(count):
+                api_key = self.api_keys[(self._next + offset) % count]
+                candidates.append((self._score(api_key, tokens), offset, api_key))
+            api_key = min(candidates)[2]
+            self._next = (self._next + 1) % count
+            self._in_flight[api_key] += 1
+            self._calls[api_key] += 1
+            return api_key
+
+    def release(self, api_key: str):
+        with self._lock:
+            self._in_flight[api_key] = max(self._in_flight[api_key] - 1, 0)
+
+    @contextlib.contextmanager
+    def lease(self, tokens: float = 0) -> Iterator[str]:
+        """Use a key for the duration of one call"""
+        api_key = self.acquire(tokens)
+        try:
+            yield api_key
+        finally:
+            self.release(api_key)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            keys = {
+                RateLimiterRegistry.key_id(api_key): {
+                    "calls": self._calls[api_key],
+                    "in_flight": self._in_flight[api_key]
+                }
+                for api_key in self.api_keys
+            }
+        for api_key in self.api_keys:
+            keys[RateLimiterRegistry.key_id(api_key)]["wait_seconds"] = round(self._limiter_for(api_key).peek_wait(), 3)
+        return {"policy": self.policy, "keys": keys}
@@ -0,0 +1,100 @@
+"""
+Multi-pattern keyword matching (Aho-Corasick)
+
+Routing used to run `any(keyword in text for keyword in ...)` once per
+keyword list, so its cost grew with the number of keywords and agents.
+KeywordMatcher compiles every keyword into one automaton and finds all of
+them, overlapping ones included, in a single pass over the text: the cost
+is O(len(text) + matches) no matter how many keywords are registered.
+
+Matching is on substrings like the `in` checks it replaces, with two
+refinements: keywords that start or end with a digit don't match inside a
+longer number ("user 1" does not match "user 12"), and whole_word keywords
+must be delimited by whitespace (like comparing against text.split()).
+"""
+
+from collections import deque
+from typing import Dict, FrozenSet, Hashable, List, Tuple
+
+
+class KeywordMatcher:
+    """Case-insensitive Aho-Corasick automaton mapping keywords to labels"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._keywords_at: List[List[Tuple[int, Hashable, bool]]] = [[]]  # (keyword length, label, whole_word)
+        self._outputs = self._keywords_at  # Own keywords plus those of the failure chain (set by build)
+        self._built = True
+        self.keywords = 0
+
+    def add(self, keyword: str, label: Hashable, whole_word: bool = False):
+        """
+        Register a keyword
+
+        Args:
+            keyword: Text to find (case-insensitive)
+            label: Reported by scan() when the keyword occurs (several keywords may share one)
+            whole_word: Only match when surrounded by whitespace or the ends of the text
+        """
+        keyword = keyword.lower()
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._keywords_at.append([])
+            state = next_state
+        self._keywords_at[state].append((len(keyword), label, whole_word))
+        self._built = False
+        self.keywords += 1
+
+    def build(self):
+        """Compute the failure links (done automatically before the first scan after add())"""
+        self._outputs = [list(keywords) for keywords in self._keywords_at]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # A state also reports every keyword that ends at its failure state
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._built = True
+
+    def scan(self, text: str) -> FrozenSet[Hashable]:
+        """Labels of every keyword occurring in text (one pass)"""
+        if not self._built:
+            self.build()
+        text = (text or '').lower()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set()
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, label, whole_word in outputs[state]:
+                if label not in found and _is_delimited(text, index - length + 1, index + 1, whole_word):
+                    found.add(label)
+        return frozenset(found)
+
+
+def _is_delimited(text: str, start: int, end: int, whole_word: bool) -> bool:
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    if whole_word:
+        return before.isspace() and after.isspace()
+    return not (text[start].isdigit() and before.isdigit()) and not (text[end - 1].isdigit() and after.isdigit())
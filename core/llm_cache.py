@@ -0,0 +1,195 @@
+"""
+Two-tier cache for LLM responses
+
+Responses are keyed on (provider, model, prompt hash, generation params).
+The first tier is an in-memory LRU; the second is a SQLite file that
+survives restarts and is shared by worker processes. Both tiers expire
+entries after a TTL and evict least recently used entries past a size cap.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class CachedResponse:
+    """Minimal response returned on cache hits (works with both text extractors)"""
+
+    def __init__(self, text: str, provider: str = None):
+        self.text = text
+        self.provider = provider
+        self.cached = True
+
+
+class LLMResponseCache:
+    """Thread-safe LRU + SQLite response cache with TTL and hit/miss counters"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        path: Optional[str] = None,
+        disk_max_entries: int = 10000
+    ):
+        """
+        Args:
+            max_entries: Size cap of the in-memory tier
+            ttl_seconds: Entry lifetime in both tiers
+            path: SQLite file for the on-disk tier (None disables it)
+            disk_max_entries: Size cap of the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        self.path = path
+
+        self._memory = OrderedDict()  # key -> (created_at, text)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0
+        }
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        provider TEXT,
+                        model TEXT,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )"""
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+                self._conn.commit()
+            except Exception as e:
+                print(f"LLM cache: disk tier disabled ({e})")
+                self._conn = None
+
+    @property
+    def on_disk(self) -> bool:
+        """Whether lookups and stores may touch the SQLite tier (blocking I/O)"""
+        return self._conn is not None
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Build a cache key from provider, model, prompt hash and generation params"""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        params_json = json.dumps(params or {}, sort_keys=True, default=str)
+        return f"{provider}:{model}:{prompt_hash}:{hashlib.sha256(params_json.encode('utf-8')).hexdigest()[:16]}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, text = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return text
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        text, created_at = row
+                        if now - created_at <= self.ttl_seconds:
+                            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                            self._conn.commit()
+                            self._remember(key, created_at, text)
+                            self._stats["hits"] += 1
+                            self._stats["disk_hits"] += 1
+                            return text
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._conn.commit()
+                        self._stats["expired"] += 1
+                except sqlite3.Error as e:
+                    print(f"LLM cache: disk read failed ({e})")
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, text: str, provider: str = None, model: str = None):
+        """Store a response text in both tiers"""
+        if not text:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, text)
+            self._stats["stores"] += 1
+
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, provider, model, response, created_at, last_access) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, provider, model, text, now, now)
+                    )
+                    self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+                    evicted = self._conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_max_entries,)
+                    ).rowcount
+                    self._stats["evictions"] += max(evicted, 0)
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"LLM cache: disk write failed ({e})")
+
+    def _remember(self, key: str, created_at: float, text: str):
+        """Insert into the memory tier and evict LRU entries (lock must be held)"""
+        self._memory[key] = (created_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM responses")
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"LLM cache: disk clear failed ({e})")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = 0
+            if self._conn is not None:
+                try:
+                    stats["disk_entries"] = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
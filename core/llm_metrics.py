@@ -0,0 +1,204 @@
+"""
+Per-call accounting for LLM requests
+
+Every provider call is recorded with its caller label (e.g.
+"orchestrator.route", "agent2.query"), provider, token counts (including
+prompt tokens served from the provider's context cache), wall time,
+retries and estimated cost. Counters and fixed-bucket histograms are
+aggregated per label and per provider, so it is visible which stage burns
+quota and where latency comes from.
+
+Labels are carried in a context variable: wrap the calling code in
+`call_label("agent1.query")` and every LLM call made inside it (same
+thread or asyncio task) is attributed to that label.
+"""
+
+import contextlib
+import contextvars
+import threading
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+UNLABELED = "unlabeled"
+
+_current_label = contextvars.ContextVar("llm_call_label", default=UNLABELED)
+
+
+@contextlib.contextmanager
+def call_label(label: str) -> Iterator[None]:
+    """Attribute LLM calls made inside this block to `label`"""
+    token = _current_label.set(label)
+    try:
+        yield
+    finally:
+        _current_label.reset(token)
+
+
+def current_call_label() -> str:
+    return _current_label.get()
+
+
+class Histogram:
+    """Fixed-bucket histogram (percentiles are bucket upper bounds)"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = self.count * percentile / 100.0
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {f"le_{bound:g}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            "max": round(self.max, 4),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": buckets
+        }
+
+
+class _CallStats:
+    """Counters and histograms of one label or provider"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.prompt_token_hist = Histogram(TOKEN_BUCKETS)
+        self.completion_token_hist = Histogram(TOKEN_BUCKETS)
+
+    def add(self, latency: float, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int,
+            retries: int, cost: float, outcome: str):
+        self.calls += 1
+        self.retries += retries
+        if outcome == "error":
+            self.errors += 1
+        elif outcome == "cache_hit":
+            self.cache_hits += 1
+        self.latency.observe(latency)
+        if outcome != "cache_hit":
+            self.prompt_tokens += prompt_tokens
+            self.cached_prompt_tokens += cached_prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+            self.prompt_token_hist.observe(prompt_tokens)
+            self.completion_token_hist.observe(completion_tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "prompt_cache_hit_rate": round(self.cached_prompt_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_seconds": self.latency.to_dict(),
+            "prompt_tokens_hist": self.prompt_token_hist.to_dict(),
+            "completion_tokens_hist": self.completion_token_hist.to_dict()
+        }
+
+
+class LLMMetrics:
+    """Thread-safe per-label / per-provider accounting of LLM calls"""
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, ...]]] = None):
+        """
+        Args:
+            prices: provider -> (USD per 1M prompt tokens, USD per 1M completion tokens,
+                optionally USD per 1M cached prompt tokens)
+        """
+        self.prices = dict(prices or {})
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._total = _CallStats()
+        self._by_label: Dict[str, _CallStats] = {}
+        self._by_provider: Dict[str, _CallStats] = {}
+
+    def cost(self, provider: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+        prices = self.prices.get(provider, (0.0, 0.0))
+        input_price, output_price = prices[0], prices[1]
+        cached_price = prices[2] if len(prices) > 2 else input_price
+        cached_prompt_tokens = min(cached_prompt_tokens, prompt_tokens)
+        return ((prompt_tokens - cached_prompt_tokens) * input_price
+                + cached_prompt_tokens * cached_price
+                + completion_tokens * output_price) / 1_000_000
+
+    def record(self, provider: str, latency: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+               retries: int = 0, outcome: str = "ok", label: Optional[str] = None,
+               cached_prompt_tokens: int = 0):
+        """
+        Record one LLM call
+
+        Args:
+            provider: "gemini" or "deepseek"
+            latency: Wall time of the call including retries and rate limit waits
+            prompt_tokens: Prompt tokens (reported by the provider or estimated)
+            completion_tokens: Completion tokens
+            retries: Rate limit retries needed
+            outcome: "ok", "error" or "cache_hit" (cache hits cost no tokens)
+            label: Caller label (defaults to the label of the current context)
+            cached_prompt_tokens: Part of prompt_tokens served from the provider's context cache
+        """
+        label = label or current_call_label()
+        cost = self.cost(provider, prompt_tokens, completion_tokens, cached_prompt_tokens)
+        with self._lock:
+            for stats in (
+                self._total,
+                self._by_label.setdefault(label, _CallStats()),
+                self._by_provider.setdefault(provider, _CallStats())
+            ):
+                stats.add(latency, prompt_tokens, completion_tokens, cached_prompt_tokens, retries, cost, outcome)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals plus per-label and per-provider counters and histograms"""
+        with self._lock:
+            return {
+                "total": self._total.to_dict(),
+                "by_label": {label: stats.to_dict() for label, stats in sorted(self._by_label.items())},
+                "by_provider": {provider: stats.to_dict() for provider, stats in sorted(self._by_provider.items())}
+            }
+
+    def reset(self):
+        with self._lock:
+            self._reset()
@@ -0,0 +1,355 @@
+"""
+Offline stand-in for the Gemini and DeepSeek clients
+
+Used when LLM_PROVIDER=local. Responses are built deterministically from
+the prompt (routing, agent answers, aggregation, phrasing, general
+questions), latency is drawn from a configurable distribution and errors
+can be injected at a fixed rate. Every random draw is seeded from the
+prompt, so benchmark runs are reproducible and need no network or quota.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+
+from core.context_budget import TABLE_HEADER
+
+LOCAL_API_KEY = "local"
+
+# Granularity (characters) of the simulated prompt prefix cache
+PREFIX_CACHE_BLOCK = 256
+
+Template = Tuple[str, Callable[[str], str]]
+
+
+class LocalLLMError(Exception):
+    """Error injected by the local provider"""
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution spec into a sampler (seconds)
+
+    Supported: "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MEDIAN,SIGMA" (e.g. "lognormal:0.8,0.4").
+    """
+    kind, _, args = (spec or "fixed:0").partition(':')
+    values = [float(value) for value in args.split(',') if value.strip()]
+    kind = kind.strip().lower()
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(rng.gauss(values[0], values[1]), 0.0)
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Invalid latency spec '{spec}' (use fixed:S, uniform:A,B, normal:M,SD or lognormal:MEDIAN,SIGMA)")
+
+
+def _context_lines(prompt: str) -> List[str]:
+    """Schedule entries ("- ..." lines and "Day | Time | Activity" timeline rows) included in a prompt"""
+    lines = []
+    for line in prompt.split('\n'):
+        line = line.strip()
+        if line.startswith('- ') and ':' in line:
+            lines.append(line[2:])
+        elif line.count(' | ') == 2 and line != TABLE_HEADER:
+            lines.append(line.replace(' | ', ' ', 1).replace(' | ', ' - ', 1))
+    return lines
+
+
+def _route(prompt: str) -> str:
+    match = re.search(r'query: "(.*)"', prompt.lower())
+    query = match.group(1) if match else prompt.lower().split('route to:')[0]
+    mentions_user1 = 'user 1' in query or 'user1' in query
+    mentions_user2 = 'user 2' in query or 'user2' in query
+    if mentions_user1 and not mentions_user2:
+        return "agent1"
+    if mentions_user2 and not mentions_user1:
+        return "agent2"
+    return "all"
+
+
+def _agent_answer(prompt: str) -> str:
+    user = re.search(r"managing (User \d+)'s schedule", prompt).group(1)
+    entries = [line for line in _context_lines(prompt) if not line.startswith('Format')]
+    if not entries:
+        return f"I couldn't find schedule information for {user}."
+    return f"{user} has these activities: " + ", ".join(entries[:5]) + "."
+
+
+def _aggregate_answer(prompt: str) -> str:
+    entries = [line for line in _context_lines(prompt) if not line.startswith(('Be ', 'Keep ', 'NO ', 'Just ', 'Provide '))]
+    summary = "; ".join(entries[:6]) if entries else "no stored activities"
+    return f"Based on comparing both schedules, the common free time is outside these activities: {summary}."
+
+
+def _phrased_result(prompt: str) -> str:
+    return prompt.split("Computed result:", 1)[1].split("Answer the query", 1)[0].strip()
+
+
+def _general_answer(prompt: str) -> str:
+    question = prompt.split("Question:", 1)[1].strip().split('\n', 1)[0]
+    return f"This is a local stand-in answer to: {question}"
+
+
+def _stored_summary(prompt: str) -> str:
+    lines = [line.strip() for line in prompt.split('\n')[1:] if line.strip()]
+    return f"Stored: {lines[0] if lines else 'schedule entry'}."
+
+
+DEFAULT_TEMPLATES: List[Template] = [
+    ("One word only: agent1/agent2/all", _route),
+    ("Summarize this schedule/routine information", _stored_summary),
+    ("Computed result:", _phrased_result),
+    ("You are an Orchestrator Agent", _aggregate_answer),
+    ("'s schedule. Answer this query", _agent_answer),
+    ("Question:", _general_answer),
+]
+
+
+class LocalBackend:
+    """Deterministic response generator with simulated latency and errors"""
+
+    def __init__(
+        self,
+        latency: str = "lognormal:0.8,0.4",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0,
+        templates: Optional[List[Template]] = None
+    ):
+        """
+        Args:
+            latency: Latency distribution spec (see parse_latency)
+            error_rate: Share of calls failing with a server error
+            rate_limit_rate: Share of calls failing with a 429 rate limit error
+            seed: Base seed; the same seed and prompts give the same run
+            templates: (prompt marker, builder) pairs tried before the defaults
+        """
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+        self.templates = list(templates or []) + DEFAULT_TEMPLATES
+        self._calls = {}
+        self._seen_prefixes = set()
+        self._lock = threading.Lock()
+
+    def respond(self, prompt: str) -> str:
+        """Deterministic response text for a prompt"""
+        for marker, build in self.templates:
+            if marker in prompt:
+                try:
+                    return build(prompt)
+                except Exception:
+                    break
+        return f"Local response {hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]}"
+
+    def plan(self, provider: str, prompt: str) -> Tuple[float, Optional[str]]:
+        """
+        Latency and injected failure ("error", "rate_limit" or None) of the next call
+
+        The n-th call with the same prompt always gets the same draw.
+        """
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._lock:
+            call_index = self._calls.get((provider, digest), 0)
+            self._calls[(provider, digest)] = call_index + 1
+        rng = random.Random(f"{self.seed}:{provider}:{digest}:{call_index}")
+
+        latency = self.sample_latency(rng)
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            return latency, "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return latency, "error"
+        return latency, None
+
+    def usage(self, prompt: str, text: str):
+        """
+        (prompt, completion, cached prompt) token counts
+
+        Prefix caching is simulated like DeepSeek's: prompts are cached in
+        PREFIX_CACHE_BLOCK-character blocks and a call is credited with the
+        longest block-aligned prefix an earlier call already sent.
+        """
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(text) // 4 + 1
+        digests = [hashlib.sha256(prompt[:end].encode('utf-8')).hexdigest()
+                   for end in range(PREFIX_CACHE_BLOCK, len(prompt) + 1, PREFIX_CACHE_BLOCK)]
+        with self._lock:
+            cached_blocks = 0
+            for index, digest in enumerate(digests):
+                if digest not in self._seen_prefixes:
+                    break
+                cached_blocks = index + 1
+            self._seen_prefixes.update(digests)
+        cached_tokens = min(cached_blocks * PREFIX_CACHE_BLOCK // 4, prompt_tokens)
+        return prompt_tokens, completion_tokens, cached_tokens
+
+
+def _chunks(text: str, words_per_chunk: int = 4) -> List[str]:
+    words = text.split(' ')
+    return [' '.join(words[i:i + words_per_chunk]) + (' ' if i + words_per_chunk < len(words) else '')
+            for i in range(0, len(words), words_per_chunk)]
+
+
+class LocalGeminiModel:
+    """Stand-in for genai.GenerativeModel"""
+
+    def __init__(self, backend: LocalBackend, model_name: str = "local-gemini"):
+        self.backend = backend
+        self.model_name = model_name
+
+    def _prepare(self, prompt: str, request_options: dict = None):
+        latency, failure = self.backend.plan("gemini", prompt)
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and latency > timeout:
+            # Like the real client: give up after the request timeout
+            latency, error = timeout, google_exceptions.DeadlineExceeded("504 Deadline Exceeded (local)")
+        elif failure == "rate_limit":
+            error = google_exceptions.ResourceExhausted("429 Quota exceeded (local injected). Please retry in 1s")
+        elif failure == "error":
+            error = google_exceptions.ServiceUnavailable("503 Service unavailable (local injected)")
+        else:
+            error = None
+        return latency, error
+
+    def _response(self, prompt: str, text: str):
+        prompt_tokens, completion_tokens, cached_tokens = self.backend.usage(prompt, text)
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=completion_tokens,
+                total_token_count=prompt_tokens + completion_tokens,
+                cached_content_token_count=cached_tokens
+            )
+        )
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options: dict = None):
+        latency, error = self._prepare(prompt, request_options)
+        text = self.backend.respond(prompt)
+        if stream:
+            return self._stream(prompt, text, latency, error)
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        return self._response(prompt, text)
+
+    def _stream(self, prompt: str, text: str, latency: float, error):
+        # Roughly 30% of the latency before the first chunk, the rest spread over the chunks
+        time.sleep(latency * 0.3)
+        if error is not None:
+            raise error
+        chunks = _chunks(text)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(latency * 0.7 / len(chunks))
+            yield SimpleNamespace(text=chunk)
+        yield self._response(prompt, '')
+
+    async def generate_content_async(self, prompt: str, request_options: dict = None):
+        latency, error = self._prepare(prompt, request_options)
+        await asyncio.sleep(latency)
+        if error is not None:
+            raise error
+        return self._response(prompt, self.backend.respond(prompt))
+
+
+class _LocalCompletions:
+    """Stand-in for client.chat.completions (sync or async)"""
+
+    def __init__(self, backend: LocalBackend, is_async: bool):
+        self.backend = backend
+        self.is_async = is_async
+
+    def _prepare(self, messages, timeout: float = None):
+        prompt = messages[-1]["content"]
+        latency, failure = self.backend.plan("deepseek", prompt)
+        if timeout is not None and latency > timeout:
+            latency, error = timeout, LocalLLMError("Request timed out. (local)")
+        elif failure == "rate_limit":
+            error = LocalLLMError("Error code: 429 - rate limit reached (local injected)")
+        elif failure == "error":
+            error = LocalLLMError("Error code: 503 - service unavailable (local injected)")
+        else:
+            error = None
+        return prompt, latency, error
+
+    def _completion(self, prompt: str, text: str, model: str):
+        prompt_tokens, completion_tokens, cached_tokens = self.backend.usage(prompt, text)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=SimpleNamespace(role="assistant", content=text))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+                prompt_cache_hit_tokens=cached_tokens,
+                prompt_cache_miss_tokens=prompt_tokens - cached_tokens
+            )
+        )
+
+    def _stream(self, prompt: str, text: str, model: str, latency: float, error):
+        time.sleep(latency * 0.3)
+        if error is not None:
+            raise error
+        chunks = _chunks(text)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(latency * 0.7 / len(chunks))
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=chunk))],
+                usage=None
+            )
+        final = self._completion(prompt, text, model)
+        yield SimpleNamespace(choices=[], usage=final.usage)
+
+    def create(self, model: str, messages: list, stream: bool = False, timeout: float = None, **kwargs):
+        prompt, latency, error = self._prepare(messages, timeout)
+        text = self.backend.respond(prompt)
+        if self.is_async:
+            return self._create_async(prompt, text, model, latency, error)
+        if stream:
+            return self._stream(prompt, text, model, latency, error)
+        time.sleep(latency)
+        if error is not None:
+            raise error
+        return self._completion(prompt, text, model)
+
+    async def _create_async(self, prompt: str, text: str, model: str, latency: float, error):
+        await asyncio.sleep(latency)
+        if error is not None:
+            raise error
+        return self._completion(prompt, text, model)
+
+
+class LocalDeepSeekClient:
+    """Stand-in for the OpenAI-compatible DeepSeek client"""
+
+    def __init__(self, backend: LocalBackend):
+        self.api_key = LOCAL_API_KEY
+        self.chat = SimpleNamespace(completions=_LocalCompletions(backend, is_async=False))
+
+
+class LocalAsyncDeepSeekClient:
+    """Stand-in for AsyncDeepSeekClient"""
+
+    def __init__(self, backend: LocalBackend):
+        self.api_key = LOCAL_API_KEY
+        self._client = SimpleNamespace(chat=SimpleNamespace(completions=_LocalCompletions(backend, is_async=True)))
+
+    def client(self):
+        return self._client
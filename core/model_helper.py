@@ -1,7 +1,91 @@
 
-import google.generativeai as genai
+import json
+import os
 import time
+import asyncio
+import threading
+import weakref
+import contextvars
+import contextlib
+import hashlib
+import functools
 from google.api_core import exceptions as google_exceptions
+from core.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_DISK_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+    GEMINI_RATE_LIMIT_RPM,
+    GEMINI_RATE_LIMIT_TPM,
+    DEEPSEEK_RATE_LIMIT_RPM,
+    DEEPSEEK_RATE_LIMIT_TPM,
+    RATE_LIMIT_MAX_WAIT_SECONDS,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_HEDGE_MAX_DELAY_SECONDS,
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_MIN_REQUESTS,
+    CIRCUIT_BREAKER_WINDOW,
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+    CIRCUIT_BREAKER_OPEN_SECONDS,
+    GEMINI_MODEL_CACHE_PATH,
+    GEMINI_MODEL_CACHE_TTL_SECONDS,
+    LLM_PROVIDER,
+    LOCAL_LLM_LATENCY,
+    LOCAL_LLM_ERROR_RATE,
+    LOCAL_LLM_RATE_LIMIT_RATE,
+    LOCAL_LLM_SEED,
+    LLM_CASSETTE_MODE,
+    LLM_CASSETTE_PATH,
+    LLM_CASSETTE_REPLAY_TIMING,
+    LLM_CASSETTE_ON_MISS,
+    GEMINI_INPUT_COST_PER_1M,
+    GEMINI_OUTPUT_COST_PER_1M,
+    DEEPSEEK_INPUT_COST_PER_1M,
+    DEEPSEEK_OUTPUT_COST_PER_1M,
+    GEMINI_CACHED_INPUT_COST_PER_1M,
+    DEEPSEEK_CACHED_INPUT_COST_PER_1M,
+    GEMINI_CONTEXT_CACHE,
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS,
+    LLM_TASK_TIERS,
+    LLM_CONTEXT_BUDGETS,
+    LLM_KEY_POOL_ENABLED,
+    LLM_KEY_POOL_POLICY,
+    LLM_ADAPTIVE_CONCURRENCY,
+    LLM_CONCURRENCY_INITIAL,
+    LLM_CONCURRENCY_MIN,
+    LLM_CONCURRENCY_MAX,
+    LLM_CONCURRENCY_BACKOFF,
+    LLM_CONCURRENCY_LATENCY_TOLERANCE,
+    GEMINI_API_KEY,
+    GEMINI_API_KEY_AGENT1,
+    GEMINI_API_KEY_AGENT2,
+    GEMINI_API_KEY_ORCHESTRATOR,
+    GEMINI_API_KEYS,
+    DEEPSEEK_API_KEY,
+    DEEPSEEK_API_KEY_ORCHESTRATOR,
+    DEEPSEEK_API_KEYS
+)
+from core.llm_cache import LLMResponseCache, CachedResponse
+from core.singleflight import SingleFlight, AsyncSingleFlight
+from core.rate_limiter import RateLimiterRegistry, parse_retry_after
+from core.http_pool import get_http_client, get_async_http_client
+from core.hedging import HedgePolicy, hedged_call
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from core.async_runtime import run_async
+from core.task_profiles import GEMINI_MODEL_TIERS, get_task_profile, configure_task_tiers, configure_context_budgets
+from core.context_budget import estimate_tokens
+from core.llm_metrics import LLMMetrics, call_label, current_call_label
+from core.cassette import LLMCassette, ReplayedResponse, REPLAY
+from core.local_llm import LocalBackend, LocalGeminiModel, LocalDeepSeekClient, LocalAsyncDeepSeekClient, LOCAL_API_KEY
+from core.key_pool import KeyPool
+from core.deadline import DeadlineExceeded, current_deadline
+from core.concurrency import ConcurrencyLimiterRegistry, ConcurrencyLimitTimeout
+from core.gemini_clients import KeyedGenerativeModel, create_cached_content, list_models as list_gemini_models
 
 # DeepSeek support (OpenAI-compatible)
 try:
@@ -11,6 +95,589 @@ except ImportError:
     DEEPSEEK_AVAILABLE = False
     openai = None
 
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+DEEPSEEK_MODEL = "local-deepseek" if LLM_PROVIDER == "local" else "deepseek-chat"
+DEEPSEEK_TEMPERATURE = 0.7
+
+# Completion size assumed when reserving tokens-per-minute budget before a call
+ESTIMATED_OUTPUT_TOKENS = 256
+
+# Shared response cache, created on first use
+_llm_cache = None
+
+def get_llm_cache():
+    """Get the process-wide LLM response cache (None when disabled)"""
+    global _llm_cache
+    if _llm_cache is None and LLM_CACHE_ENABLED:
+        _llm_cache = LLMResponseCache(
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=LLM_CACHE_TTL_SECONDS,
+            path=LLM_CACHE_PATH or None,
+            disk_max_entries=LLM_CACHE_DISK_MAX_ENTRIES
+        )
+    return _llm_cache
+
+def get_llm_cache_stats():
+    """Get hit/miss counters of the LLM response cache"""
+    cache = get_llm_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+# Concurrent identical requests share one provider call
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+
+def get_single_flight_stats():
+    """Get counters of collapsed (deduplicated) concurrent LLM calls, sync and async combined"""
+    stats = _single_flight.stats()
+    for name, count in _async_single_flight.stats().items():
+        stats[name] = stats.get(name, 0) + count
+    return stats
+
+# Shared per-API-key rate limiters
+_rate_limiters = RateLimiterRegistry({
+    "gemini": (GEMINI_RATE_LIMIT_RPM, GEMINI_RATE_LIMIT_TPM),
+    "deepseek": (DEEPSEEK_RATE_LIMIT_RPM, DEEPSEEK_RATE_LIMIT_TPM)
+})
+
+def get_rate_limiter(provider: str, api_key: str = None):
+    """Get the shared rate limiter of an API key (all callers of a key share its budget)"""
+    return _rate_limiters.get(provider, api_key)
+
+def configure_rate_limits(provider: str, requests_per_minute: float = None, tokens_per_minute: float = None,
+                          api_key: str = None):
+    """Set requests/tokens per minute budgets for one key, or every key of a provider"""
+    _rate_limiters.configure(provider, requests_per_minute, tokens_per_minute, api_key=api_key)
+
+def get_rate_limiter_stats():
+    """Get wait/penalty counters of every rate limiter"""
+    return _rate_limiters.stats()
+
+# Adaptive (AIMD) in-flight caps per API key, shared by every caller of the key
+# (orchestrator fan-out, web requests and the ingestion scripts alike)
+_concurrency_limiters = ConcurrencyLimiterRegistry(
+    initial_limit=LLM_CONCURRENCY_INITIAL,
+    min_limit=LLM_CONCURRENCY_MIN,
+    max_limit=LLM_CONCURRENCY_MAX,
+    backoff=LLM_CONCURRENCY_BACKOFF,
+    latency_tolerance=LLM_CONCURRENCY_LATENCY_TOLERANCE
+)
+
+def get_concurrency_limiter(provider: str, api_key: str = None):
+    """Get the adaptive concurrency limiter of an API key (None when LLM_ADAPTIVE_CONCURRENCY is off)"""
+    if not LLM_ADAPTIVE_CONCURRENCY:
+        return None
+    return _concurrency_limiters.get(provider, api_key)
+
+def get_concurrency_stats():
+    """Get the current in-flight cap, waits and increase/decrease counters of every key"""
+    return _concurrency_limiters.stats()
+
+@contextlib.contextmanager
+def _call_slot(provider: str, api_key: str, measure_latency: bool = True):
+    """Hold one of the key's in-flight slots around a provider call"""
+    limiter = get_concurrency_limiter(provider, api_key)
+    if limiter is None:
+        yield
+        return
+    with limiter.lease(timeout=_rate_limit_max_wait(), measure_latency=measure_latency):
+        yield
+
+@contextlib.asynccontextmanager
+async def _call_slot_async(provider: str, api_key: str):
+    """Async counterpart of _call_slot"""
+    limiter = get_concurrency_limiter(provider, api_key)
+    if limiter is None:
+        yield
+        return
+    async with limiter.lease_async(timeout=_rate_limit_max_wait()):
+        yield
+
+# Per-provider circuit breakers: unhealthy providers are skipped instead of retried
+_circuit_breakers = {
+    provider: CircuitBreaker(
+        provider,
+        failure_rate=CIRCUIT_BREAKER_FAILURE_RATE,
+        min_requests=CIRCUIT_BREAKER_MIN_REQUESTS,
+        window=CIRCUIT_BREAKER_WINDOW,
+        slow_call_seconds=CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+        open_seconds=CIRCUIT_BREAKER_OPEN_SECONDS,
+        enabled=CIRCUIT_BREAKER_ENABLED
+    )
+    for provider in ("gemini", "deepseek")
+}
+
+def get_circuit_breaker(provider: str):
+    """Get the circuit breaker of a provider ("gemini" or "deepseek")"""
+    return _circuit_breakers[provider]
+
+def is_provider_available(provider: str):
+    """
+    Check whether a call to a provider would be let through now
+    
+    A half-open circuit only counts as available while its probe is due
+    (the same rule as CircuitBreaker.allow_request, without using the probe up).
+    """
+    return get_circuit_breaker(provider).would_allow()
+
+def get_circuit_breaker_stats():
+    """Get the state and failure counters of every provider's circuit breaker"""
+    return {provider: breaker.stats() for provider, breaker in _circuit_breakers.items()}
+
+# Per-provider API key pools (LLM_KEY_POOL_*), created on first use
+_key_pools = {}
+_key_pools_lock = threading.Lock()
+# Clients/models of the pooled keys: (provider, model, config, key id) -> client or model
+_pooled_clients = {}
+_pooled_clients_lock = threading.Lock()
+
+def get_key_pool(provider: str):
+    """Get the key pool of a provider (None when pooling is off or fewer than two keys are configured)"""
+    with _key_pools_lock:
+        if provider not in _key_pools:
+            _key_pools[provider] = _build_key_pool(provider)
+        return _key_pools[provider]
+
+def _build_key_pool(provider: str):
+    if not LLM_KEY_POOL_ENABLED or use_local_llm():
+        return None
+    if provider == "gemini":
+        keys = [GEMINI_API_KEY, GEMINI_API_KEY_AGENT1, GEMINI_API_KEY_AGENT2, GEMINI_API_KEY_ORCHESTRATOR] + GEMINI_API_KEYS
+    else:
+        keys = [DEEPSEEK_API_KEY, DEEPSEEK_API_KEY_ORCHESTRATOR] + DEEPSEEK_API_KEYS
+    keys = [key for key in keys if _is_configured_key(key) and key != LOCAL_API_KEY]
+    if len(set(keys)) < 2:
+        return None
+    pool = KeyPool(provider, keys, lambda api_key: get_rate_limiter(provider, api_key), policy=LLM_KEY_POOL_POLICY)
+    print(f"✅ {provider} key pool: {len(pool)} keys ({pool.policy})")
+    return pool
+
+def get_key_pool_stats():
+    """Get calls and in-flight counts per pooled key (by key id)"""
+    with _key_pools_lock:
+        pools = dict(_key_pools)
+    return {provider: pool.stats() for provider, pool in pools.items() if pool is not None}
+
+@contextlib.contextmanager
+def _lease_key(provider: str, api_key: str, tokens: float):
+    """Key for one provider call: leased from the pool when api_key belongs to it, else api_key itself"""
+    pool = get_key_pool(provider) if api_key else None
+    if pool is None or api_key not in pool:
+        yield api_key
+        return
+    with pool.lease(tokens) as leased_key:
+        yield leased_key
+
+def _pool_key(model):
+    """Key a Gemini model was built with (None for models pinned to their key, e.g. cached content)"""
+    if getattr(model, 'key_pinned', False):
+        return None
+    return getattr(model, 'api_key', None)
+
+def _gemini_model_for_key(model, api_key: str):
+    """The same Gemini model (name and generation config) bound to another pooled key"""
+    if not api_key or api_key == getattr(model, 'api_key', None):
+        return model
+    params = getattr(model, 'task_params', None)
+    key = ("gemini", model.model_name, json.dumps(params, sort_keys=True, default=str), RateLimiterRegistry.key_id(api_key))
+    with _pooled_clients_lock:
+        pooled = _pooled_clients.get(key)
+    if pooled is None:
+        pooled = _build_gemini_model(model.model_name, api_key, params)
+        pooled.task_params = params
+        with _pooled_clients_lock:
+            pooled = _pooled_clients.setdefault(key, pooled)
+    return pooled
+
+def _deepseek_client_for_key(client, api_key: str):
+    """A DeepSeek client of the same kind (sync or async) for another pooled key"""
+    if not api_key or api_key == getattr(client, 'api_key', None):
+        return client
+    is_async = isinstance(client, AsyncDeepSeekClient)
+    key = ("deepseek", "async" if is_async else "sync", "", RateLimiterRegistry.key_id(api_key))
+    with _pooled_clients_lock:
+        pooled = _pooled_clients.get(key)
+    if pooled is None:
+        pooled = AsyncDeepSeekClient(api_key) if is_async else get_deepseek_model(api_key)
+        with _pooled_clients_lock:
+            pooled = _pooled_clients.setdefault(key, pooled)
+    return pooled
+
+def get_token_usage(response):
+    """
+    Extract prompt/completion/total token counts from a Gemini or DeepSeek response
+    
+    cached_prompt_tokens is the part of the prompt served from the provider's
+    context cache (Gemini cached content, DeepSeek prefix cache hits).
+    """
+    usage = {}
+    try:
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata is not None:
+            usage = {
+                "prompt_tokens": getattr(metadata, 'prompt_token_count', None),
+                "completion_tokens": getattr(metadata, 'candidates_token_count', None),
+                "total_tokens": getattr(metadata, 'total_token_count', None),
+                "cached_prompt_tokens": getattr(metadata, 'cached_content_token_count', None)
+            }
+        elif getattr(response, 'usage', None) is not None:
+            cached_tokens = getattr(response.usage, 'prompt_cache_hit_tokens', None)
+            if cached_tokens is None:
+                # OpenAI-style usage reports cache hits under prompt_tokens_details
+                cached_tokens = getattr(getattr(response.usage, 'prompt_tokens_details', None), 'cached_tokens', None)
+            usage = {
+                "prompt_tokens": getattr(response.usage, 'prompt_tokens', None),
+                "completion_tokens": getattr(response.usage, 'completion_tokens', None),
+                "total_tokens": getattr(response.usage, 'total_tokens', None),
+                "cached_prompt_tokens": cached_tokens
+            }
+    except Exception:
+        pass
+    return {name: count for name, count in usage.items() if count is not None}
+
+# Per-call token, latency and cost accounting (tagged with call_label(...))
+_llm_metrics = LLMMetrics(prices={
+    "gemini": (GEMINI_INPUT_COST_PER_1M, GEMINI_OUTPUT_COST_PER_1M, GEMINI_CACHED_INPUT_COST_PER_1M),
+    "deepseek": (DEEPSEEK_INPUT_COST_PER_1M, DEEPSEEK_OUTPUT_COST_PER_1M, DEEPSEEK_CACHED_INPUT_COST_PER_1M)
+})
+
+# Rate limit retries of the provider call currently being metered
+_retry_counter = contextvars.ContextVar("llm_retry_counter", default=None)
+
+def get_llm_metrics():
+    """Get per-label and per-provider call counts, tokens, cost and latency histograms"""
+    return _llm_metrics.snapshot()
+
+def reset_llm_metrics():
+    """Clear the per-call accounting"""
+    _llm_metrics.reset()
+
+def _record_call(provider, prompt, started, retries, response=None, text=None, error=False):
+    """Record a finished provider call, estimating tokens the provider didn't report"""
+    latency = time.monotonic() - started
+    if error:
+        _llm_metrics.record(provider, latency, retries=retries, outcome="error")
+        return
+    usage = get_token_usage(response) if response is not None else {}
+    _llm_metrics.record(
+        provider,
+        latency,
+        prompt_tokens=usage.get('prompt_tokens') or estimate_tokens(prompt),
+        completion_tokens=usage.get('completion_tokens') or estimate_tokens(text),
+        retries=retries,
+        cached_prompt_tokens=usage.get('cached_prompt_tokens') or 0
+    )
+
+def _metered(provider, prompt, call, extract_text):
+    """Wrap a provider call so its tokens, wall time and retries are recorded"""
+    def metered_call():
+        counter = [0]
+        token = _retry_counter.set(counter)
+        started = time.monotonic()
+        try:
+            response = call()
+        except Exception:
+            _record_call(provider, prompt, started, counter[0], error=True)
+            raise
+        finally:
+            _retry_counter.reset(token)
+        # Below the response cache and single-flight, so only real provider calls feed the hedge delay
+        _hedge_policy.record_latency(provider, time.monotonic() - started)
+        try:
+            text = extract_text(response)
+        except Exception:
+            text = ''
+        _record_call(provider, prompt, started, counter[0], response=response, text=text)
+        return response
+    
+    return metered_call
+
+def _metered_async(provider, prompt, call, extract_text):
+    """Async counterpart of _metered"""
+    async def metered_call():
+        counter = [0]
+        token = _retry_counter.set(counter)
+        started = time.monotonic()
+        try:
+            response = await call()
+        except Exception:
+            _record_call(provider, prompt, started, counter[0], error=True)
+            raise
+        finally:
+            _retry_counter.reset(token)
+        # Below the response cache and single-flight, so only real provider calls feed the hedge delay
+        _hedge_policy.record_latency(provider, time.monotonic() - started)
+        try:
+            text = extract_text(response)
+        except Exception:
+            text = ''
+        _record_call(provider, prompt, started, counter[0], response=response, text=text)
+        return response
+    
+    return metered_call
+
+def _metered_stream(provider, prompt, stream):
+    """Record a text stream once it finishes (tokens are estimated from the text)"""
+    label = current_call_label()
+    counter = [0]
+    started = time.monotonic()
+    chunks = []
+    iterator = stream()
+    while True:
+        # The retry counter is only set while the stream runs, never across a yield
+        token = _retry_counter.set(counter)
+        try:
+            text = next(iterator)
+        except StopIteration:
+            break
+        except Exception:
+            _llm_metrics.record(provider, time.monotonic() - started, retries=counter[0], outcome="error", label=label)
+            raise
+        finally:
+            _retry_counter.reset(token)
+        chunks.append(text)
+        yield text
+    
+    full_text = ''.join(chunks)
+    _llm_metrics.record(
+        provider,
+        time.monotonic() - started,
+        prompt_tokens=estimate_tokens(prompt),
+        completion_tokens=estimate_tokens(full_text),
+        retries=counter[0],
+        label=label
+    )
+
+# Record/replay cassette (LLM_CASSETTE_MODE), created on first use
+_cassette = None
+
+def get_cassette():
+    """Get the shared cassette, or None when record/replay is off"""
+    global _cassette
+    if _cassette is None and LLM_CASSETTE_MODE:
+        _cassette = LLMCassette(
+            LLM_CASSETTE_PATH,
+            mode=LLM_CASSETTE_MODE,
+            replay_timing=LLM_CASSETTE_REPLAY_TIMING,
+            on_miss=LLM_CASSETTE_ON_MISS
+        )
+    return _cassette
+
+def get_cassette_stats():
+    """Get recorded/replayed call counts and provider seconds (None when record/replay is off)"""
+    cassette = get_cassette()
+    return cassette.stats() if cassette is not None else None
+
+def _with_cassette(provider, model_name, prompt, params, call, extract_text):
+    """Wrap a provider call so it is recorded to or replayed from the cassette"""
+    cassette = get_cassette()
+    if cassette is None:
+        return call
+    
+    def recorded_call():
+        if cassette.mode == REPLAY:
+            entry = cassette.lookup(provider, prompt, params)
+            if entry is not None:
+                if cassette.replay_timing:
+                    time.sleep(entry["latency"])
+                return ReplayedResponse(entry["response"], provider=provider, usage=entry.get("usage"))
+            cassette.miss(provider, prompt)
+            return call()
+        
+        started = time.monotonic()
+        response = call()
+        try:
+            text = extract_text(response)
+        except Exception:
+            return response
+        cassette.record(provider, model_name, prompt, params, text, time.monotonic() - started, get_token_usage(response))
+        return response
+    
+    return recorded_call
+
+def _with_cassette_async(provider, model_name, prompt, params, call, extract_text):
+    """Async counterpart of _with_cassette"""
+    cassette = get_cassette()
+    if cassette is None:
+        return call
+    
+    async def recorded_call():
+        if cassette.mode == REPLAY:
+            entry = cassette.lookup(provider, prompt, params)
+            if entry is not None:
+                if cassette.replay_timing:
+                    await asyncio.sleep(entry["latency"])
+                return ReplayedResponse(entry["response"], provider=provider, usage=entry.get("usage"))
+            cassette.miss(provider, prompt)
+            return await call()
+        
+        started = time.monotonic()
+        response = await call()
+        try:
+            text = extract_text(response)
+        except Exception:
+            return response
+        cassette.record(provider, model_name, prompt, params, text, time.monotonic() - started, get_token_usage(response))
+        return response
+    
+    return recorded_call
+
+def _stream_with_cassette(provider, model_name, prompt, params, stream):
+    """Record a text stream to the cassette, or replay it as a single chunk"""
+    cassette = get_cassette()
+    if cassette is None:
+        yield from stream()
+        return
+    
+    if cassette.mode == REPLAY:
+        entry = cassette.lookup(provider, prompt, params)
+        if entry is not None:
+            if cassette.replay_timing:
+                time.sleep(entry["latency"])
+            yield entry["response"]
+            return
+        cassette.miss(provider, prompt)
+        yield from stream()
+        return
+    
+    started = time.monotonic()
+    chunks = []
+    for text in stream():
+        chunks.append(text)
+        yield text
+    if chunks:
+        cassette.record(provider, model_name, prompt, params, ''.join(chunks), time.monotonic() - started)
+
+def _generate_with_layers(provider, model_name, prompt, params, call, extract_text, use_cache, coalesce):
+    """
+    Serve an LLM request through the response cache, single-flight and cassette layers
+    
+    Args:
+        provider: Provider name used in the cache key ("gemini" or "deepseek")
+        model_name: Model name used in the cache key
+        prompt: Prompt text
+        params: Generation params that affect the output
+        call: Zero-argument callable that performs the provider call
+        extract_text: Extracts the text to cache from a provider response
+        use_cache: Look up and store the response in the cache
+        coalesce: Share one in-flight call between concurrent identical requests
+    """
+    key = LLMResponseCache.make_key(provider, model_name, prompt, params)
+    cache = get_llm_cache() if use_cache else None
+    
+    if cache is not None:
+        cached_text = cache.get(key)
+        if cached_text is not None:
+            _llm_metrics.record(provider, 0.0, outcome="cache_hit")
+            return CachedResponse(cached_text, provider=provider)
+    
+    call = _metered(provider, prompt, _with_cassette(provider, model_name, prompt, params, call, extract_text), extract_text)
+    
+    def call_and_store():
+        response = call()
+        if cache is not None:
+            try:
+                cache.set(key, extract_text(response), provider=provider, model=model_name)
+            except Exception:
+                # Blocked or empty responses have no text - don't cache them
+                pass
+        return response
+    
+    if coalesce:
+        return _single_flight.do(key, call_and_store)
+    return call_and_store()
+
+async def _run_cache_io(cache, fn, *args, **kwargs):
+    """Run a cache operation, on the executor when it may block on the SQLite tier"""
+    if not cache.on_disk:
+        return fn(*args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+async def _generate_with_layers_async(provider, model_name, prompt, params, call, extract_text, use_cache, coalesce):
+    """
+    Async counterpart of _generate_with_layers (call is a zero-argument coroutine function)
+    
+    Disk-tier cache reads and writes run on the executor so they don't block
+    the shared event loop.
+    """
+    key = LLMResponseCache.make_key(provider, model_name, prompt, params)
+    cache = get_llm_cache() if use_cache else None
+    
+    if cache is not None:
+        cached_text = await _run_cache_io(cache, cache.get, key)
+        if cached_text is not None:
+            _llm_metrics.record(provider, 0.0, outcome="cache_hit")
+            return CachedResponse(cached_text, provider=provider)
+    
+    call = _metered_async(provider, prompt, _with_cassette_async(provider, model_name, prompt, params, call, extract_text), extract_text)
+    
+    async def call_and_store():
+        response = await call()
+        if cache is not None:
+            try:
+                await _run_cache_io(cache, cache.set, key, extract_text(response), provider=provider, model=model_name)
+            except Exception:
+                pass
+        return response
+    
+    if coalesce:
+        return await _async_single_flight.do(key, call_and_store)
+    return await call_and_store()
+
+def _is_rate_limit_error(error):
+    """Check whether a provider error is a rate limit / quota error"""
+    error_str = str(error).lower()
+    return "quota" in error_str or "429" in error_str or "rate limit" in error_str
+
+def _pause_after_rate_limit(limiter, error, attempt, max_retries, base_delay, label):
+    """
+    Store the provider's retry hint (or an exponential backoff) on the key's limiter
+    so every caller using this key waits, not just this one. Raises once retries are
+    exhausted or the pause would outlast the request deadline.
+    """
+    retry_delay = parse_retry_after(error) or base_delay * (2 ** attempt)
+    limiter.penalize(retry_delay)
+    
+    if attempt >= max_retries - 1:
+        raise Exception(f"Rate limit exceeded after {max_retries} attempts")
+    deadline = current_deadline()
+    if deadline is not None and retry_delay >= deadline.remaining():
+        raise DeadlineExceeded(f"{label} pause of {retry_delay:.1f}s would exceed the request deadline")
+    counter = _retry_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    print(f"{label} hit, pausing key for {retry_delay:.1f}s (attempt {attempt + 1}/{max_retries})...")
+
+def _check_deadline(provider):
+    """Stop before another attempt once the request deadline is spent"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(f"{provider} call")
+
+def _record_failure(breaker, error=None):
+    """Count a failed call against the provider unless the request deadline or a local limit cut it short"""
+    if isinstance(error, ConcurrencyLimitTimeout):
+        return
+    deadline = current_deadline()
+    if deadline is None or not deadline.expired:
+        breaker.record_failure()
+
+def _rate_limit_max_wait():
+    """Longest rate limiter wait allowed for the next attempt (capped by the request deadline)"""
+    deadline = current_deadline()
+    if deadline is None:
+        return RATE_LIMIT_MAX_WAIT_SECONDS
+    return deadline.cap(RATE_LIMIT_MAX_WAIT_SECONDS)
+
+def _request_options(provider):
+    """Per-call timeout keyword arguments for the time left on the request deadline"""
+    deadline = current_deadline()
+    if deadline is None:
+        return {}
+    timeout = max(deadline.remaining(), 0.1)
+    if provider == "gemini":
+        return {"request_options": {"timeout": timeout}}
+    return {"timeout": timeout}
+
 def get_response_text(response):
     """Extract text from Gemini API response"""
     try:
@@ -26,24 +693,124 @@ def get_response_text(response):
     except Exception as e:
         return f"Error extracting response: {str(e)}"
 
-def get_gemini_model(api_key: str):
-    """Get the best available Gemini model"""
-    genai.configure(api_key=api_key)
-    # Prefer supported models for this API version (remove unsupported flash variant)
-    model_names = [
-        'gemini-2.5-pro',
-        'gemini-1.5-pro', 
-        'gemini-1.0-pro',
-        'gemini-pro'
-    ]
+# Resolved Gemini model name per API key, shared in-process and via a small JSON file
+_gemini_model_names = {}  # key id -> (model name, resolved_at)
+_gemini_model_lock = threading.Lock()
+
+def _load_gemini_model_cache():
+    """Read the on-disk model name cache ({} when missing or unreadable)"""
+    if not GEMINI_MODEL_CACHE_PATH:
+        return {}
+    try:
+        with open(GEMINI_MODEL_CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _gemini_model_cache_key(api_key: str, tier: str):
+    key_id = RateLimiterRegistry.key_id(api_key)
+    return key_id if tier == "quality" else f"{key_id}:{tier}"
+
+def _get_cached_gemini_model_name(api_key: str, tier: str = "quality"):
+    """Get the previously resolved model name for an API key and tier (None if unknown or expired)"""
+    key_id = _gemini_model_cache_key(api_key, tier)
+    now = time.time()
+    with _gemini_model_lock:
+        entry = _gemini_model_names.get(key_id)
+        if entry is None:
+            disk_entry = _load_gemini_model_cache().get(key_id)
+            if disk_entry:
+                entry = (disk_entry.get('model'), disk_entry.get('resolved_at', 0))
+                _gemini_model_names[key_id] = entry
+        if entry and entry[0] and now - entry[1] <= GEMINI_MODEL_CACHE_TTL_SECONDS:
+            return entry[0]
+    return None
+
+def _remember_gemini_model_name(api_key: str, model_name: str, tier: str = "quality"):
+    """Store a resolved model name in memory and on disk"""
+    key_id = _gemini_model_cache_key(api_key, tier)
+    now = time.time()
+    with _gemini_model_lock:
+        _gemini_model_names[key_id] = (model_name, now)
+        if not GEMINI_MODEL_CACHE_PATH:
+            return
+        try:
+            entries = _load_gemini_model_cache()
+            entries[key_id] = {"model": model_name, "resolved_at": now}
+            os.makedirs(os.path.dirname(os.path.abspath(GEMINI_MODEL_CACHE_PATH)), exist_ok=True)
+            # Write to a temp file and rename so concurrent processes never read a partial file
+            tmp_path = f"{GEMINI_MODEL_CACHE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, GEMINI_MODEL_CACHE_PATH)
+        except OSError as e:
+            print(f"Gemini model cache: could not write {GEMINI_MODEL_CACHE_PATH} ({e})")
+
+def _build_gemini_model(model_name: str, api_key: str, generation_config: dict = None):
+    # Bound to its own key's clients, not the process-global genai.configure() key
+    model = KeyedGenerativeModel(model_name, api_key=api_key, generation_config=generation_config or None)
+    # Test if model is accessible by getting its name
+    _ = model.model_name
+    model.rate_limiter = get_rate_limiter("gemini", api_key)
+    return model
+
+# Offline stand-in backend (LLM_PROVIDER=local), created on first use
+_local_backend = None
+
+def use_local_llm():
+    """Whether LLM calls are served by the offline stand-in provider"""
+    return LLM_PROVIDER == "local"
+
+def get_local_backend():
+    """Get the shared local backend (latency/error settings from LOCAL_LLM_*)"""
+    global _local_backend
+    if _local_backend is None:
+        _local_backend = LocalBackend(
+            latency=LOCAL_LLM_LATENCY,
+            error_rate=LOCAL_LLM_ERROR_RATE,
+            rate_limit_rate=LOCAL_LLM_RATE_LIMIT_RATE,
+            seed=LOCAL_LLM_SEED
+        )
+        # No quota to protect, so the local key is never throttled
+        configure_rate_limits("gemini", 0, 0, api_key=LOCAL_API_KEY)
+        configure_rate_limits("deepseek", 0, 0, api_key=LOCAL_API_KEY)
+        print(f"Using local LLM provider (latency {LOCAL_LLM_LATENCY}, error rate {LOCAL_LLM_ERROR_RATE}, "
+              f"rate limit rate {LOCAL_LLM_RATE_LIMIT_RATE}, seed {LOCAL_LLM_SEED})")
+    return _local_backend
+
+def get_gemini_model(api_key: str, tier: str = "quality", generation_config: dict = None):
+    """
+    Get the best available Gemini model of a tier
+    
+    The resolved model name is cached per API key and tier (in memory and on disk,
+    see GEMINI_MODEL_CACHE_*), so later calls and other processes skip discovery.
+    
+    Args:
+        api_key: Gemini API key
+        tier: "quality" (default) or "fast" (see core.task_profiles.GEMINI_MODEL_TIERS)
+        generation_config: Optional generation config bound to the model
+    """
+    if use_local_llm():
+        model = LocalGeminiModel(get_local_backend(), model_name=f"local-gemini-{tier}" if tier != "quality" else "local-gemini")
+        model.rate_limiter = get_rate_limiter("gemini", LOCAL_API_KEY)
+        return model
+    
+    cached_name = _get_cached_gemini_model_name(api_key, tier)
+    if cached_name:
+        try:
+            return _build_gemini_model(cached_name, api_key, generation_config)
+        except Exception:
+            pass
+    
+    # Prefer supported models of the tier for this API version
+    model_names = GEMINI_MODEL_TIERS[tier]
     
     # Try each model in order
     last_error = None
     for model_name in model_names:
         try:
-            model = genai.GenerativeModel(model_name)
-            # Test if model is accessible by getting its name
-            _ = model.model_name
+            model = _build_gemini_model(model_name, api_key, generation_config)
+            _remember_gemini_model_name(api_key, model_name, tier)
             return model
         except Exception as e:
             last_error = e
@@ -51,15 +818,21 @@ def get_gemini_model(api_key: str):
     
     # If all models fail, try to list available models
     try:
-        available_models = list(genai.list_models())
+        available_models = list_gemini_models(api_key)
         generate_models = [
             m for m in available_models 
             if 'generateContent' in m.supported_generation_methods
         ]
         
+        if tier == "fast":
+            # Prefer flash models for the fast tier
+            generate_models.sort(key=lambda m: 'flash' not in m.name)
+        
         if generate_models:
             model_name = generate_models[0].name.split('/')[-1]
-            return genai.GenerativeModel(model_name)
+            model = _build_gemini_model(model_name, api_key, generation_config)
+            _remember_gemini_model_name(api_key, model_name, tier)
+            return model
     except Exception:
         pass
     
@@ -71,72 +844,371 @@ def get_gemini_model(api_key: str):
         f"Try: gemini-1.5-flash, gemini-1.5-pro, or gemini-pro"
     )
 
-def generate_content_with_retry(model, prompt, max_retries=3, base_delay=1.0):
-    """Generate content with automatic retry for rate limit errors"""
-    last_error = None
+# Task profiles: tier overrides from LLM_TASK_TIERS, context budgets from LLM_CONTEXT_BUDGETS,
+# models resolved once per (task, API key)
+configure_task_tiers(LLM_TASK_TIERS)
+configure_context_budgets(LLM_CONTEXT_BUDGETS)
+_task_models = {}
+_task_models_lock = threading.Lock()
+
+def get_task_model(task: str, api_key: str):
+    """
+    Get the Gemini model for a task profile ("route", "suggest", "answer", "aggregate", "summarize")
+    
+    The model uses the profile's tier and generation config and is resolved
+    once per task and API key.
+    """
+    profile = get_task_profile(task)
+    key = (task, RateLimiterRegistry.key_id(api_key))
+    with _task_models_lock:
+        model = _task_models.get(key)
+    if model is None:
+        generation_config = profile.gemini_generation_config()
+        model = get_gemini_model(api_key, tier=profile.tier, generation_config=generation_config)
+        # Outputs differ per generation config, so it is part of the cache key
+        model.task_params = generation_config or None
+        with _task_models_lock:
+            model = _task_models.setdefault(key, model)
+    return model
+
+def _deepseek_params(task=None):
+    """Generation params of a DeepSeek call (the task profile's, or the default temperature)"""
+    if task is None:
+        return {"temperature": DEEPSEEK_TEMPERATURE}
+    return dict({"temperature": DEEPSEEK_TEMPERATURE}, **get_task_profile(task).deepseek_params())
+
+# Gemini cached-content models of stable prompt prefixes: key -> (model or None, refresh_at)
+_context_caches = {}
+_context_caches_lock = threading.Lock()
+# Separate from _single_flight so cache creation doesn't count as deduplicated LLM calls
+_context_cache_flight = SingleFlight()
+
+def is_context_cacheable(text: str):
+    """Whether a stable prompt prefix is big enough to be stored as Gemini cached content"""
+    return GEMINI_CONTEXT_CACHE and not use_local_llm() and estimate_tokens(text) >= GEMINI_CONTEXT_CACHE_MIN_TOKENS
+
+def with_context_cache(model, prompt: str, prefix: str, api_key: str):
+    """
+    Serve the stable prefix of a Gemini prompt from explicit cached content
+
+    Args:
+        model: Gemini model the prompt was meant for
+        prompt: Full prompt, starting with prefix
+        prefix: Stable part of the prompt (e.g. an agent's whole schedule)
+        api_key: Key the cached content is created with
+
+    Returns:
+        (model, prompt) to send: a model bound to cached content holding the
+        prefix plus the rest of the prompt, or the inputs unchanged when the
+        prefix is too small, caching is off or cached content can't be created
+    """
+    if not prefix or not prompt.startswith(prefix) or not is_context_cacheable(prefix):
+        return model, prompt
+
+    digest = hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:16]
+    key = f"{RateLimiterRegistry.key_id(api_key)}:{getattr(model, 'model_name', '')}:{digest}"
+    with _context_caches_lock:
+        entry = _context_caches.get(key)
+    if entry is None or entry[1] <= time.time():
+        # Concurrent callers with the same prefix share one creation request
+        entry = _context_cache_flight.do(key, lambda: _create_context_cache(model, prefix, api_key, digest))
+        with _context_caches_lock:
+            _context_caches[key] = entry
+
+    cached_model = entry[0]
+    if cached_model is None:
+        return model, prompt
+    return cached_model, prompt[len(prefix):].lstrip()
+
+def with_cached_prefix_extension(model, prompt: str, prefix: str, extended_prefix: str, api_key: str):
+    """
+    Swap a prompt's prefix for a longer one (e.g. with a whole schedule) only when that is cached
+    
+    The extension is only worth sending as Gemini cached content: when the
+    extended prefix can't be cached the prompt goes out unchanged, so an
+    uncached call never carries it.
+    
+    Args:
+        model: Gemini model the prompt was meant for
+        prompt: Full prompt, starting with prefix
+        prefix: Stable part of the prompt as built
+        extended_prefix: Replacement for prefix to serve from cached content ("" = none)
+        api_key: Key the cached content is created with
+    
+    Returns:
+        (model, prompt) to send
+    """
+    if not extended_prefix or not prompt.startswith(prefix):
+        return model, prompt
+    cached_model, rest = with_context_cache(model, extended_prefix + prompt[len(prefix):], extended_prefix, api_key)
+    if cached_model is model:
+        return model, prompt
+    return cached_model, rest
+
+def _create_context_cache(model, prefix: str, api_key: str, digest: str):
+    """Create cached content for a prefix; returns (model or None, refresh_at)"""
+    now = time.time()
+    try:
+        cached_content = create_cached_content(
+            api_key,
+            model.model_name,
+            prefix,
+            GEMINI_CONTEXT_CACHE_TTL_SECONDS,
+            display_name=f"prefix-{digest}"
+        )
+        cached_model = KeyedGenerativeModel.from_cached_content(
+            cached_content,
+            generation_config=getattr(model, 'task_params', None) or None
+        )
+        # Cached content belongs to the key that created it, so calls stay on that key
+        cached_model.bind_api_key(api_key)
+        cached_model.key_pinned = True
+        cached_model.rate_limiter = getattr(model, 'rate_limiter', None) or get_rate_limiter("gemini", api_key)
+        # The prompt no longer contains the prefix, so its hash goes into the response cache key
+        cached_model.task_params = dict(getattr(model, 'task_params', None) or {}, cached_prefix=digest)
+        print(f"✅ Gemini context cache created for {model.model_name} (~{estimate_tokens(prefix)} tokens)")
+        # Refresh a minute before the cached content expires
+        return cached_model, now + max(GEMINI_CONTEXT_CACHE_TTL_SECONDS - 60, 1)
+    except Exception as e:
+        print(f"⚠️  Gemini context cache unavailable for {getattr(model, 'model_name', 'model')}: {e}")
+        # Don't retry creation on every call
+        return None, now + GEMINI_CONTEXT_CACHE_TTL_SECONDS
+
+def generate_content_with_retry(model, prompt, max_retries=3, base_delay=1.0, use_cache=True, coalesce=True):
+    """
+    Generate content with automatic retry for rate limit errors
+    
+    Identical prompts are served from the response cache unless use_cache=False
+    (use that for answers that depend on changing data). Concurrent identical
+    prompts share one in-flight call unless coalesce=False.
+    """
+    return _generate_with_layers(
+        "gemini",
+        getattr(model, 'model_name', ''),
+        prompt,
+        getattr(model, 'task_params', None),
+        lambda: _generate_gemini_with_retry(model, prompt, max_retries, base_delay),
+        lambda response: response.text,
+        use_cache,
+        coalesce
+    )
+
+def _generate_gemini_with_retry(model, prompt, max_retries, base_delay):
+    """Call Gemini, pacing requests through the key's rate limiter and retrying on rate limit errors"""
+    breaker = get_circuit_breaker("gemini")
+    estimated_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
     
     for attempt in range(max_retries):
-        try:
-            response = model.generate_content(prompt)
-            return response
-        except google_exceptions.ResourceExhausted as e:
-            last_error = e
-            error_str = str(e)
-            if "quota" in error_str.lower() or "429" in error_str or "rate limit" in error_str.lower():
-                # Calculate retry delay with exponential backoff
-                retry_delay = base_delay * (2 ** attempt)
-                
-                # Try to extract retry time from error message
-                if "retry in" in error_str.lower() or "retry-after" in error_str.lower():
-                    try:
-                        import re
-                        # Look for patterns like "retry in 60s" or "retry-after: 60"
-                        delay_match = re.search(r'retry[-\s]*(?:in|after)[\s:]*(\d+)', error_str.lower())
-                        if delay_match:
-                            retry_delay = float(delay_match.group(1)) + 2
-                        else:
-                            # Try another pattern
-                            delay_match = re.search(r'(\d+)\s*second', error_str.lower())
-                            if delay_match:
-                                retry_delay = float(delay_match.group(1)) + 2
-                    except:
-                        pass
-                
-                # Cap delay at 10 seconds
-                retry_delay = min(retry_delay, 10.0)
-                
-                if attempt < max_retries - 1:
-                    print(f"Rate limit hit, retrying in {retry_delay:.1f}s (attempt {attempt + 1}/{max_retries})...")
-                    time.sleep(retry_delay)
-                    continue
+        _check_deadline("gemini")
+        breaker.before_call()
+        # Each attempt leases a key from the pool, so a rate-limited key is skipped on retry
+        with _lease_key("gemini", _pool_key(model), estimated_tokens) as api_key:
+            call_model = _gemini_model_for_key(model, api_key)
+            limiter = getattr(call_model, 'rate_limiter', None) or get_rate_limiter("gemini")
+            # Wait for capacity up front instead of failing with a 429
+            limiter.acquire(estimated_tokens, max_wait=_rate_limit_max_wait())
+            call_started = time.monotonic()
+            try:
+                with _call_slot("gemini", api_key):
+                    response = call_model.generate_content(prompt, **_request_options("gemini"))
+                breaker.record_success(time.monotonic() - call_started)
+                limiter.record_usage(estimated_tokens, get_token_usage(response).get('total_tokens'))
+                return response
+            except google_exceptions.ResourceExhausted as e:
+                if not _is_rate_limit_error(e):
+                    _record_failure(breaker, e)
+                    raise
+                _pause_after_rate_limit(limiter, e, attempt, max_retries, base_delay, "Rate limit")
+            except Exception as e:
+                _record_failure(breaker, e)
+                if attempt == 0:
+                    raise
                 else:
-                    raise Exception(f"Rate limit exceeded after {max_retries} attempts")
-            else:
-                raise
-        except Exception as e:
-            if attempt == 0:
-                raise
-            else:
-                raise Exception(f"Error after {attempt + 1} attempts: {str(e)}")
+                    raise Exception(f"Error after {attempt + 1} attempts: {str(e)}")
+
+async def generate_content_async(model, prompt, max_retries=3, base_delay=1.0, use_cache=True, coalesce=True):
+    """
+    Async counterpart of generate_content_with_retry
+    
+    Same cache, single-flight, rate limiting and retry semantics, but waits
+    on the event loop instead of blocking a thread.
+    """
+    return await _generate_with_layers_async(
+        "gemini",
+        getattr(model, 'model_name', ''),
+        prompt,
+        getattr(model, 'task_params', None),
+        lambda: _generate_gemini_with_retry_async(model, prompt, max_retries, base_delay),
+        lambda response: response.text,
+        use_cache,
+        coalesce
+    )
+
+async def _generate_gemini_with_retry_async(model, prompt, max_retries, base_delay):
+    """Async counterpart of _generate_gemini_with_retry"""
+    breaker = get_circuit_breaker("gemini")
+    estimated_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    
+    for attempt in range(max_retries):
+        _check_deadline("gemini")
+        breaker.before_call()
+        # Each attempt leases a key from the pool, so a rate-limited key is skipped on retry
+        with _lease_key("gemini", _pool_key(model), estimated_tokens) as api_key:
+            call_model = _gemini_model_for_key(model, api_key)
+            limiter = getattr(call_model, 'rate_limiter', None) or get_rate_limiter("gemini")
+            await limiter.acquire_async(estimated_tokens, max_wait=_rate_limit_max_wait())
+            call_started = time.monotonic()
+            try:
+                async with _call_slot_async("gemini", api_key):
+                    response = await call_model.generate_content_async(prompt, **_request_options("gemini"))
+                breaker.record_success(time.monotonic() - call_started)
+                limiter.record_usage(estimated_tokens, get_token_usage(response).get('total_tokens'))
+                return response
+            except google_exceptions.ResourceExhausted as e:
+                if not _is_rate_limit_error(e):
+                    _record_failure(breaker, e)
+                    raise
+                _pause_after_rate_limit(limiter, e, attempt, max_retries, base_delay, "Rate limit")
+            except Exception as e:
+                _record_failure(breaker, e)
+                if attempt == 0:
+                    raise
+                else:
+                    raise Exception(f"Error after {attempt + 1} attempts: {str(e)}")
+
+def stream_content_with_retry(model, prompt, max_retries=3, base_delay=1.0, use_cache=True):
+    """
+    Stream Gemini output as text chunks
+    
+    Shares the response cache with generate_content_with_retry (a cache hit is
+    yielded as a single chunk). Rate limit retries only happen before the first
+    chunk is sent; errors after that are raised to the caller.
+    """
+    params = getattr(model, 'task_params', None)
+    key = LLMResponseCache.make_key("gemini", getattr(model, 'model_name', ''), prompt, params)
+    cache = get_llm_cache() if use_cache else None
     
-    raise last_error
+    if cache is not None:
+        cached_text = cache.get(key)
+        if cached_text is not None:
+            _llm_metrics.record("gemini", 0.0, outcome="cache_hit")
+            yield cached_text
+            return
+    
+    chunks = []
+    stream = _metered_stream("gemini", prompt, lambda: _stream_with_cassette(
+        "gemini", getattr(model, 'model_name', ''), prompt, params,
+        lambda: _stream_gemini_with_retry(model, prompt, max_retries, base_delay)
+    ))
+    for text in stream:
+        chunks.append(text)
+        yield text
+    
+    if cache is not None and chunks:
+        cache.set(key, ''.join(chunks), provider="gemini", model=getattr(model, 'model_name', ''))
+
+def _stream_gemini_with_retry(model, prompt, max_retries, base_delay):
+    """Stream a Gemini call through the key's rate limiter, retrying rate limit errors before the first chunk"""
+    breaker = get_circuit_breaker("gemini")
+    estimated_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    
+    for attempt in range(max_retries):
+        _check_deadline("gemini")
+        breaker.before_call()
+        # Each attempt leases a key from the pool, so a rate-limited key is skipped on retry
+        with _lease_key("gemini", _pool_key(model), estimated_tokens) as api_key:
+            call_model = _gemini_model_for_key(model, api_key)
+            limiter = getattr(call_model, 'rate_limiter', None) or get_rate_limiter("gemini")
+            limiter.acquire(estimated_tokens, max_wait=_rate_limit_max_wait())
+            call_started = time.monotonic()
+            started = False
+            try:
+                last_chunk = None
+                with _call_slot("gemini", api_key, measure_latency=False):
+                    for chunk in call_model.generate_content(prompt, stream=True, **_request_options("gemini")):
+                        last_chunk = chunk
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            # Chunks without text parts (e.g. the final safety/usage chunk)
+                            continue
+                        if text:
+                            started = True
+                            yield text
+                breaker.record_success(time.monotonic() - call_started)
+                # The last chunk carries the usage metadata of the whole stream
+                limiter.record_usage(estimated_tokens, get_token_usage(last_chunk).get('total_tokens'))
+                return
+            except google_exceptions.ResourceExhausted as e:
+                if started or not _is_rate_limit_error(e):
+                    _record_failure(breaker, e)
+                    raise
+                _pause_after_rate_limit(limiter, e, attempt, max_retries, base_delay, "Rate limit")
+            except Exception as e:
+                _record_failure(breaker, e)
+                if attempt == 0 or started:
+                    raise
+                else:
+                    raise Exception(f"Error after {attempt + 1} attempts: {str(e)}")
 
 # DeepSeek API support
 def get_deepseek_model(api_key: str):
     """Get DeepSeek model (OpenAI-compatible API)"""
+    if use_local_llm():
+        return LocalDeepSeekClient(get_local_backend())
+    
     if not DEEPSEEK_AVAILABLE:
         raise ImportError(
             "OpenAI library not installed. Install it with: pip install openai"
         )
     
-    # Configure OpenAI client for DeepSeek
+    # Configure OpenAI client for DeepSeek (all clients share one connection pool)
     client = openai.OpenAI(
         api_key=api_key,
-        base_url="https://api.deepseek.com"
+        base_url=DEEPSEEK_BASE_URL,
+        http_client=get_http_client()
     )
     
     return client
 
+class AsyncDeepSeekClient:
+    """
+    Async DeepSeek client built on openai.AsyncOpenAI
+    
+    Async HTTP pools are bound to an event loop, so one AsyncOpenAI instance
+    is kept per loop, each using that loop's shared connection pool.
+    """
+    
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+    
+    def client(self):
+        """Get the AsyncOpenAI client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = openai.AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=DEEPSEEK_BASE_URL,
+                    http_client=get_async_http_client()
+                )
+                self._clients[loop] = client
+            return client
+
+def get_async_deepseek_model(api_key: str):
+    """Get an async DeepSeek client (OpenAI-compatible API)"""
+    if use_local_llm():
+        return LocalAsyncDeepSeekClient(get_local_backend())
+    
+    if not DEEPSEEK_AVAILABLE:
+        raise ImportError(
+            "OpenAI library not installed. Install it with: pip install openai"
+        )
+    return AsyncDeepSeekClient(api_key)
+
 def get_deepseek_response_text(response):
     """Extract text from DeepSeek/OpenAI API response"""
     try:
@@ -149,40 +1221,300 @@ def get_deepseek_response_text(response):
     except Exception as e:
         return f"Error extracting response: {str(e)}"
 
-def generate_content_with_deepseek(client, prompt, max_retries=3, base_delay=1.0):
-    """Generate content using DeepSeek API with automatic retry"""
-    last_error = None
+def generate_content_with_deepseek(client, prompt, max_retries=3, base_delay=1.0, use_cache=True, coalesce=True, task=None):
+    """
+    Generate content using DeepSeek API with automatic retry
+    
+    Identical prompts are served from the response cache unless use_cache=False
+    (use that for answers that depend on changing data). Concurrent identical
+    prompts share one in-flight call unless coalesce=False. `task` applies a
+    task profile's output cap, temperature and stop sequences.
+    """
+    params = _deepseek_params(task)
+    return _generate_with_layers(
+        "deepseek",
+        DEEPSEEK_MODEL,
+        prompt,
+        params,
+        lambda: _generate_deepseek_with_retry(client, prompt, max_retries, base_delay, params),
+        lambda response: response.choices[0].message.content,
+        use_cache,
+        coalesce
+    )
+
+def _generate_deepseek_with_retry(client, prompt, max_retries, base_delay, params):
+    """Call DeepSeek, pacing requests through the key's rate limiter and retrying on rate limit errors"""
+    breaker = get_circuit_breaker("deepseek")
+    estimated_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
     
     for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            return response
-        except Exception as e:
-            last_error = e
-            error_str = str(e).lower()
-            
-            # Handle rate limits
-            if "rate limit" in error_str or "429" in error_str or "quota" in error_str:
-                retry_delay = base_delay * (2 ** attempt)
-                retry_delay = min(retry_delay, 10.0)
-                
-                if attempt < max_retries - 1:
-                    print(f"DeepSeek rate limit hit, retrying in {retry_delay:.1f}s (attempt {attempt + 1}/{max_retries})...")
-                    time.sleep(retry_delay)
+        _check_deadline("deepseek")
+        breaker.before_call()
+        # Each attempt leases a key from the pool, so a rate-limited key is skipped on retry
+        with _lease_key("deepseek", getattr(client, 'api_key', None), estimated_tokens) as api_key:
+            call_client = _deepseek_client_for_key(client, api_key)
+            limiter = get_rate_limiter("deepseek", api_key)
+            # Wait for capacity up front instead of failing with a 429
+            limiter.acquire(estimated_tokens, max_wait=_rate_limit_max_wait())
+            call_started = time.monotonic()
+            try:
+                with _call_slot("deepseek", api_key):
+                    response = call_client.chat.completions.create(
+                        model=DEEPSEEK_MODEL,
+                        messages=[
+                            {"role": "user", "content": prompt}
+                        ],
+                        **params,
+                        **_request_options("deepseek")
+                    )
+                breaker.record_success(time.monotonic() - call_started)
+                limiter.record_usage(estimated_tokens, get_token_usage(response).get('total_tokens'))
+                return response
+            except Exception as e:
+                # Handle rate limits
+                if _is_rate_limit_error(e):
+                    _pause_after_rate_limit(limiter, e, attempt, max_retries, base_delay, "DeepSeek rate limit")
                     continue
+                _record_failure(breaker, e)
+                if attempt == 0:
+                    raise
+                else:
+                    raise Exception(f"Error after {attempt + 1} attempts: {str(e)}")
+
+def stream_content_with_deepseek(client, prompt, max_retries=3, base_delay=1.0, use_cache=True, task=None):
+    """
+    Stream DeepSeek output as text chunks
+    
+    Shares the response cache with generate_content_with_deepseek (a cache hit
+    is yielded as a single chunk). Rate limit retries only happen before the
+    first chunk is sent.
+    """
+    params = _deepseek_params(task)
+    key = LLMResponseCache.make_key("deepseek", DEEPSEEK_MODEL, prompt, params)
+    cache = get_llm_cache() if use_cache else None
+    
+    if cache is not None:
+        cached_text = cache.get(key)
+        if cached_text is not None:
+            _llm_metrics.record("deepseek", 0.0, outcome="cache_hit")
+            yield cached_text
+            return
+    
+    chunks = []
+    stream = _metered_stream("deepseek", prompt, lambda: _stream_with_cassette(
+        "deepseek", DEEPSEEK_MODEL, prompt, params,
+        lambda: _stream_deepseek_with_retry(client, prompt, max_retries, base_delay, params)
+    ))
+    for text in stream:
+        chunks.append(text)
+        yield text
+    
+    if cache is not None and chunks:
+        cache.set(key, ''.join(chunks), provider="deepseek", model=DEEPSEEK_MODEL)
+
+def _stream_deepseek_with_retry(client, prompt, max_retries, base_delay, params):
+    """Stream a DeepSeek call through the key's rate limiter, retrying rate limit errors before the first chunk"""
+    breaker = get_circuit_breaker("deepseek")
+    estimated_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    
+    for attempt in range(max_retries):
+        _check_deadline("deepseek")
+        breaker.before_call()
+        # Each attempt leases a key from the pool, so a rate-limited key is skipped on retry
+        with _lease_key("deepseek", getattr(client, 'api_key', None), estimated_tokens) as api_key:
+            call_client = _deepseek_client_for_key(client, api_key)
+            limiter = get_rate_limiter("deepseek", api_key)
+            limiter.acquire(estimated_tokens, max_wait=_rate_limit_max_wait())
+            call_started = time.monotonic()
+            started = False
+            try:
+                with _call_slot("deepseek", api_key, measure_latency=False):
+                    stream = call_client.chat.completions.create(
+                        model=DEEPSEEK_MODEL,
+                        messages=[
+                            {"role": "user", "content": prompt}
+                        ],
+                        stream=True,
+                        **params,
+                        **_request_options("deepseek"),
+                        stream_options={"include_usage": True}
+                    )
+                    for chunk in stream:
+                        # The final chunk has no choices and carries the usage of the whole stream
+                        if getattr(chunk, 'usage', None) is not None:
+                            limiter.record_usage(estimated_tokens, get_token_usage(chunk).get('total_tokens'))
+                        if not chunk.choices:
+                            continue
+                        text = chunk.choices[0].delta.content
+                        if text:
+                            started = True
+                            yield text
+                breaker.record_success(time.monotonic() - call_started)
+                return
+            except Exception as e:
+                if _is_rate_limit_error(e) and not started:
+                    _pause_after_rate_limit(limiter, e, attempt, max_retries, base_delay, "DeepSeek rate limit")
+                    continue
+                _record_failure(breaker, e)
+                if attempt == 0 or started:
+                    raise
                 else:
-                    raise Exception(f"Rate limit exceeded after {max_retries} attempts")
-            else:
+                    raise Exception(f"Error after {attempt + 1} attempts: {str(e)}")
+
+async def generate_content_with_deepseek_async(client, prompt, max_retries=3, base_delay=1.0, use_cache=True, coalesce=True, task=None):
+    """
+    Async counterpart of generate_content_with_deepseek
+    
+    Args:
+        client: AsyncDeepSeekClient from get_async_deepseek_model()
+    """
+    params = _deepseek_params(task)
+    return await _generate_with_layers_async(
+        "deepseek",
+        DEEPSEEK_MODEL,
+        prompt,
+        params,
+        lambda: _generate_deepseek_with_retry_async(client, prompt, max_retries, base_delay, params),
+        lambda response: response.choices[0].message.content,
+        use_cache,
+        coalesce
+    )
+
+async def _generate_deepseek_with_retry_async(client, prompt, max_retries, base_delay, params):
+    """Async counterpart of _generate_deepseek_with_retry"""
+    breaker = get_circuit_breaker("deepseek")
+    estimated_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    
+    for attempt in range(max_retries):
+        _check_deadline("deepseek")
+        breaker.before_call()
+        # Each attempt leases a key from the pool, so a rate-limited key is skipped on retry
+        with _lease_key("deepseek", getattr(client, 'api_key', None), estimated_tokens) as api_key:
+            call_client = _deepseek_client_for_key(client, api_key)
+            limiter = get_rate_limiter("deepseek", api_key)
+            await limiter.acquire_async(estimated_tokens, max_wait=_rate_limit_max_wait())
+            call_started = time.monotonic()
+            try:
+                async with _call_slot_async("deepseek", api_key):
+                    response = await call_client.client().chat.completions.create(
+                        model=DEEPSEEK_MODEL,
+                        messages=[
+                            {"role": "user", "content": prompt}
+                        ],
+                        **params,
+                        **_request_options("deepseek")
+                    )
+                breaker.record_success(time.monotonic() - call_started)
+                limiter.record_usage(estimated_tokens, get_token_usage(response).get('total_tokens'))
+                return response
+            except Exception as e:
+                if _is_rate_limit_error(e):
+                    _pause_after_rate_limit(limiter, e, attempt, max_retries, base_delay, "DeepSeek rate limit")
+                    continue
+                _record_failure(breaker, e)
                 if attempt == 0:
                     raise
                 else:
                     raise Exception(f"Error after {attempt + 1} attempts: {str(e)}")
+
+# Hedged requests across providers
+_hedge_policy = HedgePolicy(
+    percentile=LLM_HEDGE_PERCENTILE,
+    default_delay=LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    min_delay=LLM_HEDGE_MIN_DELAY_SECONDS,
+    max_delay=LLM_HEDGE_MAX_DELAY_SECONDS
+)
+
+def get_hedge_stats():
+    """Get which provider won hedged requests and the current hedge deadlines"""
+    return _hedge_policy.stats()
+
+def _is_configured_key(api_key):
+    return bool(api_key) and not api_key.startswith("your_")
+
+class GeminiHedgePartner:
+    """Gemini hedge partner that uses the model of each call's task profile (tier and output limits)"""
+    
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+    
+    def model(self, task: str = None):
+        if task is None:
+            return get_gemini_model(self.api_key)
+        return get_task_model(task, self.api_key)
+
+def get_hedge_partner(provider: str, api_key: str):
+    """
+    Get an async-capable client of `provider` to hedge requests with
+    
+    Args:
+        provider: "gemini" or "deepseek"
+        api_key: API key for that provider
+    
+    Returns:
+        A GeminiHedgePartner or AsyncDeepSeekClient, or None if the key is missing or setup fails
+    """
+    if not _is_configured_key(api_key):
+        return None
+    try:
+        if provider == "deepseek":
+            return get_async_deepseek_model(api_key)
+        partner = GeminiHedgePartner(api_key)
+        partner.model("answer")  # Surface setup errors now
+        return partner
+    except Exception as e:
+        print(f"Hedging: could not initialize {provider} partner ({e})")
+        return None
+
+def _async_provider_call(target, prompt, max_retries, base_delay, use_cache, task=None):
+    """(provider, coroutine function returning response text) for a Gemini model or AsyncDeepSeekClient"""
+    if isinstance(target, (AsyncDeepSeekClient, LocalAsyncDeepSeekClient)):
+        async def call():
+            response = await generate_content_with_deepseek_async(
+                target, prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache, task=task
+            )
+            return get_deepseek_response_text(response)
+        return "deepseek", call
+    
+    if isinstance(target, GeminiHedgePartner):
+        # Same task profile as the primary call, so a hedge doesn't change tier or output limits
+        target = target.model(task)
+    
+    async def call():
+        response = await generate_content_async(
+            target, prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache
+        )
+        return get_response_text(response)
+    return "gemini", call
+
+async def generate_content_hedged_async(primary, secondary, prompt, max_retries=3, base_delay=1.0, use_cache=True, task=None):
+    """
+    Generate text with the primary provider, hedging with the secondary when it is slow
+    
+    If the primary hasn't answered within a high percentile of its recent
+    latencies (or fails), the prompt is also sent to the secondary; the first
+    successful answer wins and the other call is cancelled.
+    
+    Args:
+        primary: Gemini model or AsyncDeepSeekClient
+        secondary: GeminiHedgePartner, Gemini model or AsyncDeepSeekClient (None disables hedging)
+        task: Task profile applied to DeepSeek calls and GeminiHedgePartner (Gemini models carry their own config)
+    
+    Returns:
+        (response text, provider that answered)
+    """
+    primary_call = _async_provider_call(primary, prompt, max_retries, base_delay, use_cache, task)
+    secondary_call = None
+    if secondary is not None:
+        secondary_call = _async_provider_call(secondary, prompt, max_retries, base_delay, use_cache, task)
     
-    raise last_error
+    text, provider = await hedged_call(primary_call, secondary_call, _hedge_policy)
+    if provider != primary_call[0]:
+        print(f"Hedging: {provider} answered before {primary_call[0]}")
+    return text, provider
 
+def generate_content_hedged(primary, secondary, prompt, max_retries=3, base_delay=1.0, use_cache=True, task=None):
+    """Blocking variant of generate_content_hedged_async (runs on the shared event loop)"""
+    return run_async(generate_content_hedged_async(
+        primary, secondary, prompt, max_retries=max_retries, base_delay=base_delay, use_cache=use_cache, task=task
+    ))
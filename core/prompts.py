@@ -0,0 +1,167 @@
+"""
+Prompt templates with a stable prefix and a short variable suffix
+
+Providers cache prompt prefixes: DeepSeek reuses identical leading tokens
+automatically and Gemini can serve them from (implicit or explicit)
+cached content. Every template therefore puts the long, unchanging
+instructions first and the per-request data (query, search results,
+agent responses) last, so repeated calls share as many leading tokens as
+possible.
+"""
+
+
+class PromptTemplate:
+    """Prompt made of a stable prefix and a variable suffix (both str.format templates)"""
+
+    def __init__(self, name: str, prefix: str, suffix: str):
+        self.name = name
+        self.prefix = prefix.strip()
+        self.suffix = suffix.strip()
+
+    def prefix_text(self, **values) -> str:
+        """Stable prefix (should only use values that are constant per caller)"""
+        return self.prefix.format(**values)
+
+    def render(self, **values) -> str:
+        """Full prompt: the stable prefix, a blank line, then the variable suffix"""
+        return f"{self.prefix_text(**values)}\n\n{self.suffix.format(**values)}"
+
+
+AGENT_ANSWER = PromptTemplate(
+    "agent_answer",
+    prefix="""
+You are managing {user}'s schedule. Answer this query naturally and precisely.
+
+Provide a clear, helpful answer with specific details (times, days, activities) when available. Be conversational and friendly. If information is missing, say so clearly.
+
+IMPORTANT:
+- Do NOT use markdown formatting (no asterisks *, no bold **, no bullet points •)
+- Write in plain text only
+- Use simple sentences and commas to separate items
+- Format: "{format_example}"{full_schedule}
+""",
+    suffix="""
+{context}
+
+Query: {query}
+"""
+)
+
+AGGREGATE_COMPARISON = PromptTemplate(
+    "aggregate_comparison",
+    prefix="""
+You are an Orchestrator Agent that COMPARES schedules from multiple users.
+
+CRITICAL: Provide ONLY a concise summary answer. NO detailed breakdowns, NO bullet points, NO sections.
+
+Instructions:
+1. Compare both users' schedules
+2. Find common free times (when both users are free)
+3. Provide ONLY a brief summary (2-3 sentences maximum)
+
+Format: Write a simple, conversational answer stating when both users are free together. If no common time, say so briefly.
+
+Example: "Based on comparing both schedules, you both have free time on Sunday from 1:00 PM to 2:30 PM, and after 9:00 PM."
+""",
+    suffix="""
+Individual Agent Responses:
+{context}
+
+Raw Schedule Data from Database:
+{schedule_info}
+
+User's Question: "{user_query}"
+
+Provide ONLY the summary answer (no bullet points, no sections, no detailed breakdowns):
+"""
+)
+
+AGGREGATE_SUMMARY = PromptTemplate(
+    "aggregate_summary",
+    prefix="""
+You are an Orchestrator Agent coordinating between multiple users' schedules.
+
+Your task: Provide ONLY a concise summary answer (2-3 sentences maximum).
+
+Guidelines:
+- Be conversational and natural
+- Provide specific information (times, days, activities) when available
+- Keep it brief - just the essential answer
+- NO bullet points, NO sections, NO detailed breakdowns
+- Just a simple, direct answer to the question
+""",
+    suffix="""
+Responses from agents:
+{context}
+
+{schedule_info}
+
+User's Question: "{user_query}"
+
+Provide your concise response:
+"""
+)
+
+COMMON_TIME_PHRASING = PromptTemplate(
+    "common_time_phrasing",
+    prefix="""
+You are the Orchestrator Agent. Common free time has already been computed exactly from every user's schedule.
+
+Answer the query using ONLY the computed result. Do NOT add, remove or change any times.
+
+Keep it brief - maximum 2-3 sentences. Do not use markdown formatting.
+""",
+    suffix="""
+User Query: {user_query}
+
+Users compared: {users}
+
+Computed result:
+{plain_response}
+"""
+)
+
+GENERAL_QUESTION = PromptTemplate(
+    "general_question",
+    prefix="""
+You are a helpful AI assistant. Answer the following question naturally and conversationally.
+
+Provide a clear, helpful answer. Be concise (2-3 sentences maximum) and conversational. Do not use markdown formatting.
+""",
+    suffix="""
+Question: {user_query}
+"""
+)
+
+ROUTE = PromptTemplate(
+    "route",
+    prefix="""
+Route to: agent1 (User 1 only), agent2 (User 2 only), or all (both/multiple).
+
+One word only: agent1/agent2/all
+""",
+    suffix="""
+Query: "{user_query}"
+"""
+)
+
+SUGGESTIONS = PromptTemplate(
+    "suggestions",
+    prefix="""
+Generate 3 short follow-up questions (max 50 chars each) as JSON array: ["q1", "q2", "q3"]
+""",
+    suffix="""
+Query: "{user_query}"
+Response: "{response_text}"
+"""
+)
+
+STORE_SUMMARY = PromptTemplate(
+    "store_summary",
+    prefix="""
+Summarize this schedule/routine information and store it. Provide a brief confirmation that the information has been stored.
+""",
+    suffix="""
+{schedule_data}
+"""
+)
@@ -0,0 +1,243 @@
+"""
+Token-bucket rate limiting per API key
+
+Each API key gets a requests-per-minute bucket and an optional
+tokens-per-minute bucket. Callers reserve capacity up front and wait
+(time.sleep or asyncio.sleep) only as long as needed, instead of firing
+requests and backing off after a 429. Retry-After hints from the provider
+are stored on the limiter so every caller of that key honors them.
+"""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+RETRY_AFTER_PATTERN = re.compile(
+    r'retry[-\s_]*(?:in|after|delay)[\s:{]*(?:seconds:\s*)?(\d+(?:\.\d+)?)', re.IGNORECASE
+)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when waiting for rate limit capacity would exceed the allowed wait"""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (reservations may drive the level negative)"""
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        return max(deficit / self.rate, 0.0)
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+class RateLimiter:
+    """Thread-safe, asyncio-compatible limiter for one API key"""
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float = 0):
+        """
+        Args:
+            name: Label used in stats (never the raw API key)
+            requests_per_minute: Request budget (0 disables it)
+            tokens_per_minute: Prompt + completion token budget (0 disables it)
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self.configure(requests_per_minute, tokens_per_minute)
+        self._stats = {"requests": 0, "waited": 0, "wait_seconds": 0.0, "penalties": 0, "timeouts": 0}
+
+    def configure(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        """Change the budgets (None keeps the current value)"""
+        with self._lock:
+            if requests_per_minute is not None:
+                self.requests_per_minute = requests_per_minute
+                self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+            if tokens_per_minute is not None:
+                self.tokens_per_minute = tokens_per_minute
+                self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    def reserve(self, tokens: float = 0, max_wait: Optional[float] = None) -> float:
+        """
+        Reserve capacity for one request and return how long to wait before sending it
+
+        Raises:
+            RateLimitTimeout: If the wait would exceed max_wait (nothing is reserved)
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._blocked_until - now, 0.0)
+            if self._requests is not None:
+                wait = max(wait, self._requests.wait_time(1, now))
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.wait_time(tokens, now))
+
+            if max_wait is not None and wait > max_wait:
+                self._stats["timeouts"] += 1
+                raise RateLimitTimeout(
+                    f"Rate limit wait of {wait:.1f}s for {self.name} exceeds the maximum of {max_wait:.1f}s"
+                )
+
+            if self._requests is not None:
+                self._requests.take(1)
+            if self._tokens is not None and tokens:
+                self._tokens.take(tokens)
+            self._stats["requests"] += 1
+            if wait > 0:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += wait
+            return wait
+
+    def peek_wait(self, tokens: float = 0) -> float:
+        """Seconds a request would have to wait right now (nothing is reserved)"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._blocked_until - now, 0.0)
+            if self._requests is not None:
+                wait = max(wait, self._requests.wait_time(1, now))
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.wait_time(tokens, now))
+            return wait
+
+    def remaining_fraction(self) -> float:
+        """Share of the request (and token) budget currently available (1.0 when unlimited)"""
+        with self._lock:
+            now = time.monotonic()
+            fractions = [1.0]
+            for bucket in (self._requests, self._tokens):
+                if bucket is not None:
+                    bucket._refill(now)
+                    fractions.append(max(bucket.level, 0.0) / bucket.capacity)
+            return min(fractions)
+
+    def acquire(self, tokens: float = 0, max_wait: Optional[float] = None) -> float:
+        """Block until a request may be sent; returns the time waited"""
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 0, max_wait: Optional[float] = None) -> float:
+        """Asyncio variant of acquire() that yields to the event loop while waiting"""
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record_usage(self, estimated_tokens: float, actual_tokens: Optional[float]):
+        """Correct the token bucket once the real usage of a request is known"""
+        if actual_tokens is None or self._tokens is None:
+            return
+        with self._lock:
+            self._tokens.take(actual_tokens - estimated_tokens)
+
+    def penalize(self, retry_after: float):
+        """Block every caller of this key for `retry_after` seconds (e.g. after a 429)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self._stats["penalties"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["requests_per_minute"] = self.requests_per_minute
+            stats["tokens_per_minute"] = self.tokens_per_minute
+            stats["blocked_for"] = max(self._blocked_until - time.monotonic(), 0.0)
+        return stats
+
+
+class RateLimiterRegistry:
+    """Hands out one shared RateLimiter per (provider, API key)"""
+
+    def __init__(self, defaults: Dict[str, Tuple[float, float]]):
+        """
+        Args:
+            defaults: provider -> (requests_per_minute, tokens_per_minute)
+        """
+        self._defaults = dict(defaults)
+        self._limiters: Dict[Tuple[str, str], RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_id(api_key: Optional[str]) -> str:
+        """Short, non-reversible identifier for an API key"""
+        if not api_key:
+            return "default"
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]
+
+    def get(self, provider: str, api_key: Optional[str] = None) -> RateLimiter:
+        key = (provider, self.key_id(api_key))
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                requests_per_minute, tokens_per_minute = self._defaults.get(provider, (0, 0))
+                limiter = RateLimiter(f"{provider}:{key[1]}", requests_per_minute, tokens_per_minute)
+                self._limiters[key] = limiter
+            return limiter
+
+    def configure(self, provider: str, requests_per_minute: float = None, tokens_per_minute: float = None,
+                  api_key: Optional[str] = None):
+        """Change budgets for one key, or for every key of a provider when api_key is None"""
+        with self._lock:
+            if api_key is None:
+                current = self._defaults.get(provider, (0, 0))
+                self._defaults[provider] = (
+                    current[0] if requests_per_minute is None else requests_per_minute,
+                    current[1] if tokens_per_minute is None else tokens_per_minute
+                )
+                limiters = [limiter for (name, _), limiter in self._limiters.items() if name == provider]
+            else:
+                limiters = []
+        if api_key is not None:
+            limiters = [self.get(provider, api_key)]
+        for limiter in limiters:
+            limiter.configure(requests_per_minute, tokens_per_minute)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Extract a retry delay (seconds) from a provider error
+
+    Checks a Retry-After response header first (seconds or HTTP date), then
+    hints in the message such as "Please retry in 37.5s" or
+    "retry_delay { seconds: 37 }".
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        if value:
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                try:
+                    return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+                except (TypeError, ValueError):
+                    pass
+
+    match = RETRY_AFTER_PATTERN.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
@@ -0,0 +1,232 @@
+"""
+Deterministic interval algebra for schedules
+
+Schedule entries stored by the agents are free text such as
+"Monday 09:00 AM - Start work" or "Focus 11:00-13:00; Break 14:30".
+These helpers turn them into busy intervals (minutes since midnight),
+group them per weekday and intersect the free time of any number of users
+without an LLM round-trip.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAILY = 'Daily'  # Label for entries that are not tied to a specific weekday
+DAY_MINUTES = 1440
+DEFAULT_BLOCK_MINUTES = 30  # Duration assumed for single times like "Break 14:30"
+
+_TIME = r'(?<![\d:])(\d{1,2}):(\d{2})(?:\s*([AaPp])\.?[Mm]\.?)?'
+RANGE_PATTERN = re.compile(_TIME + r'\s*(?:-|–|to)\s*' + _TIME)
+SINGLE_PATTERN = re.compile(_TIME)
+WEEKDAY_PATTERN = re.compile(r'\b(' + '|'.join(day.lower() for day in WEEKDAYS) + r')\b')
+
+Interval = Tuple[int, int]
+
+
+def _to_minutes(hour: str, minute: str, meridiem: Optional[str]) -> Optional[int]:
+    """Convert a parsed clock time to minutes since midnight (None if invalid)"""
+    hour, minute = int(hour), int(minute)
+    if meridiem:
+        if hour < 1 or hour > 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        return None
+    return hour * 60 + minute
+
+
+def parse_schedule_times(schedule_text: str) -> List[Interval]:
+    """
+    Parse schedule text into busy intervals
+
+    Understands ranges ("09:30-10:00", "2:00 PM to 3:30 PM") and single
+    times ("Break 14:30"), which are treated as a default 30 minute block.
+    Ranges that wrap past midnight are folded back into the same day.
+
+    Args:
+        schedule_text: Free-text schedule entry
+
+    Returns:
+        Sorted list of (start_minutes, end_minutes) tuples
+    """
+    if not schedule_text:
+        return []
+
+    time_ranges = []
+    for match in RANGE_PATTERN.finditer(schedule_text):
+        end_meridiem = match.group(6)
+        # "9:00-11:00 AM" - the start inherits the end's AM/PM
+        start = _to_minutes(match.group(1), match.group(2), match.group(3) or end_meridiem)
+        end = _to_minutes(match.group(4), match.group(5), end_meridiem)
+        if start is None or end is None or start == end:
+            continue
+        if end > start:
+            time_ranges.append((start, end))
+        else:
+            time_ranges.append((start, DAY_MINUTES))
+            if end > 0:
+                time_ranges.append((0, end))
+
+    # Blank out ranges so their end times are not picked up as single times
+    remaining = RANGE_PATTERN.sub(lambda m: ' ' * len(m.group(0)), schedule_text)
+    for match in SINGLE_PATTERN.finditer(remaining):
+        start = _to_minutes(match.group(1), match.group(2), match.group(3))
+        if start is None:
+            continue
+        time_ranges.append((start, min(start + DEFAULT_BLOCK_MINUTES, DAY_MINUTES)))
+
+    return sorted(time_ranges)
+
+
+def merge_time_ranges(time_ranges: Iterable[Interval]) -> List[Interval]:
+    """Merge overlapping or adjacent time ranges"""
+    sorted_ranges = sorted(time_ranges)
+    if not sorted_ranges:
+        return []
+
+    merged = [sorted_ranges[0]]
+    for current_start, current_end in sorted_ranges[1:]:
+        last_start, last_end = merged[-1]
+        if current_start <= last_end:
+            merged[-1] = (last_start, max(last_end, current_end))
+        else:
+            merged.append((current_start, current_end))
+
+    return merged
+
+
+def find_common_free_time(
+    busy_lists: Iterable[Iterable[Interval]],
+    day_start: int = 0,
+    day_end: int = DAY_MINUTES,
+    min_duration: int = 0
+) -> List[Interval]:
+    """
+    Find the time slots in [day_start, day_end) when every user is free
+
+    Args:
+        busy_lists: One iterable of busy intervals per user
+        day_start: Start of the window to search (minutes since midnight)
+        day_end: End of the window to search (minutes since midnight)
+        min_duration: Drop free slots shorter than this many minutes
+
+    Returns:
+        Sorted list of (start_minutes, end_minutes) free slots
+    """
+    all_busy = []
+    for busy in busy_lists:
+        for start, end in busy:
+            start, end = max(start, day_start), min(end, day_end)
+            if end > start:
+                all_busy.append((start, end))
+
+    free_times = []
+    cursor = day_start
+    for start, end in merge_time_ranges(all_busy):
+        if start > cursor:
+            free_times.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < day_end:
+        free_times.append((cursor, day_end))
+
+    return [(start, end) for start, end in free_times if end - start >= min_duration]
+
+
+def extract_day(schedule_text: str, metadata: Optional[dict] = None) -> Optional[str]:
+    """Return the weekday a schedule entry belongs to, or None for daily entries"""
+    day = (metadata or {}).get('day')
+    if isinstance(day, str) and day.strip().capitalize() in WEEKDAYS:
+        return day.strip().capitalize()
+
+    match = WEEKDAY_PATTERN.search((schedule_text or '').lower())
+    return match.group(1).capitalize() if match else None
+
+
+def schedule_busy_by_day(schedules: dict) -> Dict[Optional[str], List[Interval]]:
+    """
+    Group busy intervals from a VectorDatabase.get_all() result by weekday
+
+    Entries without a weekday are stored under the None key and apply to
+    every day. Entries without times in their text fall back to the
+    "time" metadata field.
+    """
+    busy_by_day: Dict[Optional[str], List[Interval]] = {}
+    documents = schedules.get('documents') or []
+    metadatas = schedules.get('metadatas') or []
+
+    for idx, doc in enumerate(documents):
+        metadata = metadatas[idx] if idx < len(metadatas) and metadatas[idx] else {}
+        times = parse_schedule_times(doc)
+        if not times and metadata.get('time'):
+            times = parse_schedule_times(str(metadata['time']))
+        if times:
+            busy_by_day.setdefault(extract_day(doc, metadata), []).extend(times)
+
+    return {day: merge_time_ranges(times) for day, times in busy_by_day.items()}
+
+
+def busy_for_day(busy_by_day: Dict[Optional[str], List[Interval]], day: str) -> List[Interval]:
+    """Busy intervals for one day: the user's daily entries plus that day's entries"""
+    if day == DAILY:
+        return list(busy_by_day.get(None, []))
+    return merge_time_ranges(busy_by_day.get(None, []) + busy_by_day.get(day, []))
+
+
+def days_from_query(user_query: str, today: Optional[datetime] = None) -> Optional[List[str]]:
+    """
+    Extract the weekdays a query asks about
+
+    Returns:
+        List of weekday names, or None when the query does not restrict days
+    """
+    query_lower = (user_query or '').lower()
+    today = today or datetime.now()
+    days = [day.capitalize() for day in WEEKDAY_PATTERN.findall(query_lower)]
+
+    if 'today' in query_lower or 'tonight' in query_lower:
+        days.append(WEEKDAYS[today.weekday()])
+    if 'tomorrow' in query_lower:
+        days.append(WEEKDAYS[(today + timedelta(days=1)).weekday()])
+    if 'weekend' in query_lower:
+        days.extend(['Saturday', 'Sunday'])
+    elif 'weekday' in query_lower or 'workday' in query_lower:
+        days.extend(WEEKDAYS[:5])
+
+    if not days:
+        return None
+    return [day for day in WEEKDAYS if day in days]
+
+
+def default_days(user_busy: Dict[str, Dict[Optional[str], List[Interval]]]) -> List[str]:
+    """The whole week when any user has weekday-specific entries, otherwise a single DAILY bucket"""
+    has_weekdays = any(day is not None for busy in user_busy.values() for day in busy)
+    return list(WEEKDAYS) if has_weekdays else [DAILY]
+
+
+def format_time(minutes: int) -> str:
+    """Convert minutes since midnight to HH:MM format"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def format_intervals(intervals: Iterable[Interval], limit: Optional[int] = None) -> str:
+    """Render intervals as "HH:MM - HH:MM, HH:MM - HH:MM" """
+    intervals = list(intervals)
+    if limit is not None:
+        intervals = intervals[:limit]
+    return ', '.join(f"{format_time(start)} - {format_time(end)}" for start, end in intervals)
+
+
+def format_free_time_summary(common_free: Dict[str, List[Interval]], max_slots_per_day: int = 3) -> str:
+    """Plain-text answer for AvailabilityMatrix.common_free_slots() output"""
+    parts = []
+    for day, slots in common_free.items():
+        if not slots:
+            continue
+        rendered = format_intervals(slots, limit=max_slots_per_day)
+        parts.append(rendered if day == DAILY else f"{day} {rendered}")
+
+    if not parts:
+        return "No common free time available"
+    return "Common free time: " + "; ".join(parts)
@@ -0,0 +1,149 @@
+"""
+Single-flight request coalescing
+
+Concurrent callers asking for the same key share one in-flight call:
+the first caller (the leader) executes it, the others wait and receive
+the same result or exception.
+"""
+
+import asyncio
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Call:
+    """State of one in-flight call"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe duplicate call suppression keyed by string"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._stats = {"leaders": 0, "collapsed": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Identity of the call (e.g. an LLM cache key)
+            fn: Zero-argument callable performing the call
+
+        Returns:
+            The leader's result (the leader's exception is re-raised for everyone)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["collapsed"] += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["leaders"] += 1
+                is_leader = True
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Leader/collapsed counters and the number of calls currently in flight"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+            stats["waiting"] = sum(call.waiters for call in self._calls.values())
+        return stats
+
+
+class _AsyncCall:
+    """State of one in-flight async call"""
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 1
+
+
+class AsyncSingleFlight:
+    """Asyncio counterpart of SingleFlight (callers share one task per event loop)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[tuple, _AsyncCall] = {}
+        self._stats = {"leaders": 0, "collapsed": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn once for all concurrent callers with the same key on the running loop
+
+        The call runs as its own task, so cancelling one caller (e.g. a hedged
+        call that lost, or a query past its deadline) doesn't fail the others.
+        It is only cancelled once every caller waiting on it has been cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+
+        with self._lock:
+            call = self._calls.get(call_key)
+            if call is None:
+                call = _AsyncCall(loop.create_task(fn()))
+                self._calls[call_key] = call
+                call.task.add_done_callback(functools.partial(self._finished, call_key, call))
+                self._stats["leaders"] += 1
+            else:
+                call.waiters += 1
+                self._stats["collapsed"] += 1
+
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                abandoned = call.waiters == 1 and not call.task.done()
+                if abandoned and self._calls.get(call_key) is call:
+                    # Later callers start a fresh call instead of joining a cancelled one
+                    del self._calls[call_key]
+            if abandoned:
+                call.task.cancel()
+            raise
+        finally:
+            with self._lock:
+                call.waiters -= 1
+
+    def _finished(self, call_key: tuple, call: _AsyncCall, task: "asyncio.Task"):
+        with self._lock:
+            if self._calls.get(call_key) is call:
+                del self._calls[call_key]
+        if not task.cancelled():
+            # Mark the exception as retrieved so a call whose callers all left doesn't log a warning
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Leader/collapsed counters and the number of calls currently in flight"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+            stats["waiting"] = sum(call.waiters for call in self._calls.values())
+        return stats
@@ -0,0 +1,127 @@
+"""
+Task profiles for LLM calls
+
+Each kind of call (routing, suggestions, agent answers, aggregation,
+schedule summaries) maps to a Gemini model tier and a generation config.
+Cheap, short tasks run on the fast tier with tight output caps; answers
+and aggregation keep the quality tier.
+
+Gemini 2.5 models count thinking tokens against max_output_tokens, so
+tight caps are only set on tasks whose tier lists non-thinking models.
+
+Tasks that get retrieved schedule data also carry a context budget: the
+estimated tokens the schedule timeline in their prompt may take.
+"""
+
+from typing import Any, Dict, List, Optional
+
+# Gemini model names tried in order for each tier
+GEMINI_MODEL_TIERS = {
+    "quality": ['gemini-2.5-pro', 'gemini-1.5-pro', 'gemini-1.0-pro', 'gemini-pro'],
+    "fast": ['gemini-2.0-flash', 'gemini-2.0-flash-lite', 'gemini-1.5-flash'],
+}
+
+
+class TaskProfile:
+    """Model tier and generation config of one kind of LLM call"""
+
+    def __init__(
+        self,
+        name: str,
+        tier: str,
+        max_output_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        stop_sequences: Optional[List[str]] = None,
+        context_tokens: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Task name ("route", "suggest", ...)
+            tier: Key of GEMINI_MODEL_TIERS
+            max_output_tokens: Output cap (None keeps the provider default)
+            temperature: Sampling temperature (None keeps the provider default)
+            stop_sequences: Sequences that end the output early
+            context_tokens: Token budget of retrieved schedule context (None = no limit)
+        """
+        if tier not in GEMINI_MODEL_TIERS:
+            raise ValueError(f"Unknown model tier '{tier}' for task '{name}'")
+        self.name = name
+        self.tier = tier
+        self.max_output_tokens = max_output_tokens
+        self.temperature = temperature
+        self.stop_sequences = list(stop_sequences or [])
+        self.context_tokens = context_tokens
+
+    def gemini_generation_config(self) -> Dict[str, Any]:
+        config = {}
+        if self.max_output_tokens is not None:
+            config["max_output_tokens"] = self.max_output_tokens
+        if self.temperature is not None:
+            config["temperature"] = self.temperature
+        if self.stop_sequences:
+            config["stop_sequences"] = self.stop_sequences
+        return config
+
+    def deepseek_params(self) -> Dict[str, Any]:
+        params = {}
+        if self.max_output_tokens is not None:
+            params["max_tokens"] = self.max_output_tokens
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        if self.stop_sequences:
+            params["stop"] = self.stop_sequences
+        return params
+
+
+TASK_PROFILES = {
+    "route": TaskProfile("route", "fast", max_output_tokens=8, temperature=0.0, stop_sequences=["\n"]),
+    "suggest": TaskProfile("suggest", "fast", max_output_tokens=120, temperature=0.7),
+    "summarize": TaskProfile("summarize", "fast", max_output_tokens=150, temperature=0.3),
+    "answer": TaskProfile("answer", "quality", temperature=0.7, context_tokens=600),
+    "aggregate": TaskProfile("aggregate", "quality", temperature=0.5, context_tokens=800),
+}
+
+
+def configure_task_tiers(overrides: str):
+    """
+    Move tasks to another tier, e.g. "answer=fast,route=quality"
+
+    Raises:
+        ValueError: For unknown tasks or tiers
+    """
+    for item in (overrides or '').split(','):
+        if not item.strip():
+            continue
+        task, _, tier = item.partition('=')
+        profile = get_task_profile(task.strip())
+        tier = tier.strip()
+        if tier not in GEMINI_MODEL_TIERS:
+            raise ValueError(f"Unknown model tier '{tier}' (use {', '.join(GEMINI_MODEL_TIERS)})")
+        profile.tier = tier
+
+
+def configure_context_budgets(overrides: str):
+    """
+    Set context token budgets, e.g. "answer=400,aggregate=1200" (0 removes the limit)
+
+    Raises:
+        ValueError: For unknown tasks or non-numeric budgets
+    """
+    for item in (overrides or '').split(','):
+        if not item.strip():
+            continue
+        task, _, budget = item.partition('=')
+        profile = get_task_profile(task.strip())
+        try:
+            budget = int(budget.strip())
+        except ValueError:
+            raise ValueError(f"Invalid context budget '{item.strip()}' (use task=tokens)")
+        profile.context_tokens = budget or None
+
+
+def get_task_profile(task: str) -> TaskProfile:
+    """Get the profile of a task (ValueError for unknown tasks)"""
+    try:
+        return TASK_PROFILES[task]
+    except KeyError:
+        raise ValueError(f"Unknown LLM task '{task}' (use {', '.join(TASK_PROFILES)})")
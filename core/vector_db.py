@@ -1,6 +1,7 @@
 import chromadb
 from chromadb.config import Settings
 import os
+from core.deadline import Deadline, current_deadline
 
 class VectorDatabase:
     def __init__(self, agent_name: str, persist_directory: str = None):
@@ -52,8 +53,11 @@ class VectorDatabase:
         
         return doc_id
     
-    def search(self, query: str, n_results: int = 5):
-        """Search for similar data in the vector database"""
+    def search(self, query: str, n_results: int = 5, deadline: Deadline = None):
+        """Search for similar data in the vector database (raises DeadlineExceeded once the request budget is spent)"""
+        deadline = deadline or current_deadline()
+        if deadline is not None:
+            deadline.check(f"{self.agent_name} vector search")
         results = self.collection.query(
             query_texts=[query],
             n_results=n_results
@@ -61,6 +65,14 @@ class VectorDatabase:
         
         return results
     
+    def embed(self, texts: list):
+        """Embed texts with the collection's embedding function (the one search uses)"""
+        embedding_function = getattr(self.collection, '_embedding_function', None)
+        if embedding_function is None:
+            from chromadb.utils import embedding_functions
+            embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return embedding_function(list(texts))
+    
     def get_all(self):
         """Get all data from the vector database"""
         return self.collection.get()
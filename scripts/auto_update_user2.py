@@ -9,6 +9,10 @@ import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents import Agent2
+from core.model_helper import configure_rate_limits
+
+# Free tier allows 2 requests/minute - the shared rate limiter paces store_schedule calls
+FREE_TIER_REQUESTS_PER_MINUTE = 2
 
 def update_user2_schedule():
     """Clear and update User 2's schedule with different routines"""
@@ -16,6 +20,8 @@ def update_user2_schedule():
     print("Updating User 2's Schedule Automatically")
     print("="*70)
     
+    configure_rate_limits("gemini", requests_per_minute=FREE_TIER_REQUESTS_PER_MINUTE)
+    
     # Initialize Agent 2
     agent2 = Agent2()
     
@@ -70,22 +76,13 @@ def update_user2_schedule():
             result = agent2.store_schedule(routine["schedule"], routine["metadata"])
             print(f"✓ Stored: {routine['schedule'][:60]}...")
             print(f"  Document ID: {result['doc_id']}")
-            
-            # Wait 35 seconds between requests to avoid rate limits
-            if i < len(routines):
-                print(f"  ⏳ Waiting 35 seconds... ({len(routines) - i} remaining)")
-                time.sleep(35)
         except Exception as e:
             print(f"✗ Error storing routine: {e}")
             if "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                print("  ⏳ Waiting 40 seconds before retry...")
-                time.sleep(40)
+                print("  ⏳ Retrying once the rate limiter allows it...")
                 try:
                     result = agent2.store_schedule(routine["schedule"], routine["metadata"])
                     print(f"✓ Stored after retry: {routine['schedule'][:60]}...")
-                    if i < len(routines):
-                        print(f"  ⏳ Waiting 35 seconds... ({len(routines) - i} remaining)")
-                        time.sleep(35)
                 except Exception as e2:
                     print(f"✗ Failed after retry: {e2}")
     
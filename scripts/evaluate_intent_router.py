@@ -0,0 +1,67 @@
+"""
+Report the accuracy and latency of the embedding intent router
+
+Uses held-out queries (not among the router's examples): schedule vs
+general questions, group questions, and per-agent questions generated from
+activities in each agent's stored schedules that the router didn't see.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import OrchestratorAgent
+from agents.orchestrator import ROUTER_SCHEDULE_SAMPLES
+from core.context_budget import schedule_entries
+
+INTENT_QUERIES = [
+    ("Do I have anything planned on Thursday morning?", "schedule"),
+    ("When does the team standup happen?", "schedule"),
+    ("Is the afternoon open for a dentist appointment?", "schedule"),
+    ("What comes before dinner on Sunday?", "schedule"),
+    ("How long is the commute each day?", "schedule"),
+    ("What is the boiling point of water?", "general"),
+    ("Summarize the plot of Hamlet", "general"),
+    ("How many planets are in the solar system?", "general"),
+    ("Give me a recipe for pancakes", "general"),
+    ("What does HTTP stand for?", "general")
+]
+
+GROUP_QUERIES = [
+    "Can we all meet on Saturday?",
+    "Find an hour when nobody has plans",
+    "Is there a common lunch slot?",
+    "When could the group have a call?"
+]
+
+def agent_queries(orchestrator, per_agent=5):
+    """Questions about activities from schedules beyond the router's examples"""
+    queries = [(text, "all") for text in GROUP_QUERIES]
+    for agent_name, agent in orchestrator.agents.items():
+        documents = agent.get_all_schedules().get('documents') or []
+        held_out = documents[ROUTER_SCHEDULE_SAMPLES:] or documents
+        entries = schedule_entries(held_out)[:per_agent]
+        queries.extend((f"When is the {entry.label.lower()}?", agent_name) for entry in entries)
+    return queries
+
+def print_report(name, report):
+    print(f"\n[{name}]")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
+def main():
+    print("\n" + "="*70)
+    print("Intent Router Evaluation")
+    print("="*70)
+
+    orchestrator = OrchestratorAgent()
+    agent_router, intent_router = orchestrator._routers()
+    if agent_router is None:
+        print("\n✗ Intent router unavailable (see the warning above)")
+        sys.exit(1)
+
+    print_report("Schedule vs general", intent_router.evaluate(INTENT_QUERIES))
+    print_report("Agent routing", agent_router.evaluate(agent_queries(orchestrator)))
+
+if __name__ == "__main__":
+    main()
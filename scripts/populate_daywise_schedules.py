@@ -5,10 +5,13 @@ Each agent will have detailed schedules for each day of the week
 
 import sys
 import os
-import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents import Agent1, Agent2
+from core.model_helper import configure_rate_limits
+
+# Free tier allows 2 requests/minute - the shared rate limiter paces store_schedule calls
+FREE_TIER_REQUESTS_PER_MINUTE = 2
 
 def populate_user1_schedules(agent1):
     """Populate Agent 1 (User 1) with day-wise schedules"""
@@ -262,22 +265,13 @@ def populate_user1_schedules(agent1):
         try:
             result = agent1.store_schedule(schedule["schedule"], schedule["metadata"])
             print(f"✓ Stored successfully")
-            
-            # Wait between requests to avoid rate limits (free tier: 2 requests/minute)
-            if i < len(schedules):
-                wait_time = 35
-                print(f"  ⏳ Waiting {wait_time} seconds...")
-                time.sleep(wait_time)
         except Exception as e:
             print(f"✗ Error: {e}")
             if "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                print("  ⏳ Waiting 40 seconds before retry...")
-                time.sleep(40)
+                print("  ⏳ Retrying once the rate limiter allows it...")
                 try:
                     result = agent1.store_schedule(schedule["schedule"], schedule["metadata"])
                     print(f"✓ Stored after retry")
-                    if i < len(schedules):
-                        time.sleep(35)
                 except Exception as e2:
                     print(f"✗ Failed after retry: {e2}")
     
@@ -553,22 +547,13 @@ def populate_user2_schedules(agent2):
         try:
             result = agent2.store_schedule(schedule["schedule"], schedule["metadata"])
             print(f"✓ Stored successfully")
-            
-            # Wait between requests to avoid rate limits
-            if i < len(schedules):
-                wait_time = 35
-                print(f"  ⏳ Waiting {wait_time} seconds...")
-                time.sleep(wait_time)
         except Exception as e:
             print(f"✗ Error: {e}")
             if "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                print("  ⏳ Waiting 40 seconds before retry...")
-                time.sleep(40)
+                print("  ⏳ Retrying once the rate limiter allows it...")
                 try:
                     result = agent2.store_schedule(schedule["schedule"], schedule["metadata"])
                     print(f"✓ Stored after retry")
-                    if i < len(schedules):
-                        time.sleep(35)
                 except Exception as e2:
                     print(f"✗ Failed after retry: {e2}")
     
@@ -588,14 +573,12 @@ def main():
     
     input("Press Enter to start populating User 1 schedules...")
     
+    configure_rate_limits("gemini", requests_per_minute=FREE_TIER_REQUESTS_PER_MINUTE)
+    
     # Initialize and populate Agent 1
     agent1 = Agent1()
     populate_user1_schedules(agent1)
     
-    # Wait before populating Agent 2
-    print("\n⏳ Waiting 40 seconds before populating User 2...")
-    time.sleep(40)
-    
     input("\nPress Enter to start populating User 2 schedules...")
     
     # Initialize and populate Agent 2
@@ -5,10 +5,13 @@ Each agent will have its own unique schedule data
 
 import sys
 import os
-import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents import Agent1, Agent2
+from core.model_helper import configure_rate_limits
+
+# Free tier allows 2 requests/minute - the shared rate limiter paces store_schedule calls
+FREE_TIER_REQUESTS_PER_MINUTE = 2
 
 def populate_agent1_routines(agent1):
     """Populate Agent 1 with daily routines"""
@@ -45,22 +48,13 @@ def populate_agent1_routines(agent1):
             result = agent1.store_schedule(routine["schedule"], routine["metadata"])
             print(f"✓ Stored: {routine['schedule'][:50]}...")
             print(f"  Document ID: {result['doc_id']}")
-            
-            # Wait 35 seconds between requests to avoid rate limits
-            if i < len(routines):
-                print("  ⏳ Waiting 35 seconds...")
-                time.sleep(35)
         except Exception as e:
             print(f"✗ Error storing routine: {e}")
             if "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                print("  ⏳ Waiting 40 seconds before retry...")
-                time.sleep(40)
+                print("  ⏳ Retrying once the rate limiter allows it...")
                 try:
                     result = agent1.store_schedule(routine["schedule"], routine["metadata"])
                     print(f"✓ Stored after retry: {routine['schedule'][:50]}...")
-                    if i < len(routines):
-                        print("  ⏳ Waiting 35 seconds...")
-                        time.sleep(35)
                 except Exception as e2:
                     print(f"✗ Failed after retry: {e2}")
     
@@ -108,22 +102,13 @@ def populate_agent2_routines(agent2):
             result = agent2.store_schedule(routine["schedule"], routine["metadata"])
             print(f"✓ Stored: {routine['schedule'][:50]}...")
             print(f"  Document ID: {result['doc_id']}")
-            
-            # Wait 35 seconds between requests to avoid rate limits
-            if i < len(routines):
-                print("  ⏳ Waiting 35 seconds...")
-                time.sleep(35)
         except Exception as e:
             print(f"✗ Error storing routine: {e}")
             if "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                print("  ⏳ Waiting 40 seconds before retry...")
-                time.sleep(40)
+                print("  ⏳ Retrying once the rate limiter allows it...")
                 try:
                     result = agent2.store_schedule(routine["schedule"], routine["metadata"])
                     print(f"✓ Stored after retry: {routine['schedule'][:50]}...")
-                    if i < len(routines):
-                        print("  ⏳ Waiting 35 seconds...")
-                        time.sleep(35)
                 except Exception as e2:
                     print(f"✗ Failed after retry: {e2}")
     
@@ -143,14 +128,12 @@ def main():
     
     input("Press Enter to start populating Agent 1...")
     
+    configure_rate_limits("gemini", requests_per_minute=FREE_TIER_REQUESTS_PER_MINUTE)
+    
     # Initialize and populate Agent 1
     agent1 = Agent1()
     populate_agent1_routines(agent1)
     
-    # Wait before populating Agent 2
-    print("\n⏳ Waiting 40 seconds before populating Agent 2...")
-    time.sleep(40)
-    
     input("\nPress Enter to start populating Agent 2...")
     
     # Initialize and populate Agent 2
@@ -198,7 +198,7 @@ async function sendQuery() {
     sendButton.style.opacity = '0.6';
     
     try {
-        const response = await fetch('/api/query', {
+        const response = await fetch('/api/query/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -210,7 +210,31 @@ async function sendQuery() {
             })
         });
         
-        const result = await response.json();
+        if (!response.ok) {
+            const errorResult = await response.json().catch(() => ({}));
+            throw new Error(errorResult.error || `Request failed (${response.status})`);
+        }
+        
+        // Show routing, agent completions and answer tokens as they arrive
+        let streamedText = '';
+        const result = await readQueryStream(response, (event, data) => {
+            if (event === 'routing') {
+                updateFlowStatus('processing', data.query_type === 'general' ? 'Answering directly...' : 'Querying agents...');
+            } else if (event === 'agent') {
+                if (data.agent_name === 'Agent 1') {
+                    animateAgentResponse('flow-agent1-node', 'path-agent1-orch', 'agent1-node-status');
+                } else if (data.agent_name === 'Agent 2') {
+                    animateAgentResponse('flow-agent2-node', 'path-agent2-orch', 'agent2-node-status');
+                }
+            } else if (event === 'token') {
+                streamedText += data.text;
+                const loadingMsg = document.getElementById(loadingId);
+                if (loadingMsg) {
+                    updateFlowStatus('processing', 'Streaming response...');
+                    loadingMsg.querySelector('.message-text').innerHTML = formatAgentResponse(streamedText);
+                }
+            }
+        });
         
         if (result.error) {
             throw new Error(result.error);
@@ -275,6 +299,50 @@ async function sendQuery() {
     }
 }
 
+// Read a Server-Sent Events response from /api/query/stream
+// Calls onEvent(event, data) for progress events and resolves with the final "done" payload
+async function readQueryStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        // Messages are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const message = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            });
+            
+            const payload = data ? JSON.parse(data) : {};
+            if (event === 'done') {
+                return payload;
+            }
+            if (event === 'error') {
+                return { error: payload.error || 'Unknown error' };
+            }
+            onEvent(event, payload);
+        }
+    }
+    
+    return { error: 'Connection closed before the response was complete' };
+}
+
 // Flow Diagram Animation Functions
 function animateFlowStart(queryType) {
     updateFlowStatus('processing', 'Processing Query...');
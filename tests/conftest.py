@@ -0,0 +1,19 @@
+"""
+Shared test setup
+
+core.config refuses to import without an API key, and the LLM cache,
+vector databases and intent router would otherwise touch the repo's data
+and the embedding model. Tests never call a real provider.
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("LLM_PROVIDER", "local")
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+os.environ.setdefault("VECTOR_DB_DIR", tempfile.mkdtemp(prefix="vector_db_"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
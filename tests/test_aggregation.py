@@ -0,0 +1,71 @@
+import functools
+
+import pytest
+
+from agents.orchestrator import (
+    AGGREGATION_POLICIES, OrchestratorAgent, aggregate_comparisons, aggregate_multi_agent
+)
+
+
+def success(text, documents=None):
+    return {"status": "success", "response": text, "relevant_data": {"documents": [documents or []]}}
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.agents = {"Agent 1": object(), "Agent 2": object()}
+    keyword_matcher = orchestrator._build_keyword_matcher()
+    orchestrator._scan = functools.lru_cache(maxsize=16)(keyword_matcher.scan)
+    orchestrator.aggregation_policy = aggregate_multi_agent
+
+    def no_llm(*args, **kwargs):
+        raise AssertionError("aggregation LLM call")
+
+    orchestrator._generate_text = no_llm
+    return orchestrator
+
+
+def test_policies():
+    one, two = {"Agent 1": "a"}, {"Agent 1": "a", "Agent 2": "b"}
+    assert not aggregate_multi_agent("q", one, True)
+    assert aggregate_multi_agent("q", two, False)
+    assert not aggregate_comparisons("q", two, False)
+    assert aggregate_comparisons("q", two, True)
+    assert set(AGGREGATION_POLICIES) == {"comparison", "multi_agent"}
+
+
+def test_single_answer_is_passed_through_without_an_llm_call(orchestrator):
+    answer = orchestrator._aggregate_responses("what is user 1 doing?", {
+        "Agent 1": success("**Gym** at 7:00 AM\n\n\n\nthen work"),
+        "Agent 2": {"status": "timeout", "response": "Timed out", "relevant_data": None}
+    })
+    assert answer == "Gym at 7:00 AM\n\nthen work"
+
+
+def test_comparison_policy_lists_non_comparison_answers_per_user(orchestrator):
+    orchestrator.aggregation_policy = aggregate_comparisons
+    answer = orchestrator._aggregate_responses("what are they doing today?", {
+        "Agent 1": success("Working until 5 PM"),
+        "Agent 2": success("At the gym")
+    })
+    assert answer == "User 1: Working until 5 PM\n\nUser 2: At the gym"
+
+
+def test_comparison_queries_are_merged_by_the_llm(orchestrator):
+    orchestrator.aggregation_policy = aggregate_comparisons
+    plan = orchestrator._prepare_aggregation("when are both users free?", {
+        "Agent 1": success("Free after 5 PM", ["Monday 09:00-17:00 Work"]),
+        "Agent 2": success("Free in the evening", ["Monday 18:00-19:00 Gym"])
+    })
+    assert plan["answer"] is None and plan["is_comparison_query"]
+    assert "COMPARES schedules" in plan["prompt"]
+    assert "Monday | 09:00-17:00 | Work" in plan["prompt"]
+
+
+def test_error_answers_are_left_out(orchestrator):
+    answer = orchestrator._aggregate_responses("when is user 1 free?", {
+        "Agent 1": success("Error: rate limit exceeded"),
+        "Agent 2": success("Free after 5 PM")
+    })
+    assert answer == "Free after 5 PM"
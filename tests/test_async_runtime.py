@@ -0,0 +1,68 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from core import http_pool
+from core.async_runtime import get_background_loop, run_async, submit_async
+
+request_label = contextvars.ContextVar("request_label", default=None)
+
+
+def test_coroutines_run_on_one_background_loop():
+    async def current():
+        return asyncio.get_running_loop(), threading.current_thread().name
+
+    first_loop, thread_name = run_async(current())
+    second_loop, _ = run_async(current())
+    assert first_loop is second_loop is get_background_loop()
+    assert thread_name == "llm-event-loop"
+
+
+def test_context_variables_follow_the_coroutine():
+    async def read_label():
+        return request_label.get()
+
+    token = request_label.set("agent1.query")
+    try:
+        assert run_async(read_label()) == "agent1.query"
+    finally:
+        request_label.reset(token)
+
+
+def test_timeout_cancels_the_coroutine():
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(Exception):
+        run_async(slow(), timeout=0.05)
+    assert cancelled.wait(1)
+
+
+def test_blocking_on_the_loop_from_inside_it_is_refused():
+    async def nested():
+        inner = asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            submit_async(inner)
+        return True
+
+    assert run_async(nested())
+
+
+@pytest.mark.skipif(not http_pool.HTTPX_AVAILABLE, reason="httpx not installed")
+def test_http_clients_are_pooled_per_loop():
+    assert http_pool.get_http_client() is http_pool.get_http_client()
+
+    async def client():
+        return http_pool.get_async_http_client()
+
+    assert run_async(client()) is run_async(client())
+    other = asyncio.run(client())
+    assert other is not run_async(client())
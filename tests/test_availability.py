@@ -0,0 +1,58 @@
+import random
+
+from core.availability import AvailabilityMatrix
+from core.schedule_engine import WEEKDAYS, DAILY, default_days, busy_for_day, find_common_free_time
+
+
+def random_busy(rng, users):
+    user_busy = {}
+    for user in range(users):
+        busy_by_day = {}
+        for day in rng.sample([None] + WEEKDAYS, rng.randint(0, 4)):
+            intervals = []
+            for _ in range(rng.randint(0, 5)):
+                start = rng.randint(0, 1439)
+                intervals.append((start, min(1440, start + rng.randint(1, 300))))
+            busy_by_day[day] = sorted(intervals)
+        user_busy[f"User {user}"] = busy_by_day
+    return user_busy
+
+
+def test_minute_slots_match_interval_intersection():
+    rng = random.Random(7)
+    for _ in range(200):
+        user_busy = random_busy(rng, rng.randint(1, 8))
+        days = default_days(user_busy)
+        day_start, day_end, min_duration = rng.choice([(0, 1440, 0), (480, 1080, 30), (7, 1001, 15)])
+
+        matrix = AvailabilityMatrix.from_busy_by_day(user_busy, days=days, slot_minutes=1)
+        expected = {
+            day: find_common_free_time(
+                (busy_for_day(busy, day) for busy in user_busy.values()),
+                day_start=day_start, day_end=day_end, min_duration=min_duration
+            )
+            for day in days
+        }
+        assert matrix.common_free_slots(min_duration=min_duration, day_start=day_start, day_end=day_end) == expected
+
+
+def test_partially_busy_slots_count_as_busy():
+    matrix = AvailabilityMatrix.from_busy_by_day({"User 1": {None: [(62, 118)]}}, days=[DAILY], slot_minutes=5)
+    assert matrix.common_free_slots()[DAILY] == [(0, 60), (120, 1440)]
+
+
+def test_user_subset_and_heatmap():
+    user_busy = {
+        "User 1": {"Monday": [(540, 600)]},
+        "User 2": {"Monday": [(570, 630)]},
+        "User 3": {}
+    }
+    matrix = AvailabilityMatrix.from_busy_by_day(user_busy, days=["Monday"], slot_minutes=30)
+    assert matrix.common_free_slots(users=["User 1", "User 3"], day_start=480, day_end=720)["Monday"] == [(480, 540), (600, 720)]
+    free_users = matrix.heatmap()[0]
+    assert list(free_users[18:21]) == [2, 1, 2]
+
+
+def test_packed_size():
+    matrix = AvailabilityMatrix([f"User {i}" for i in range(40)], slot_minutes=5)
+    assert matrix.packed.shape == (40, 7, 36)
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+
+import pytest
+
+from agents.orchestrator import OrchestratorAgent
+from core.async_runtime import _CountingExecutor
+from core.bulkhead import Bulkhead, BulkheadFull
+
+
+def test_full_bulkhead_rejects_fast():
+    bulkhead = Bulkhead("Agent 1", max_concurrent=1, max_queue=0)
+
+    async def main():
+        await bulkhead.acquire()
+        assert bulkhead.saturated
+        with pytest.raises(BulkheadFull):
+            await bulkhead.acquire()
+        bulkhead.release()
+
+    asyncio.run(main())
+    stats = bulkhead.stats()
+    assert (stats["admitted"], stats["rejected"], stats["in_flight"]) == (1, 1, 0)
+
+
+def test_queued_queries_are_admitted_in_arrival_order():
+    bulkhead = Bulkhead("Agent 1", max_concurrent=1, max_queue=3)
+    order = []
+
+    async def query(name):
+        async with bulkhead.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(query(name) for name in "abcd"))
+
+    asyncio.run(main())
+    assert order == list("abcd")
+    stats = bulkhead.stats()
+    assert (stats["admitted"], stats["queued"], stats["peak_queue"], stats["in_flight"]) == (4, 3, 3, 0)
+
+
+def test_queue_timeout_frees_the_queue_position():
+    bulkhead = Bulkhead("Agent 1", max_concurrent=1, max_queue=1)
+
+    async def main():
+        await bulkhead.acquire()
+        with pytest.raises(BulkheadFull):
+            await bulkhead.acquire(timeout=0.05)
+        assert bulkhead.stats()["queue_depth"] == 0
+        bulkhead.release()
+
+    asyncio.run(main())
+    stats = bulkhead.stats()
+    assert stats["timeouts"] == 1 and stats["in_flight"] == 0 and stats["wait_seconds"] >= 0.05
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    bulkhead = Bulkhead("Agent 1", max_concurrent=1, max_queue=2)
+
+    async def main():
+        await bulkhead.acquire()
+        waiter = asyncio.ensure_future(bulkhead.acquire())
+        await asyncio.sleep(0)
+        # The slot is handed over and the waiter cancelled before it runs
+        bulkhead.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        assert bulkhead.stats()["in_flight"] == 0
+        await asyncio.wait_for(bulkhead.acquire(), 1)
+        bulkhead.release()
+
+    asyncio.run(main())
+    assert bulkhead.stats()["in_flight"] == 0
+
+
+def test_releases_from_other_threads_wake_waiters():
+    bulkhead = Bulkhead("Agent 1", max_concurrent=1, max_queue=1)
+
+    async def main():
+        await bulkhead.acquire()
+        threading.Timer(0.05, bulkhead.release).start()
+        await asyncio.wait_for(bulkhead.acquire(), 2)
+        bulkhead.release()
+
+    asyncio.run(main())
+    assert bulkhead.stats()["in_flight"] == 0
+
+
+def test_executor_counts_queue_depth_and_cancelled_items():
+    executor = _CountingExecutor(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    try:
+        running = executor.submit(lambda: (started.set(), release.wait(5)))
+        queued = [executor.submit(lambda: None) for _ in range(2)]
+        started.wait(5)
+        assert executor.stats() == {"submitted": 3, "running": 1, "completed": 0, "queue_depth": 2}
+
+        # Items cancelled while still queued never run but are done
+        assert queued[0].cancel()
+        assert executor.stats()["queue_depth"] == 1
+
+        release.set()
+        running.result(5)
+        queued[1].result(5)
+        assert executor.stats() == {"submitted": 3, "running": 0, "completed": 3, "queue_depth": 0}
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+
+def test_rejected_query_gets_an_overloaded_response():
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    bulkhead = Bulkhead("Agent 1", max_concurrent=1, max_queue=0)
+    orchestrator.bulkheads = {"Agent 1": bulkhead}
+
+    class Agent:
+        async def query_schedule_async(self, user_query, deadline=None, search_results=None):
+            raise AssertionError("the bulkhead should have rejected the query")
+
+    async def main():
+        await bulkhead.acquire()
+        return await orchestrator._query_agent_async("Agent 1", Agent(), "when?")
+
+    response = asyncio.run(main())
+    assert response["status"] == "overloaded"
+    assert "overloaded" in response["error"]
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import model_helper
+from core.cassette import LLMCassette, CassetteMissError, RECORD, REPLAY
+
+
+def _record(path, *texts):
+    cassette = LLMCassette(path, mode=RECORD)
+    for text in texts:
+        cassette.record("gemini", "gemini-test", "prompt", {"temperature": 0}, text, 0.5,
+                        {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5})
+    return cassette
+
+
+def test_replays_repeated_prompts_in_recording_order(tmp_path):
+    path = str(tmp_path / "calls.jsonl")
+    _record(path, "first", "second")
+
+    cassette = LLMCassette(path, mode=REPLAY)
+    texts = [cassette.lookup("gemini", "prompt", {"temperature": 0})["response"] for _ in range(3)]
+    assert texts == ["first", "second", "second"]
+    stats = cassette.stats()
+    assert stats["replayed"] == 3
+    assert stats["replayed_provider_seconds"] == pytest.approx(1.5)
+
+
+def test_key_includes_provider_and_params(tmp_path):
+    path = str(tmp_path / "calls.jsonl")
+    _record(path, "first")
+
+    cassette = LLMCassette(path, mode=REPLAY)
+    assert cassette.lookup("deepseek", "prompt", {"temperature": 0}) is None
+    assert cassette.lookup("gemini", "prompt", {"temperature": 1}) is None
+    assert cassette.stats()["misses"] == 2
+
+
+def test_miss_policy(tmp_path):
+    path = str(tmp_path / "calls.jsonl")
+    with pytest.raises(CassetteMissError):
+        LLMCassette(path, mode=REPLAY).miss("gemini", "prompt")
+    LLMCassette(path, mode=REPLAY, on_miss="live").miss("gemini", "prompt")
+    with pytest.raises(ValueError):
+        LLMCassette(path, mode="rewind")
+
+
+def test_provider_calls_are_recorded_then_replayed(tmp_path, monkeypatch):
+    path = str(tmp_path / "calls.jsonl")
+    extract = lambda response: response.text
+    live = lambda: SimpleNamespace(text="live answer", usage_metadata=None)
+
+    monkeypatch.setattr(model_helper, "_cassette", LLMCassette(path, mode=RECORD))
+    assert model_helper._with_cassette("gemini", "m", "prompt", None, live, extract)().text == "live answer"
+
+    monkeypatch.setattr(model_helper, "_cassette", LLMCassette(path, mode=REPLAY, replay_timing=False))
+
+    def offline():
+        raise AssertionError("replay must not reach the provider")
+
+    response = model_helper._with_cassette("gemini", "m", "prompt", None, offline, extract)()
+    assert response.text == "live answer" and response.replayed
+
+    async def offline_async():
+        raise AssertionError("replay must not reach the provider")
+
+    response = asyncio.run(model_helper._with_cassette_async("gemini", "m", "prompt", None, offline_async, extract)())
+    assert response.text == "live answer"
@@ -0,0 +1,160 @@
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from agents import agent2
+from core import circuit_breaker, model_helper
+from core.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def open_breaker(breaker, failures=2):
+    for _ in range(failures):
+        breaker.record_failure()
+
+
+def test_opens_on_failure_rate_and_rejects(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_requests=2, open_seconds=10)
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_requests=2, slow_call_seconds=1.0)
+    breaker.record_success(5.0)
+    breaker.record_success(5.0)
+    assert breaker.state == OPEN
+    assert breaker.stats()["slow_calls"] == 2
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("test", min_requests=2, open_seconds=10)
+    open_breaker(breaker)
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.would_allow()
+    assert breaker.would_allow()  # Peeking doesn't use the probe up
+    assert breaker.allow_request()
+    assert not breaker.would_allow()
+    assert not breaker.allow_request()
+
+
+def test_probe_result_closes_or_reopens(clock):
+    breaker = CircuitBreaker("test", min_requests=2, open_seconds=10)
+    open_breaker(breaker)
+    clock.now += 10
+    breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
+
+
+def test_disabled_breaker_never_rejects(clock):
+    breaker = CircuitBreaker("test", min_requests=1, enabled=False)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    assert breaker.would_allow()
+
+
+def test_provider_unavailable_once_half_open_probe_is_taken(clock, monkeypatch):
+    breaker = CircuitBreaker("deepseek", min_requests=2, open_seconds=10)
+    monkeypatch.setitem(model_helper._circuit_breakers, "deepseek", breaker)
+    open_breaker(breaker)
+    clock.now += 10
+    assert model_helper.is_provider_available("deepseek")
+    breaker.allow_request()
+    assert not model_helper.is_provider_available("deepseek")
+
+
+class FailingGeminiModel:
+    model_name = "gemini-test"
+    api_key = None
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def test_non_quota_resource_exhausted_counts_as_failure(monkeypatch):
+    breaker = CircuitBreaker("gemini", min_requests=100)
+    monkeypatch.setitem(model_helper._circuit_breakers, "gemini", breaker)
+    monkeypatch.setattr(model_helper, "_is_rate_limit_error", lambda error: False)
+    model = FailingGeminiModel(google_exceptions.ResourceExhausted("server resources exhausted"))
+
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        model_helper._generate_gemini_with_retry(model, "prompt", max_retries=3, base_delay=0)
+    assert model.calls == 1
+    assert breaker.stats()["failures"] == 1
+
+
+def test_rate_limit_is_not_a_failure(monkeypatch):
+    breaker = CircuitBreaker("gemini", min_requests=100)
+    monkeypatch.setitem(model_helper._circuit_breakers, "gemini", breaker)
+    monkeypatch.setattr(model_helper, "get_rate_limiter", lambda provider, api_key=None: NoopLimiter())
+    model = FailingGeminiModel(google_exceptions.ResourceExhausted("429 quota exceeded"))
+
+    with pytest.raises(Exception, match="Rate limit exceeded"):
+        model_helper._generate_gemini_with_retry(model, "prompt", max_retries=2, base_delay=0)
+    assert model.calls == 2
+    assert breaker.stats()["failures"] == 0
+
+
+class NoopLimiter:
+    def acquire(self, tokens, max_wait=None):
+        pass
+
+    def penalize(self, seconds):
+        pass
+
+    def record_usage(self, estimated, actual):
+        pass
+
+
+def test_agent2_fails_over_to_gemini_when_deepseek_rejects(monkeypatch):
+    agent = agent2.Agent2.__new__(agent2.Agent2)
+    agent.use_deepseek = True
+    agent.hedge_partner = None
+    agent.client = object()
+    agent.gemini_api_key = "gemini-key"
+    agent.model = "gemini-model"
+
+    def deepseek_rejects(*args, **kwargs):
+        raise CircuitOpenError("deepseek circuit is open")
+
+    gemini_calls = []
+    monkeypatch.setattr(agent2, "is_provider_available", lambda provider: True)
+    monkeypatch.setattr(agent2, "generate_content_with_deepseek", deepseek_rejects)
+    monkeypatch.setattr(agent2, "generate_content_with_retry", lambda model, prompt, **kwargs: gemini_calls.append(model) or "from gemini")
+    monkeypatch.setattr(agent2, "get_response_text", lambda response: response)
+    monkeypatch.setattr(agent2, "get_task_model", lambda task, api_key: f"{task}-model")
+
+    assert agent._generate("prompt", task="summarize") == "from gemini"
+    assert gemini_calls == ["summarize-model"]
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.concurrency import (
+    AdaptiveConcurrencyLimiter, ConcurrencyLimiterRegistry, ConcurrencyLimitTimeout,
+    CANCELLED, ERROR, RATE_LIMITED, classify_outcome
+)
+
+
+def test_limit_grows_additively_on_healthy_calls():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, max_limit=4)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert limiter.limit == 4
+    assert limiter.stats()["increases"] == 2
+
+
+def test_burst_of_429s_cuts_the_limit_once():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8)
+    for _ in range(8):
+        limiter.acquire()
+    for _ in range(8):
+        limiter.release(outcome=RATE_LIMITED)
+    assert limiter.limit == 4
+    assert limiter.stats()["decreases"] == 1
+
+
+def test_latency_spike_is_congestion():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8)
+    limiter.acquire()
+    limiter.release(0.1)
+    limiter.acquire()
+    limiter.release(1.0)
+    assert limiter.limit == 4
+
+
+def test_cancelled_calls_give_no_feedback():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2)
+    limiter.acquire()
+    limiter.release(outcome=CANCELLED)
+    stats = limiter.stats()
+    assert stats["error_rate"] == 0.0 and stats["in_flight"] == 0 and limiter.limit == 2
+
+
+def test_threads_wait_for_a_slot_and_time_out():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1, max_limit=1)
+    limiter.acquire()
+    with pytest.raises(ConcurrencyLimitTimeout):
+        limiter.acquire(timeout=0.05)
+
+    threading.Timer(0.05, limiter.release, kwargs={"latency": 0.1}).start()
+    limiter.acquire(timeout=2)
+    stats = limiter.stats()
+    assert stats["waited"] == 1 and stats["timeouts"] == 1 and stats["in_flight"] == 1
+
+
+def test_coroutines_are_woken_by_releases_from_other_threads():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1, max_limit=1)
+    limiter.acquire()
+
+    async def main():
+        with pytest.raises(ConcurrencyLimitTimeout):
+            await limiter.acquire_async(timeout=0.05)
+        threading.Timer(0.05, limiter.release, kwargs={"latency": 0.1}).start()
+        await limiter.acquire_async(timeout=2)
+
+    asyncio.run(main())
+    assert limiter.stats()["in_flight"] == 1
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_lease_reports_the_outcome():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4)
+    with pytest.raises(RuntimeError):
+        with limiter.lease():
+            raise RuntimeError("429 Resource has been exhausted")
+    assert limiter.limit == 2 and limiter.stats()["in_flight"] == 0
+
+    async def cancelled():
+        async with limiter.lease_async():
+            raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancelled())
+    assert limiter.limit == 2 and limiter.stats()["in_flight"] == 0
+
+
+def test_classify_outcome():
+    assert classify_outcome(Exception("Quota exceeded")) == RATE_LIMITED
+    assert classify_outcome(ValueError("bad response")) == ERROR
+    assert classify_outcome(asyncio.CancelledError()) == CANCELLED
+
+
+def test_registry_shares_limiters_per_provider_and_key():
+    registry = ConcurrencyLimiterRegistry(initial_limit=3)
+    assert registry.get("gemini", "key") is registry.get("gemini", "key")
+    assert registry.get("deepseek", "key") is not registry.get("gemini", "key")
+    assert registry.get("gemini", "key").limit == 3
+    assert all("key" not in name.split(":")[1] for name in registry.stats())
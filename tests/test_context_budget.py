@@ -0,0 +1,39 @@
+from core.context_budget import TABLE_HEADER, build_schedule_context
+
+
+def test_documents_become_a_chronological_timeline():
+    results = {
+        "documents": [["Monday 12:30-13:15 Lunch break\nMonday 09:00 Start work, standup at 9:30 AM"]],
+        "metadatas": [[{"timestamp": "2024-01-01T10:00:00"}]],
+        "distances": [[0.1]]
+    }
+    assert build_schedule_context(results) == "\n".join([
+        TABLE_HEADER,
+        "Monday | 09:00 | Start work, standup at 9:30 AM",
+        "Monday | 12:30-13:15 | Lunch break"
+    ])
+
+
+def test_duplicates_keep_the_most_relevant_copy():
+    documents = ["Daily routine:\n07:00 Gym", "07:00 Gym session with coach"]
+    context = build_schedule_context({"documents": documents})
+    assert context.splitlines() == [TABLE_HEADER, "Daily | 07:00 | Gym"]
+    # Equally relevant copies keep the more detailed one
+    context = build_schedule_context({"documents": documents, "distances": [0.2, 0.2]})
+    assert context.splitlines() == [TABLE_HEADER, "Daily | 07:00 | Gym session with coach"]
+
+
+def test_budget_keeps_the_most_relevant_entries():
+    documents = [f"Tuesday {hour:02d}:00 Meeting number {hour}" for hour in range(8, 18)]
+    distances = [abs(hour - 15) for hour in range(8, 18)]
+    context = build_schedule_context({"documents": [documents], "distances": [distances]}, budget_tokens=30)
+
+    rows = context.splitlines()
+    assert "Tuesday | 15:00 | Meeting number 15" in rows
+    assert "Tuesday | 08:00 | Meeting number 8" not in rows
+    assert rows[-1].endswith("less relevant entries omitted)")
+
+
+def test_empty_results():
+    assert build_schedule_context({"documents": [[]]}) == ""
+    assert build_schedule_context({}) == ""
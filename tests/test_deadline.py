@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.orchestrator import OrchestratorAgent
+from core import model_helper
+from core.circuit_breaker import CircuitBreaker
+from core.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+
+
+def test_budget_accounting():
+    deadline = Deadline(60)
+    assert not deadline.expired
+    assert deadline.cap(5) == 5
+    assert 59 < deadline.cap(None) <= 60
+    deadline.check()
+
+    spent = Deadline(0)
+    assert spent.expired and spent.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        spent.check("agent1 query")
+    # Callers that already handle timeouts also catch it
+    assert issubclass(DeadlineExceeded, TimeoutError)
+
+
+def test_scope_nests_and_none_keeps_the_current_one():
+    outer, inner = Deadline(10), Deadline(1)
+    assert current_deadline() is None
+    with deadline_scope(outer):
+        with deadline_scope(None) as active:
+            assert active is outer
+        with deadline_scope(inner):
+            assert current_deadline() is inner
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+class FakeLimiter:
+    def penalize(self, seconds):
+        self.penalty = seconds
+
+
+def test_retry_pauses_stop_at_the_deadline():
+    limiter = FakeLimiter()
+    with deadline_scope(Deadline(1)):
+        with pytest.raises(DeadlineExceeded):
+            model_helper._pause_after_rate_limit(limiter, Exception("429"), 0, 3, 5.0, "Gemini rate limit")
+    # The key is still paused for other callers
+    assert limiter.penalty == 5.0
+
+
+def test_expired_deadline_is_not_a_provider_failure():
+    breaker = CircuitBreaker("gemini", min_requests=1)
+    with deadline_scope(Deadline(0)):
+        model_helper._record_failure(breaker, DeadlineExceeded("late"))
+    assert breaker.stats()["state"] == "closed"
+    model_helper._record_failure(breaker, Exception("boom"))
+    assert breaker.stats()["state"] == "open"
+
+
+class FakeAgent:
+    def __init__(self, delay):
+        self.delay = delay
+        self.cancelled = False
+
+    async def query_schedule_async(self, user_query, deadline, search_results=None):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"response": "free after 5pm", "relevant_data": {}}
+
+
+def test_slow_agents_time_out_and_fast_ones_are_kept():
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.bulkheads = {}
+    slow = FakeAgent(5)
+    agents = {"Agent1": FakeAgent(0), "Agent2": slow}
+
+    started = time.monotonic()
+    responses = asyncio.run(orchestrator.query_agents_async("when?", agents, Deadline(0.2)))
+    assert time.monotonic() - started < 2
+    assert responses["Agent1"]["status"] == "success"
+    assert responses["Agent2"]["status"] == "timeout"
+    assert slow.cancelled
@@ -0,0 +1,31 @@
+import asyncio
+
+from core.gemini_clients import KeyedGenerativeModel, get_key_clients
+
+
+def test_clients_are_shared_per_key():
+    assert get_key_clients("key-a") is get_key_clients("key-a")
+    assert get_key_clients("key-a").client("generative") is get_key_clients("key-a").client("generative")
+    assert get_key_clients("key-a").client("generative") is not get_key_clients("key-b").client("generative")
+
+
+def test_models_keep_their_own_key():
+    first = KeyedGenerativeModel("gemini-2.0-flash", api_key="key-a")
+    second = KeyedGenerativeModel("gemini-2.0-flash", api_key="key-b")
+    assert first._client is get_key_clients("key-a").client("generative")
+    assert second._client is get_key_clients("key-b").client("generative")
+
+    second.bind_api_key("key-a")
+    assert second.api_key == "key-a" and second._client is first._client
+
+
+def test_async_clients_are_per_event_loop():
+    clients = get_key_clients("key-loop")
+
+    async def current():
+        return clients.async_client("generative"), clients.async_client("generative")
+
+    first, again = asyncio.run(current())
+    second, _ = asyncio.run(current())
+    assert first is again
+    assert first is not second
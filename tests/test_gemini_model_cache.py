@@ -0,0 +1,73 @@
+import pytest
+
+from core import model_helper
+from core.task_profiles import GEMINI_MODEL_TIERS
+
+
+class FakeModel:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+
+@pytest.fixture
+def discovery(tmp_path, monkeypatch):
+    """Gemini models that can be built; records every attempt"""
+    attempts = []
+    available = {GEMINI_MODEL_TIERS["quality"][-1], GEMINI_MODEL_TIERS["fast"][0]}
+
+    def build(model_name, api_key, generation_config=None):
+        attempts.append(model_name)
+        if model_name not in available:
+            raise ValueError(f"{model_name} not found")
+        return FakeModel(model_name)
+
+    monkeypatch.setattr(model_helper, "use_local_llm", lambda: False)
+    monkeypatch.setattr(model_helper, "_build_gemini_model", build)
+    monkeypatch.setattr(model_helper, "list_gemini_models", lambda api_key: [])
+    monkeypatch.setattr(model_helper, "GEMINI_MODEL_CACHE_PATH", str(tmp_path / "models.json"))
+    monkeypatch.setattr(model_helper, "_gemini_model_names", {})
+    return attempts, available
+
+
+def test_resolved_name_is_reused_in_process_and_across_restarts(discovery, monkeypatch):
+    attempts, _ = discovery
+    expected = GEMINI_MODEL_TIERS["quality"][-1]
+
+    assert model_helper.get_gemini_model("key").model_name == expected
+    assert attempts == GEMINI_MODEL_TIERS["quality"]
+
+    attempts.clear()
+    assert model_helper.get_gemini_model("key").model_name == expected
+    assert attempts == [expected]
+
+    # A new process only has the file
+    monkeypatch.setattr(model_helper, "_gemini_model_names", {})
+    attempts.clear()
+    assert model_helper.get_gemini_model("key").model_name == expected
+    assert attempts == [expected]
+
+
+def test_names_are_cached_per_key_and_tier(discovery):
+    attempts, _ = discovery
+    model_helper.get_gemini_model("key")
+    attempts.clear()
+    assert model_helper.get_gemini_model("key", tier="fast").model_name == GEMINI_MODEL_TIERS["fast"][0]
+    assert model_helper.get_gemini_model("other-key").model_name == GEMINI_MODEL_TIERS["quality"][-1]
+    assert len(attempts) == 1 + len(GEMINI_MODEL_TIERS["quality"])
+
+
+def test_expired_or_broken_entries_fall_back_to_discovery(discovery, monkeypatch):
+    attempts, available = discovery
+    model_helper.get_gemini_model("key")
+
+    monkeypatch.setattr(model_helper, "GEMINI_MODEL_CACHE_TTL_SECONDS", -1)
+    attempts.clear()
+    model_helper.get_gemini_model("key")
+    assert attempts == GEMINI_MODEL_TIERS["quality"]
+
+    monkeypatch.setattr(model_helper, "GEMINI_MODEL_CACHE_TTL_SECONDS", 3600)
+    available.clear()
+    available.add(GEMINI_MODEL_TIERS["quality"][0])
+    attempts.clear()
+    assert model_helper.get_gemini_model("key").model_name == GEMINI_MODEL_TIERS["quality"][0]
+    assert attempts == [GEMINI_MODEL_TIERS["quality"][-1], GEMINI_MODEL_TIERS["quality"][0]]
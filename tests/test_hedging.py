@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from core import model_helper
+from core.hedging import HedgePolicy, hedged_call
+from core.llm_cache import LLMResponseCache
+
+
+def call_after(seconds, result=None, error=None, log=None, name=None):
+    async def fn():
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        if error is not None:
+            raise error
+        return result
+    return fn
+
+
+def test_delay_uses_percentile_once_enough_samples():
+    policy = HedgePolicy(percentile=90, default_delay=2.0, min_delay=0.1, max_delay=5.0, min_samples=10)
+    for value in range(1, 10):
+        policy.record_latency("gemini", value / 10)
+    assert policy.delay("gemini") == 2.0
+    policy.record_latency("gemini", 1.0)
+    assert policy.delay("gemini") == pytest.approx(1.0)
+
+
+def test_delay_is_clamped():
+    policy = HedgePolicy(min_delay=0.5, max_delay=1.0, min_samples=1)
+    policy.record_latency("fast", 0.01)
+    policy.record_latency("slow", 60)
+    assert policy.delay("fast") == 0.5
+    assert policy.delay("slow") == 1.0
+
+
+def test_fast_primary_is_not_hedged():
+    policy = HedgePolicy(default_delay=0.2)
+    result = asyncio.run(hedged_call(
+        ("gemini", call_after(0.01, "primary")),
+        ("deepseek", call_after(0.01, "secondary")),
+        policy
+    ))
+    assert result == ("primary", "gemini")
+    assert policy.stats()["hedged"] == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    policy = HedgePolicy(default_delay=0.05)
+    log = []
+    result = asyncio.run(hedged_call(
+        ("gemini", call_after(1.0, "primary", log=log, name="gemini")),
+        ("deepseek", call_after(0.01, "secondary")),
+        policy
+    ))
+    assert result == ("secondary", "deepseek")
+    assert log == ["gemini cancelled"]
+    stats = policy.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    # The cancelled primary leaves a lower-bound sample; the winner's latency is recorded by the caller
+    assert list(policy._latencies) == ["gemini"]
+    assert policy._latencies["gemini"][0] >= 0.05
+
+
+def test_failed_primary_hedges_immediately():
+    policy = HedgePolicy(default_delay=5.0)
+    result = asyncio.run(asyncio.wait_for(hedged_call(
+        ("gemini", call_after(0, error=ValueError("boom"))),
+        ("deepseek", call_after(0.01, "secondary")),
+        policy
+    ), timeout=1.0))
+    assert result == ("secondary", "deepseek")
+
+
+def test_primary_error_is_raised_when_everything_fails():
+    policy = HedgePolicy(default_delay=0.01)
+    with pytest.raises(ValueError, match="primary"):
+        asyncio.run(hedged_call(
+            ("gemini", call_after(0, error=ValueError("primary"))),
+            ("deepseek", call_after(0, error=RuntimeError("secondary"))),
+            policy
+        ))
+    assert policy.stats()["failures"] == 1
+
+
+def test_only_real_provider_calls_feed_the_hedge_delay(monkeypatch):
+    policy = HedgePolicy()
+    monkeypatch.setattr(model_helper, "_hedge_policy", policy)
+    monkeypatch.setattr(model_helper, "_llm_cache", LLMResponseCache(max_entries=10, ttl_seconds=60))
+    calls = []
+
+    async def provider_call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def main():
+        return [
+            await model_helper._generate_with_layers_async(
+                "gemini", "model", "prompt", None, provider_call, lambda response: response, True, True
+            )
+            for _ in range(3)
+        ]
+
+    results = asyncio.run(main())
+    assert [getattr(result, "text", result) for result in results] == ["answer"] * 3
+    assert len(calls) == 1
+    samples = list(policy._latencies["gemini"])
+    assert len(samples) == 1 and samples[0] >= 0.02
+
+
+def test_gemini_hedge_partner_uses_the_task_model(monkeypatch):
+    built = []
+    monkeypatch.setattr(model_helper, "get_task_model", lambda task, api_key: built.append((task, api_key)) or f"{task}-model")
+    partner = model_helper.GeminiHedgePartner("gemini-key")
+
+    assert partner.model("summarize") == "summarize-model"
+    provider, _ = model_helper._async_provider_call(partner, "prompt", 1, 0, True, task="route")
+    assert provider == "gemini"
+    assert built == [("summarize", "gemini-key"), ("route", "gemini-key")]
+
+
+def test_hedged_generation_returns_the_winner(monkeypatch):
+    policy = HedgePolicy(default_delay=0.05)
+    monkeypatch.setattr(model_helper, "_hedge_policy", policy)
+    monkeypatch.setattr(model_helper, "_async_provider_call", lambda target, *args, **kwargs: target)
+
+    text, provider = model_helper.generate_content_hedged(
+        ("deepseek", call_after(1.0, "slow answer")),
+        ("gemini", call_after(0.01, "fast answer")),
+        "prompt"
+    )
+    assert (text, provider) == ("fast answer", "gemini")
+    assert policy.stats()["hedge_wins"] == 1
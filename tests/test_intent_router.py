@@ -0,0 +1,76 @@
+from core.intent_router import IntentRouter, QueryEmbeddings
+
+VOCABULARY = ["schedule", "free", "meeting", "weather", "capital", "recipe", "monday"]
+
+
+class BagOfWords:
+    """Deterministic stand-in for the sentence embedding model"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        return [[float(text.lower().count(word)) for word in VOCABULARY] for text in texts]
+
+
+def make_router(embed=None, **thresholds):
+    router = IntentRouter("intent", QueryEmbeddings(embed or BagOfWords()), **thresholds)
+    router.add_examples("schedule", ["what is on my schedule", "am I free on monday", "when is my meeting"])
+    router.add_examples("general", ["what is the weather", "capital of France", "a recipe for soup", " "])
+    router.build()
+    return router
+
+
+def test_routes_to_the_nearest_centroid():
+    router = make_router()
+    assert router.ready
+    assert router.classify("Am I FREE for a meeting?")[0] == "schedule"
+    assert router.classify("weather tomorrow")[0] == "general"
+
+
+def test_unconfident_decisions_fall_back():
+    router = make_router()
+    label, confidence = router.classify("tell me a joke")
+    assert label is None and confidence == 0.0
+    # Equally close to both centroids: no margin
+    assert make_router(min_confidence=0.0).classify("weather meeting")[0] is None
+    assert router.stats()["fallbacks"] == 1
+
+
+def test_query_embeddings_are_cached():
+    embed = BagOfWords()
+    router = make_router(embed)
+    calls = embed.calls
+    router.classify("free on monday?")
+    router.classify("free  on Monday?")
+    assert embed.calls == calls + 1
+
+
+def test_embedding_errors_fall_back():
+    router = make_router()
+
+    def broken(texts):
+        raise RuntimeError("model not loaded")
+
+    router._embeddings.embed = broken
+    assert router.classify("new question") == (None, 0.0)
+    assert router.stats()["errors"] == 1
+
+
+def test_unbuilt_router_falls_back():
+    router = IntentRouter("empty", QueryEmbeddings(BagOfWords()))
+    assert not router.ready
+    assert router.classify("anything") == (None, 0.0)
+
+
+def test_evaluate_reports_accuracy_of_confident_decisions():
+    report = make_router().evaluate([
+        ("free on monday", "schedule"),
+        ("weather today", "general"),
+        ("weather on monday", "schedule"),
+        ("tell me a joke", "general")
+    ])
+    assert report["examples"] == 4
+    assert report["fallback_rate"] == 0.25
+    assert report["accuracy"] == round(2 / 3, 3)
@@ -0,0 +1,56 @@
+import pytest
+
+from core.key_pool import KeyPool, REMAINING_QUOTA
+
+
+class FakeLimiter:
+    def __init__(self, wait=0.0, remaining=1.0):
+        self.wait = wait
+        self.remaining = remaining
+
+    def peek_wait(self, tokens=0):
+        return self.wait
+
+    def remaining_fraction(self):
+        return self.remaining
+
+
+def make_pool(limiters, policy="least_loaded"):
+    return KeyPool("gemini", list(limiters), limiters.__getitem__, policy=policy)
+
+
+def test_idle_keys_are_used_round_robin():
+    pool = make_pool({"a": FakeLimiter(), "b": FakeLimiter(), "c": FakeLimiter()})
+    picks = []
+    for _ in range(6):
+        api_key = pool.acquire()
+        picks.append(api_key)
+        pool.release(api_key)
+    assert picks == ["a", "b", "c", "a", "b", "c"]
+
+
+def test_least_loaded_skips_busy_and_rate_limited_keys():
+    limiters = {"a": FakeLimiter(), "b": FakeLimiter(wait=5.0), "c": FakeLimiter()}
+    pool = make_pool(limiters)
+    with pool.lease() as first:
+        with pool.lease() as second:
+            assert {first, second} == {"a", "c"}
+            # Every free key is busy: a busy key still beats waiting for the limiter
+            with pool.lease() as third:
+                assert third in ("a", "c")
+    assert all(key["in_flight"] == 0 for key in pool.stats()["keys"].values())
+
+
+def test_remaining_quota_prefers_the_most_budget():
+    limiters = {"a": FakeLimiter(remaining=0.2), "b": FakeLimiter(remaining=0.9), "c": FakeLimiter(wait=1.0, remaining=1.0)}
+    pool = make_pool(limiters, policy=REMAINING_QUOTA)
+    assert pool.acquire() == "b"
+
+
+def test_configuration_errors():
+    with pytest.raises(ValueError):
+        make_pool({"a": FakeLimiter()}, policy="random")
+    with pytest.raises(ValueError):
+        KeyPool("gemini", ["", None], lambda key: FakeLimiter())
+    pool = KeyPool("gemini", ["a", "a", "b"], lambda key: FakeLimiter())
+    assert len(pool) == 2 and "b" in pool
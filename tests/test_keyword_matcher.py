@@ -0,0 +1,46 @@
+from core.keyword_matcher import KeywordMatcher
+
+
+def make_matcher():
+    matcher = KeywordMatcher()
+    matcher.add("user 1", "agent1")
+    matcher.add("user 12", "agent12")
+    matcher.add("he", "he")
+    matcher.add("she", "she")
+    matcher.add("hers", "hers")
+    matcher.add("free", "schedule")
+    matcher.add("available", "schedule")
+    matcher.add("agent", "mention", whole_word=True)
+    return matcher
+
+
+def test_finds_overlapping_keywords_in_one_pass():
+    assert make_matcher().scan("ushers") == {"he", "she", "hers"}
+
+
+def test_case_insensitive_substrings_like_in_checks():
+    assert make_matcher().scan("Is she FREE on Monday?") == {"she", "he", "schedule"}
+
+
+def test_numbers_are_not_matched_inside_longer_numbers():
+    matcher = make_matcher()
+    assert "agent1" not in matcher.scan("what is user 12 doing?")
+    assert matcher.scan("what is user 12 doing?") >= {"agent12"}
+    assert "agent1" in matcher.scan("is user 1, free?")
+
+
+def test_whole_word_keywords():
+    matcher = make_matcher()
+    assert "mention" in matcher.scan("ask the agent now")
+    assert "mention" not in matcher.scan("ask agent1 now")
+    assert "mention" in matcher.scan("agent")
+
+
+def test_keywords_added_after_a_scan_are_found():
+    matcher = KeywordMatcher()
+    matcher.add("gym", "gym")
+    assert matcher.scan("lunch") == frozenset()
+    matcher.add("lunch", "lunch")
+    assert matcher.scan("lunch after gym") == {"gym", "lunch"}
+    assert matcher.keywords == 2
+    assert matcher.scan("") == frozenset() and matcher.scan(None) == frozenset()
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+from core import llm_cache, model_helper
+from core.llm_cache import LLMResponseCache
+
+
+def test_key_depends_on_prompt_model_and_params():
+    key = LLMResponseCache.make_key("gemini", "model", "prompt", {"temperature": 0.2})
+    assert key == LLMResponseCache.make_key("gemini", "model", "prompt", {"temperature": 0.2})
+    assert key != LLMResponseCache.make_key("gemini", "model", "prompt!", {"temperature": 0.2})
+    assert key != LLMResponseCache.make_key("gemini", "other", "prompt", {"temperature": 0.2})
+    assert key != LLMResponseCache.make_key("gemini", "model", "prompt", {"temperature": 0.7})
+
+
+def test_memory_tier_is_lru():
+    cache = LLMResponseCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = LLMResponseCache(ttl_seconds=10)
+    cache.set("a", "A")
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMResponseCache(path=path).set("a", "A", provider="gemini", model="model")
+    cache = LLMResponseCache(path=path)
+    assert cache.on_disk
+    assert cache.get("a") == "A"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_empty_responses_are_not_stored():
+    cache = LLMResponseCache()
+    cache.set("a", "")
+    assert cache.get("a") is None
+
+
+class ThreadRecordingCache(LLMResponseCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.current_thread())
+        return super().get(key)
+
+    def set(self, *args, **kwargs):
+        self.threads.append(threading.current_thread())
+        return super().set(*args, **kwargs)
+
+
+def test_async_path_keeps_disk_io_off_the_event_loop(tmp_path, monkeypatch):
+    cache = ThreadRecordingCache(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(model_helper, "_llm_cache", cache)
+
+    async def provider_call():
+        return "answer"
+
+    async def main():
+        loop_thread = threading.current_thread()
+        for _ in range(2):
+            await model_helper._generate_with_layers_async(
+                "gemini", "model", "prompt", None, provider_call, lambda response: response, True, False
+            )
+        return loop_thread
+
+    loop_thread = asyncio.run(main())
+    assert len(cache.threads) == 3  # miss, store, hit
+    assert loop_thread not in cache.threads
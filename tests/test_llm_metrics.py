@@ -0,0 +1,92 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core import model_helper
+from core.llm_metrics import LLMMetrics, Histogram, call_label
+from core.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_cost_credits_cached_prompt_tokens():
+    metrics = LLMMetrics(prices={"gemini": (1.0, 4.0, 0.25)})
+    assert metrics.cost("gemini", 1_000_000, 0) == pytest.approx(1.0)
+    assert metrics.cost("gemini", 1_000_000, 1_000_000, cached_prompt_tokens=1_000_000) == pytest.approx(4.25)
+    assert metrics.cost("unknown", 1_000_000, 1_000_000) == 0.0
+
+
+def test_calls_are_attributed_to_the_current_label():
+    metrics = LLMMetrics(prices={"gemini": (1.0, 1.0)})
+    with call_label("agent1.query"):
+        metrics.record("gemini", 0.3, prompt_tokens=100, completion_tokens=10)
+        metrics.record("gemini", 0.1, outcome="cache_hit", prompt_tokens=100)
+    metrics.record("deepseek", 2.0, outcome="error", retries=2)
+
+    snapshot = metrics.snapshot()
+    agent1 = snapshot["by_label"]["agent1.query"]
+    assert agent1["calls"] == 2 and agent1["cache_hits"] == 1
+    # Cache hits cost no tokens
+    assert agent1["prompt_tokens"] == 100
+    assert snapshot["by_label"]["unlabeled"]["errors"] == 1
+    assert snapshot["by_provider"]["deepseek"]["retries"] == 2
+    assert snapshot["total"]["calls"] == 3
+
+    metrics.reset()
+    assert metrics.snapshot()["total"]["calls"] == 0
+
+
+def test_histogram_percentiles_are_bucket_bounds():
+    hist = Histogram((1, 2, 5))
+    for value in (0.5, 0.5, 1.5, 4.0, 9.0):
+        hist.observe(value)
+    assert hist.percentile(50) == 2
+    assert hist.percentile(99) == 9.0
+    assert hist.to_dict()["buckets"] == {"le_1": 2, "le_2": 1, "le_5": 1, "le_inf": 1}
+
+
+def test_metered_calls_record_provider_usage(monkeypatch):
+    metrics = LLMMetrics()
+    monkeypatch.setattr(model_helper, "_llm_metrics", metrics)
+    response = SimpleNamespace(text="answer", usage_metadata=SimpleNamespace(
+        prompt_token_count=40, candidates_token_count=5, total_token_count=45, cached_content_token_count=30))
+
+    with call_label("orchestrator.route"):
+        model_helper._metered("gemini", "prompt", lambda: response, lambda r: r.text)()
+
+    stats = metrics.snapshot()["by_label"]["orchestrator.route"]
+    assert (stats["prompt_tokens"], stats["completion_tokens"], stats["cached_prompt_tokens"]) == (40, 5, 30)
+
+
+def test_context_cache_creation_is_not_counted_as_collapsed_llm_calls(monkeypatch):
+    created = []
+
+    def create(model, prefix, api_key, digest):
+        created.append(digest)
+        time.sleep(0.1)
+        return SimpleNamespace(model_name="cached"), time.time() + 600
+
+    monkeypatch.setattr(model_helper, "is_context_cacheable", lambda text: True)
+    monkeypatch.setattr(model_helper, "_create_context_cache", create)
+    monkeypatch.setattr(model_helper, "_context_caches", {})
+    monkeypatch.setattr(model_helper, "_context_cache_flight", SingleFlight())
+    monkeypatch.setattr(model_helper, "_single_flight", SingleFlight())
+    monkeypatch.setattr(model_helper, "_async_single_flight", AsyncSingleFlight())
+
+    model = SimpleNamespace(model_name="gemini-test")
+    prefix = "schedule " * 50
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            model_helper.with_context_cache(model, prefix + "question", prefix, "key")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(rest == "question" and cached.model_name == "cached" for cached, rest in results)
+    assert model_helper._context_cache_flight.stats()["collapsed"] == 3
+    assert model_helper.get_single_flight_stats().get("collapsed", 0) == 0
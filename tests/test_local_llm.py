@@ -0,0 +1,72 @@
+import asyncio
+import random
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from core.local_llm import LocalBackend, LocalDeepSeekClient, LocalGeminiModel, parse_latency, PREFIX_CACHE_BLOCK
+
+
+def test_latency_specs():
+    rng = random.Random(0)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 1 <= parse_latency("uniform:1,2")(rng) <= 2
+    assert parse_latency("normal:0,0")(rng) == 0
+    assert parse_latency("lognormal:0.8,0.4")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1,2")
+
+
+def test_runs_are_reproducible_per_seed():
+    plans = lambda seed: [LocalBackend(latency="uniform:0,1", seed=seed).plan("gemini", f"prompt {i}") for i in range(5)]
+    assert plans(1) == plans(1)
+    assert plans(1) != plans(2)
+
+
+def test_repeated_prompts_get_fresh_draws():
+    backend = LocalBackend(latency="uniform:0,1")
+    assert backend.plan("gemini", "same") != backend.plan("gemini", "same")
+
+
+def test_injected_failure_rates():
+    backend = LocalBackend(latency="fixed:0", error_rate=0.3, rate_limit_rate=0.2, seed=3)
+    failures = [backend.plan("deepseek", f"prompt {i}")[1] for i in range(2000)]
+    assert failures.count("rate_limit") / 2000 == pytest.approx(0.2, abs=0.03)
+    assert failures.count("error") / 2000 == pytest.approx(0.3, abs=0.03)
+
+
+def test_responses_follow_the_prompt_templates():
+    backend = LocalBackend()
+    assert backend.respond('One word only: agent1/agent2/all\nQuery: "what is user 2 doing?"') == "agent2"
+    assert backend.respond("Question: What is HTTP?\n") == "This is a local stand-in answer to: What is HTTP?"
+    assert backend.respond("anything else").startswith("Local response ")
+
+
+def test_prefix_cache_credits_repeated_prefixes():
+    backend = LocalBackend()
+    prefix = "x" * PREFIX_CACHE_BLOCK * 2
+    assert backend.usage(prefix + "first", "answer")[2] == 0
+    assert backend.usage(prefix + "second", "answer")[2] == PREFIX_CACHE_BLOCK * 2 // 4
+
+
+def test_gemini_stand_in_errors_and_timeouts():
+    model = LocalGeminiModel(LocalBackend(latency="fixed:0", rate_limit_rate=1.0))
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        model.generate_content("prompt")
+
+    slow = LocalGeminiModel(LocalBackend(latency="fixed:5"))
+    with pytest.raises(google_exceptions.DeadlineExceeded):
+        asyncio.run(slow.generate_content_async("prompt", request_options={"timeout": 0.01}))
+
+
+def test_stand_ins_return_provider_shaped_responses():
+    backend = LocalBackend(latency="fixed:0")
+    gemini = LocalGeminiModel(backend).generate_content("Question: Why?\n")
+    assert gemini.text and gemini.usage_metadata.total_token_count > 0
+
+    chunks = list(LocalGeminiModel(backend).generate_content("Question: Why?\n", stream=True))
+    assert "".join(chunk.text for chunk in chunks) == gemini.text
+
+    completion = LocalDeepSeekClient(backend).chat.completions.create(model="deepseek-chat", messages=[{"role": "user", "content": "Question: Why?\n"}])
+    assert completion.choices[0].message.content == gemini.text
+    assert completion.usage.total_tokens > 0
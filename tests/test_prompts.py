@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+from core import model_helper
+from core.prompts import AGENT_ANSWER, GENERAL_QUESTION, ROUTE
+
+
+def test_requests_share_the_prefix_and_differ_only_in_the_suffix():
+    first = ROUTE.render(user_query="when is user 1 free?")
+    second = ROUTE.render(user_query="what is user 2 doing?")
+    prefix = ROUTE.prefix_text()
+    assert first.startswith(prefix + "\n\n") and second.startswith(prefix + "\n\n")
+    assert first.endswith('Query: "when is user 1 free?"')
+
+
+def test_prefix_only_uses_per_caller_values():
+    values = dict(user="User 1", format_example="Monday 9:00 AM", full_schedule="", context="ctx", query="q")
+    prompt = AGENT_ANSWER.render(**values)
+    assert prompt.startswith(AGENT_ANSWER.prefix_text(**values))
+    assert "User 1" in AGENT_ANSWER.prefix_text(**values)
+    assert "ctx" not in AGENT_ANSWER.prefix_text(**values)
+    assert GENERAL_QUESTION.render(user_query="Why?").endswith("Question: Why?")
+
+
+def test_prefix_extension_is_only_sent_when_cached(monkeypatch):
+    model = SimpleNamespace(model_name="gemini-test")
+    prompt = "PREFIX\n\nQuery: q"
+
+    monkeypatch.setattr(model_helper, "with_context_cache", lambda m, p, prefix, key: (m, p))
+    assert model_helper.with_cached_prefix_extension(model, prompt, "PREFIX", "PREFIX + schedule", "key") == (model, prompt)
+
+    cached = SimpleNamespace(model_name="cached")
+    monkeypatch.setattr(model_helper, "with_context_cache",
+                        lambda m, p, prefix, key: (cached, p[len(prefix):].lstrip()))
+    assert model_helper.with_cached_prefix_extension(model, prompt, "PREFIX", "PREFIX + schedule", "key") == (cached, "Query: q")
+    assert model_helper.with_cached_prefix_extension(model, prompt, "PREFIX", "", "key") == (model, prompt)
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from core import rate_limiter
+from core.rate_limiter import RateLimiter, RateLimiterRegistry, RateLimitTimeout, parse_retry_after
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_requests_wait_for_the_bucket_to_refill(clock):
+    limiter = RateLimiter("test", requests_per_minute=60)
+    for _ in range(60):
+        assert limiter.acquire() == 0
+    assert limiter.acquire() == pytest.approx(1.0)
+    assert clock.slept == [pytest.approx(1.0)]
+    assert limiter.stats()["waited"] == 1
+
+
+def test_token_budget_and_usage_correction(clock):
+    limiter = RateLimiter("test", requests_per_minute=0, tokens_per_minute=600)
+    assert limiter.reserve(500) == 0
+    limiter.record_usage(500, 100)
+    assert limiter.peek_wait(500) == 0
+    limiter.record_usage(0, 500)
+    assert limiter.peek_wait(500) == pytest.approx(50.0)
+
+
+def test_wait_beyond_max_wait_raises_without_reserving(clock):
+    limiter = RateLimiter("test", requests_per_minute=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(max_wait=5)
+    clock.now += 60
+    assert limiter.acquire(max_wait=5) == 0
+
+
+def test_penalty_blocks_every_caller_of_the_key(clock):
+    limiter = RateLimiter("test", requests_per_minute=0)
+    limiter.penalize(7.5)
+    assert limiter.peek_wait() == pytest.approx(7.5)
+    assert limiter.acquire() == pytest.approx(7.5)
+    assert limiter.acquire() == 0
+
+
+def test_acquire_async_sleeps_on_the_loop(clock, monkeypatch):
+    slept = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=0)
+    limiter.penalize(2)
+    assert asyncio.run(limiter.acquire_async()) == pytest.approx(2)
+    assert slept == [pytest.approx(2)]
+
+
+def test_remaining_fraction(clock):
+    limiter = RateLimiter("test", requests_per_minute=10)
+    assert limiter.remaining_fraction() == 1.0
+    for _ in range(5):
+        limiter.acquire()
+    assert limiter.remaining_fraction() == pytest.approx(0.5)
+
+
+def test_registry_shares_one_limiter_per_key_and_hides_the_key():
+    registry = RateLimiterRegistry({"gemini": (60, 0)})
+    limiter = registry.get("gemini", "secret-key")
+    assert registry.get("gemini", "secret-key") is limiter
+    assert registry.get("gemini", "other-key") is not limiter
+    assert "secret-key" not in limiter.name
+
+    registry.configure("gemini", requests_per_minute=5)
+    assert limiter.requests_per_minute == 5
+    assert registry.get("gemini", "new-key").requests_per_minute == 5
+
+
+class ErrorWithHeaders(Exception):
+    def __init__(self, message, headers):
+        super().__init__(message)
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(ErrorWithHeaders("429", {"retry-after": "12"})) == 12.0
+    assert parse_retry_after(Exception("Quota exceeded. Please retry in 37.5s")) == 37.5
+    assert parse_retry_after(Exception("retry_delay { seconds: 21 }")) == 21.0
+    assert parse_retry_after(Exception("Internal error")) is None
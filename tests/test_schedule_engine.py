@@ -0,0 +1,107 @@
+from datetime import datetime
+
+from core.schedule_engine import (
+    DAILY,
+    busy_for_day,
+    days_from_query,
+    default_days,
+    find_common_free_time,
+    format_free_time_summary,
+    format_time,
+    merge_time_ranges,
+    parse_schedule_times,
+    schedule_busy_by_day
+)
+
+
+def test_parses_ranges_and_single_times():
+    assert parse_schedule_times("Focus 11:00-13:00; Break 14:30") == [(660, 780), (870, 900)]
+    assert parse_schedule_times("Meeting 2:00 PM to 3:30 PM") == [(840, 930)]
+
+
+def test_start_inherits_end_meridiem():
+    assert parse_schedule_times("Class 9:00-11:00 AM") == [(540, 660)]
+
+
+def test_range_past_midnight_is_folded_into_the_day():
+    assert parse_schedule_times("Night shift 22:00-02:00") == [(0, 120), (1320, 1440)]
+
+
+def test_invalid_times_are_ignored():
+    assert parse_schedule_times("Room 13:00 PM, version 1:75") == []
+    assert parse_schedule_times("") == []
+
+
+def test_merge_joins_overlapping_and_adjacent_ranges():
+    assert merge_time_ranges([(600, 660), (540, 600), (700, 720), (710, 730)]) == [(540, 660), (700, 730)]
+
+
+def test_common_free_time_of_several_users():
+    busy = [[(540, 600)], [(570, 660)], [(900, 960)]]
+    assert find_common_free_time(busy, day_start=480, day_end=1020) == [(480, 540), (660, 900), (960, 1020)]
+    assert find_common_free_time(busy, day_start=480, day_end=1020, min_duration=90) == [(660, 900)]
+
+
+def test_busy_by_day_keeps_daily_entries_apart():
+    schedules = {
+        "documents": ["Standup 09:30-10:00", "Monday 14:00-15:00 review", "Gym"],
+        "metadatas": [{}, {}, {"time": "18:00-19:00", "day": "friday"}]
+    }
+    busy_by_day = schedule_busy_by_day(schedules)
+    assert busy_by_day == {None: [(570, 600)], "Monday": [(840, 900)], "Friday": [(1080, 1140)]}
+    assert busy_for_day(busy_by_day, "Monday") == [(570, 600), (840, 900)]
+    assert busy_for_day(busy_by_day, DAILY) == [(570, 600)]
+
+
+def test_days_from_query():
+    monday = datetime(2026, 10, 12)
+    assert days_from_query("Are we free on Friday or Tuesday?") == ["Tuesday", "Friday"]
+    assert days_from_query("What about tomorrow?", today=monday) == ["Tuesday"]
+    assert days_from_query("Any time this weekend?") == ["Saturday", "Sunday"]
+    assert days_from_query("When are we free?") is None
+
+
+def test_default_days():
+    assert default_days({"a": {None: [(0, 60)]}}) == [DAILY]
+    assert len(default_days({"a": {None: []}, "b": {"Monday": [(0, 60)]}})) == 7
+
+
+def test_summary_formatting():
+    assert format_time(545) == "09:05"
+    assert format_free_time_summary({DAILY: [(480, 540)], "Monday": []}) == "Common free time: 08:00 - 09:00"
+    assert format_free_time_summary({"Monday": [(480, 540), (600, 660)]}, max_slots_per_day=1) == "Common free time: Monday 08:00 - 09:00"
+    assert format_free_time_summary({"Monday": []}) == "No common free time available"
+
+
+class FakeAgent:
+    def __init__(self, documents):
+        self.schedules = {"ids": [str(i) for i in range(len(documents))], "documents": documents, "metadatas": []}
+
+    def get_schedules_for_comparison(self):
+        return self.schedules
+
+    def query_other_agent_schedule(self, schedules):
+        return {"shared": len(schedules["ids"])}
+
+
+def test_orchestrator_computes_free_time_without_an_llm_call():
+    from agents.orchestrator import OrchestratorAgent
+
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.agents = {
+        "Agent 1": FakeAgent(["Work 09:00-12:00", "Gym 18:00-19:00"]),
+        "Agent 2": FakeAgent(["Lunch 12:00-13:00", "Class 14:00-17:00"]),
+        "Agent 3": FakeAgent([])
+    }
+    orchestrator._generate_text = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("LLM called"))
+
+    result = orchestrator.find_common_free_time("When are we all free?", response_mode="plain", day_start=480, day_end=1200)
+
+    assert result["common_free_time"][DAILY] == [
+        {"start": "08:00", "end": "09:00", "minutes": 60},
+        {"start": "13:00", "end": "14:00", "minutes": 60},
+        {"start": "17:00", "end": "18:00", "minutes": 60},
+        {"start": "19:00", "end": "20:00", "minutes": 60}
+    ]
+    assert result["aggregated_response"] == "Common free time: 08:00 - 09:00, 13:00 - 14:00, 17:00 - 18:00"
+    assert result["agent_analyses"]["Agent 3"]["analysis"] == "User 3 has no scheduled commitments"
@@ -0,0 +1,63 @@
+import pytest
+
+from agents import agent1, agent2
+
+
+class FakeVectorDatabase:
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.scans = 0
+
+    def get_all(self):
+        self.scans += 1
+        return {"ids": [str(i) for i in range(len(self.documents))], "documents": list(self.documents), "metadatas": []}
+
+    def delete(self, doc_id):
+        del self.documents[int(doc_id)]
+
+
+def make_agent(cls, documents):
+    agent = cls.__new__(cls)
+    agent.vector_db = FakeVectorDatabase(documents)
+    agent._schedule_block = None
+    agent.hedge_partner = None
+    agent.use_deepseek = False
+    return agent
+
+
+@pytest.fixture(params=[(agent1, agent1.Agent1, "User 1"), (agent2, agent2.Agent2, "User 2")])
+def agent(request, monkeypatch):
+    module, cls, user = request.param
+    monkeypatch.setattr(module, "GEMINI_CONTEXT_CACHE", True)
+    monkeypatch.setattr(module, "is_context_cacheable", lambda text: len(text) > 20)
+    agent = make_agent(cls, ["Standup 09:30-10:00", "Lunch 12:30-13:00"])
+    agent.module, agent.user = module, user
+    return agent
+
+
+def test_block_is_reused_between_queries(agent):
+    block = agent._full_schedule_block()
+    assert f"Complete schedule of {agent.user}" in block
+    assert agent._full_schedule_block() == block
+    assert agent.vector_db.scans == 1
+
+
+def test_small_schedule_is_not_rescanned(agent, monkeypatch):
+    monkeypatch.setattr(agent.module, "is_context_cacheable", lambda text: False)
+    assert agent._full_schedule_block() == ""
+    assert agent._full_schedule_block() == ""
+    assert agent.vector_db.scans == 1
+
+
+def test_own_write_rebuilds_block(agent):
+    assert "Standup" in agent._full_schedule_block()
+    agent.delete_schedule("0")
+    assert "Standup" not in agent._full_schedule_block()
+    assert agent.vector_db.scans == 2
+
+
+def test_external_write_is_picked_up_after_refresh_interval(agent, monkeypatch):
+    monkeypatch.setattr(agent.module, "GEMINI_SCHEDULE_PREFIX_REFRESH_SECONDS", 0)
+    agent._full_schedule_block()
+    agent.vector_db.documents.append("Dinner 19:00-20:00")
+    assert "Dinner 19:00-20:00" in agent._full_schedule_block()
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.singleflight import SingleFlight, AsyncSingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(1)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["waiting"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "collapsed": 4, "in_flight": 0, "waiting": 0}
+
+
+def test_leader_exception_is_raised_for_every_caller():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    # The failed call is forgotten, so the next caller runs a fresh one
+    assert flight.do("key", lambda: 2) == 2
+
+
+def test_async_callers_share_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["answer"] * 3
+    assert len(calls) == 1
+    assert flight.stats()["collapsed"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_does_not_fail_waiter():
+    flight = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == "answer"
+
+
+def test_call_is_cancelled_once_every_caller_is_cancelled():
+    flight = AsyncSingleFlight()
+    started = []
+    finished = []
+
+    async def fn():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "answer"
+
+    async def main():
+        callers = [asyncio.ensure_future(flight.do("key", fn)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        assert flight.stats()["in_flight"] == 0
+        # A new caller starts a fresh call instead of joining the cancelled one
+        result = await flight.do("key", fn)
+        await asyncio.sleep(0.06)
+        return result
+
+    assert asyncio.run(main()) == "answer"
+    assert len(started) == 2
+    assert len(finished) == 1
+
+
+def test_async_exception_is_shared():
+    flight = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,80 @@
+import functools
+import threading
+
+import pytest
+
+from agents import orchestrator as orchestrator_module
+from agents.orchestrator import OrchestratorAgent
+from core.async_runtime import run_async
+from core.bulkhead import Bulkhead
+
+
+class FakeAgent:
+    def __init__(self, release=None):
+        self.release = release
+        self.searches = 0
+        self.search_results = None
+
+    def search_schedule(self, user_query, deadline=None):
+        self.searches += 1
+        if self.release is not None:
+            self.release.wait(5)
+        return {"documents": [[f"result for {user_query}"]]}
+
+    async def query_schedule_async(self, user_query, deadline=None, search_results=None):
+        self.search_results = search_results
+        return {"response": "free after 5pm", "relevant_data": search_results}
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    monkeypatch.setattr(orchestrator_module, "SPECULATIVE_RETRIEVAL", True)
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.release = threading.Event()
+    orchestrator.agents = {"Agent 1": FakeAgent(), "Agent 2": FakeAgent(orchestrator.release)}
+    orchestrator.bulkheads = {name: Bulkhead(name, 2, 0) for name in orchestrator.agents}
+    orchestrator.conversation_history = []
+    orchestrator._keyword_matcher = orchestrator._build_keyword_matcher()
+    orchestrator._scan = functools.lru_cache(maxsize=16)(orchestrator._keyword_matcher.scan)
+    orchestrator._speculation_lock = threading.Lock()
+    orchestrator._speculation_stats = {"started": 0, "used": 0, "discarded": 0}
+    yield orchestrator
+    orchestrator.release.set()
+
+
+def test_only_agents_named_in_the_query_are_searched(orchestrator):
+    searches = orchestrator._start_speculative_searches("what is user 1 doing on monday?", [], None)
+    assert list(searches) == ["Agent 1"]
+    searches["Agent 1"].result(5)
+
+
+def test_routed_agents_get_their_search_and_the_rest_are_cancelled(orchestrator):
+    searches = orchestrator._start_speculative_searches("anything on monday?", [], None)
+    assert set(searches) == {"Agent 1", "Agent 2"}
+
+    routed = {"Agent 1": orchestrator.agents["Agent 1"]}
+    kept = orchestrator._settle_speculative_searches(searches, routed)
+    assert list(kept) == ["Agent 1"]
+    assert searches["Agent 2"].cancelled()
+
+    responses = run_async(orchestrator.query_agents_async("anything on monday?", routed, None, kept))
+    assert responses["Agent 1"]["status"] == "success"
+    assert orchestrator.agents["Agent 1"].search_results == {"documents": [["result for anything on monday?"]]}
+    assert orchestrator.get_speculation_stats() == {"started": 2, "used": 1, "discarded": 1}
+
+
+def test_saturated_agents_are_not_searched(orchestrator):
+    bulkhead = orchestrator.bulkheads["Agent 2"]
+    run_async(bulkhead.acquire())
+    run_async(bulkhead.acquire())
+    try:
+        searches = orchestrator._start_speculative_searches("anything?", [], None)
+        assert list(searches) == ["Agent 1"]
+    finally:
+        bulkhead.release()
+        bulkhead.release()
+
+
+def test_disabled(orchestrator, monkeypatch):
+    monkeypatch.setattr(orchestrator_module, "SPECULATIVE_RETRIEVAL", False)
+    assert orchestrator._start_speculative_searches("user 1?", [], None) == {}
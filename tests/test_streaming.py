@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import web_app
+from core import model_helper
+from core.llm_cache import LLMResponseCache
+
+
+class FakeOrchestrator:
+    def stream_query_all_agents(self, user_query, conversation_history, deadline=None):
+        yield "routing", {"query_type": "agents", "agents": ["Agent 1"]}
+        yield "agent", {"agent_name": "Agent 1", "status": "success", "response": "Free at 5"}
+        yield "token", {"text": "User 1 is "}
+        yield "token", {"text": "free at 5 PM"}
+        yield "done", {
+            "user_query": user_query,
+            "agent_responses": {"Agent 1": {"status": "success", "response": "Free at 5"}},
+            "aggregated_response": "User 1 is free at 5 PM"
+        }
+
+
+class FailingOrchestrator:
+    def stream_query_all_agents(self, user_query, conversation_history, deadline=None):
+        raise RuntimeError("agents unavailable")
+        yield
+
+
+def parse_events(body):
+    events = []
+    for message in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(web_app, "generate_dynamic_suggestions", lambda *args, **kwargs: ["Next?"])
+    return web_app.app.test_client()
+
+
+def test_stream_sends_progress_tokens_then_done(client, monkeypatch):
+    monkeypatch.setattr(web_app, "orchestrator", FakeOrchestrator())
+    response = client.post("/api/query/stream", json={"query": "When is User 1 free?", "type": "all"})
+
+    assert response.mimetype == "text/event-stream"
+    events = parse_events(response.get_data(as_text=True))
+    assert [event for event, _ in events] == ["routing", "agent", "token", "token", "done"]
+    assert "".join(data["text"] for event, data in events if event == "token") == "User 1 is free at 5 PM"
+    done = events[-1][1]
+    assert done["result"]["aggregated_response"] == "User 1 is free at 5 PM"
+    assert done["suggestions"] == ["Next?"]
+    assert done["communication_log"]
+
+
+def test_stream_reports_errors_as_an_event(client, monkeypatch):
+    monkeypatch.setattr(web_app, "orchestrator", FailingOrchestrator())
+    response = client.post("/api/query/stream", json={"query": "When is User 1 free?", "type": "all"})
+    assert parse_events(response.get_data(as_text=True)) == [("error", {"error": "agents unavailable"})]
+
+
+def test_stream_requires_a_query(client):
+    assert client.post("/api/query/stream", json={}).status_code == 400
+
+
+def test_streamed_answers_share_the_response_cache(monkeypatch):
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60)
+    monkeypatch.setattr(model_helper, "_llm_cache", cache)
+    model = model_helper.get_task_model("answer", "test-key")
+
+    first = list(model_helper.stream_content_with_retry(model, "What is on Monday?"))
+    second = list(model_helper.stream_content_with_retry(model, "What is on Monday?"))
+
+    assert "".join(second) == "".join(first)
+    assert cache.stats()["hits"] == 1
+    # The blocking call is served from what the stream stored
+    assert model_helper.generate_content_with_retry(model, "What is on Monday?").text == "".join(first)
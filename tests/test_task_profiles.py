@@ -0,0 +1,49 @@
+import pytest
+
+from core import model_helper
+from core.task_profiles import TASK_PROFILES, TaskProfile, configure_context_budgets, configure_task_tiers, get_task_profile
+
+
+def test_generation_config_per_provider():
+    route = get_task_profile("route")
+    assert route.tier == "fast"
+    assert route.gemini_generation_config() == {"max_output_tokens": 8, "temperature": 0.0, "stop_sequences": ["\n"]}
+    assert route.deepseek_params() == {"max_tokens": 8, "temperature": 0.0, "stop": ["\n"]}
+    # Thinking models count thoughts against the output cap, so quality tasks stay uncapped
+    assert "max_output_tokens" not in get_task_profile("answer").gemini_generation_config()
+
+
+def test_unknown_tasks_and_tiers_are_rejected():
+    with pytest.raises(ValueError):
+        get_task_profile("translate")
+    with pytest.raises(ValueError):
+        TaskProfile("route", "turbo")
+    with pytest.raises(ValueError):
+        configure_task_tiers("answer=turbo")
+    with pytest.raises(ValueError):
+        configure_context_budgets("answer=lots")
+
+
+def test_overrides(monkeypatch):
+    monkeypatch.setattr(TASK_PROFILES["answer"], "tier", "quality")
+    monkeypatch.setattr(TASK_PROFILES["route"], "tier", "fast")
+    monkeypatch.setattr(TASK_PROFILES["aggregate"], "context_tokens", 800)
+
+    configure_task_tiers("answer=fast, route=quality,")
+    configure_context_budgets("aggregate=0")
+    assert get_task_profile("answer").tier == "fast"
+    assert get_task_profile("route").tier == "quality"
+    assert get_task_profile("aggregate").context_tokens is None
+
+
+def test_deepseek_params_default_to_the_configured_temperature():
+    assert model_helper._deepseek_params() == {"temperature": model_helper.DEEPSEEK_TEMPERATURE}
+    assert model_helper._deepseek_params("suggest") == {"temperature": 0.7, "max_tokens": 120}
+
+
+def test_task_models_are_resolved_once_per_task_and_key(monkeypatch):
+    monkeypatch.setattr(model_helper, "_task_models", {})
+    first = model_helper.get_task_model("route", "key-a")
+    assert model_helper.get_task_model("route", "key-a") is first
+    assert model_helper.get_task_model("route", "key-b") is not first
+    assert first.task_params == get_task_profile("route").gemini_generation_config()
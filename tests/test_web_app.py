@@ -0,0 +1,21 @@
+import web_app
+
+
+def test_failed_agents_are_logged_as_errors_with_their_status():
+    result = {
+        "routing_decision": "all",
+        "agent_responses": {
+            "Agent 1": {"status": "success", "response": "Free after 5 PM"},
+            "Agent 2": {"status": "timeout", "error": "No answer within the request deadline"},
+            "Agent 3": {"status": "overloaded", "error": "Agent 3 is overloaded"}
+        },
+        "aggregated_response": "Both are free after 5 PM"
+    }
+    log = web_app.build_communication_log("When are we free?", "smart", result)
+    responses = {entry["from"]: entry for entry in log if entry["to"] == "orchestrator"}
+
+    assert responses["agent_1"]["type"] == "response"
+    assert responses["agent_2"]["type"] == "error"
+    assert responses["agent_2"]["status"] == "timeout"
+    assert responses["agent_3"]["type"] == "error"
+    assert responses["agent_3"]["status"] == "overloaded"
@@ -1,9 +1,25 @@
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 from agents import OrchestratorAgent, Agent1, Agent2
-from core.model_helper import get_gemini_model, get_response_text, generate_content_with_retry
-from core.config import GEMINI_API_KEY_ORCHESTRATOR
+from core.model_helper import (
+    get_task_model,
+    get_response_text,
+    generate_content_with_retry,
+    call_label,
+    get_llm_metrics,
+    get_llm_cache_stats,
+    get_single_flight_stats,
+    get_rate_limiter_stats,
+    get_hedge_stats,
+    get_circuit_breaker_stats,
+    get_cassette_stats,
+    get_key_pool_stats,
+    get_concurrency_stats
+)
+from core.config import GEMINI_API_KEY_ORCHESTRATOR, LLM_REQUEST_TIMEOUT_SECONDS
+from core.deadline import Deadline, deadline_scope
+from core.prompts import SUGGESTIONS
 import json
 import os
 from datetime import datetime
@@ -21,17 +37,18 @@ def init_agents():
     global orchestrator, agent1, agent2, suggestion_model
     try:
         orchestrator = OrchestratorAgent()
-        agent1 = Agent1()
-        agent2 = Agent2()
+        # Reuse the orchestrator's agents instead of building a second set
+        agent1 = orchestrator.agent1
+        agent2 = orchestrator.agent2
         # Initialize model for generating suggestions (use orchestrator key, fallback to main key)
         try:
             if GEMINI_API_KEY_ORCHESTRATOR and GEMINI_API_KEY_ORCHESTRATOR != "your_gemini_api_key_here":
-                suggestion_model = get_gemini_model(GEMINI_API_KEY_ORCHESTRATOR)
+                suggestion_model = get_task_model("suggest", GEMINI_API_KEY_ORCHESTRATOR)
             else:
                 # Fallback to main API key if orchestrator key not set
                 from core.config import GEMINI_API_KEY
                 if GEMINI_API_KEY and GEMINI_API_KEY != "your_gemini_api_key_here":
-                    suggestion_model = get_gemini_model(GEMINI_API_KEY)
+                    suggestion_model = get_task_model("suggest", GEMINI_API_KEY)
                 else:
                     suggestion_model = None
                     print("Warning: No valid API key for suggestions, will use default suggestions")
@@ -43,8 +60,8 @@ def init_agents():
         print(f"Error initializing agents: {e}")
         return False
 
-def generate_dynamic_suggestions(user_query, response_text, query_type, agent_responses):
-    """Generate dynamic follow-up suggestions using LLM based on user query and response"""
+def generate_dynamic_suggestions(user_query, response_text, query_type, agent_responses, deadline=None):
+    """Generate dynamic follow-up suggestions using LLM based on user query and response (defaults once the deadline is spent)"""
     global suggestion_model
     
     # Skip suggestions if model not available (non-critical feature)
@@ -68,13 +85,11 @@ def generate_dynamic_suggestions(user_query, response_text, query_type, agent_re
                         context_info += f"{agent_name} found no relevant schedules. "
         
         # Shorter, faster prompt for suggestions
-        prompt = f"""Query: "{user_query[:80]}"
-Response: "{response_text[:200]}"
-
-Generate 3 short follow-up questions (max 50 chars each) as JSON array: ["q1", "q2", "q3"]"""
+        prompt = SUGGESTIONS.render(user_query=user_query[:80], response_text=response_text[:200])
 
         try:
-            llm_response = generate_content_with_retry(suggestion_model, prompt, max_retries=1, base_delay=0.5)
+            with call_label("web.suggestions"), deadline_scope(deadline):
+                llm_response = generate_content_with_retry(suggestion_model, prompt, max_retries=1, base_delay=0.5)
         except Exception as api_error:
             # If API key issue, return defaults without failing the whole request
             error_msg = str(api_error)
@@ -209,6 +224,114 @@ def get_agents_data():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def build_communication_log(user_query, query_type, result):
+    """Build the orchestrator/agent communication log shown in the UI for a query result"""
+    communication_log = []
+    communication_log.append({
+        'timestamp': datetime.now().isoformat(),
+        'from': 'user',
+        'to': 'orchestrator',
+        'message': user_query,
+        'type': 'query'
+    })
+    
+    if query_type == 'common_time':
+        # Add agent-to-agent communication logs
+        communication_log.append({
+            'timestamp': datetime.now().isoformat(),
+            'from': 'orchestrator',
+            'to': 'all_agents',
+            'message': 'Requesting schedules for agent-to-agent communication',
+            'type': 'broadcast'
+        })
+        
+        # Add agent-to-agent communication
+        for agent_name in result.get('agent_schedules', {}).keys():
+            communication_log.append({
+                'timestamp': datetime.now().isoformat(),
+                'from': agent_name.lower().replace(' ', '_'),
+                'to': 'orchestrator',
+                'message': f'Shared {len(result["agent_schedules"][agent_name]["ids"])} schedules',
+                'type': 'response'
+            })
+        
+        # Add inter-agent communication
+        agent_list = list(result.get('agent_schedules', {}).keys())
+        for i, agent1 in enumerate(agent_list):
+            for j, agent2 in enumerate(agent_list):
+                if i != j:
+                    communication_log.append({
+                        'timestamp': datetime.now().isoformat(),
+                        'from': agent1.lower().replace(' ', '_'),
+                        'to': agent2.lower().replace(' ', '_'),
+                        'message': 'Requesting schedule comparison',
+                        'type': 'agent_to_agent'
+                    })
+        
+        # Add agent analyses
+        for agent_name, analysis in result.get('agent_analyses', {}).items():
+            communication_log.append({
+                'timestamp': datetime.now().isoformat(),
+                'from': agent_name.lower().replace(' ', '_'),
+                'to': 'orchestrator',
+                'message': analysis['analysis'][:200] if analysis['status'] == 'success' else f"Error: {analysis.get('error', 'Unknown')}",
+                'type': 'analysis'
+            })
+        
+    elif query_type == 'smart':
+        communication_log.append({
+            'timestamp': datetime.now().isoformat(),
+            'from': 'orchestrator',
+            'to': 'all_agents',
+            'message': f"Routing decision: {result.get('routing_decision', 'all')}",
+            'type': 'routing'
+        })
+    else:
+        # Check if this was a general question (no agent coordination)
+        if result.get('query_type') == 'general':
+            communication_log.append({
+                'timestamp': datetime.now().isoformat(),
+                'from': 'orchestrator',
+                'to': 'user',
+                'message': 'General question detected - answering directly',
+                'type': 'direct_response'
+            })
+        else:
+            communication_log.append({
+                'timestamp': datetime.now().isoformat(),
+                'from': 'orchestrator',
+                'to': 'all_agents',
+                'message': 'Broadcasting query to all agents',
+                'type': 'broadcast'
+            })
+    
+    # Add agent responses to log (for non-common_time queries)
+    if query_type != 'common_time':
+        for agent_name, response_data in result['agent_responses'].items():
+            communication_log.append({
+                'timestamp': datetime.now().isoformat(),
+                'from': agent_name.lower().replace(' ', '_'),
+                'to': 'orchestrator',
+                'message': response_data['response'][:200] if response_data['status'] == 'success' else f"Error: {response_data.get('error', 'Unknown')}",
+                'type': 'response' if response_data['status'] == 'success' else 'error',
+                'status': response_data['status']
+            })
+    
+    # Add aggregated response
+    communication_log.append({
+        'timestamp': datetime.now().isoformat(),
+        'from': 'orchestrator',
+        'to': 'user',
+        'message': result['aggregated_response'],
+        'type': 'aggregated_response'
+    })
+    
+    return communication_log
+
+def request_deadline():
+    """Time budget of one API request (None when LLM_REQUEST_TIMEOUT_SECONDS is 0)"""
+    return Deadline(LLM_REQUEST_TIMEOUT_SECONDS) if LLM_REQUEST_TIMEOUT_SECONDS > 0 else None
+
 @app.route('/api/query', methods=['POST'])
 def query_agents():
     """Query agents through orchestrator"""
@@ -217,121 +340,29 @@ def query_agents():
         user_query = data.get('query', '')
         query_type = data.get('type', 'all')  # 'all', 'smart', or 'common_time'
         conversation_history = data.get('conversation_history', [])  # Optional conversation context
+        response_mode = data.get('response_mode', 'llm')  # 'llm' or 'plain' (common_time only)
         
         if not user_query:
             return jsonify({'error': 'Query is required'}), 400
         
-        # Create communication log
-        communication_log = []
-        communication_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'from': 'user',
-            'to': 'orchestrator',
-            'message': user_query,
-            'type': 'query'
-        })
-        
         # Query through orchestrator
+        deadline = request_deadline()
         if query_type == 'common_time':
-            result = orchestrator.find_common_free_time(user_query)
-            
-            # Add agent-to-agent communication logs
-            communication_log.append({
-                'timestamp': datetime.now().isoformat(),
-                'from': 'orchestrator',
-                'to': 'all_agents',
-                'message': 'Requesting schedules for agent-to-agent communication',
-                'type': 'broadcast'
-            })
-            
-            # Add agent-to-agent communication
-            for agent_name in result.get('agent_schedules', {}).keys():
-                communication_log.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'from': agent_name.lower().replace(' ', '_'),
-                    'to': 'orchestrator',
-                    'message': f'Shared {len(result["agent_schedules"][agent_name]["ids"])} schedules',
-                    'type': 'response'
-                })
-            
-            # Add inter-agent communication
-            agent_list = list(result.get('agent_schedules', {}).keys())
-            for i, agent1 in enumerate(agent_list):
-                for j, agent2 in enumerate(agent_list):
-                    if i != j:
-                        communication_log.append({
-                            'timestamp': datetime.now().isoformat(),
-                            'from': agent1.lower().replace(' ', '_'),
-                            'to': agent2.lower().replace(' ', '_'),
-                            'message': 'Requesting schedule comparison',
-                            'type': 'agent_to_agent'
-                        })
-            
-            # Add agent analyses
-            for agent_name, analysis in result.get('agent_analyses', {}).items():
-                communication_log.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'from': agent_name.lower().replace(' ', '_'),
-                    'to': 'orchestrator',
-                    'message': analysis['analysis'][:200] if analysis['status'] == 'success' else f"Error: {analysis.get('error', 'Unknown')}",
-                    'type': 'analysis'
-                })
-            
+            result = orchestrator.find_common_free_time(user_query, response_mode=response_mode, deadline=deadline)
         elif query_type == 'smart':
-            result = orchestrator.smart_query(user_query, conversation_history)
-            communication_log.append({
-                'timestamp': datetime.now().isoformat(),
-                'from': 'orchestrator',
-                'to': 'all_agents',
-                'message': f"Routing decision: {result.get('routing_decision', 'all')}",
-                'type': 'routing'
-            })
+            result = orchestrator.smart_query(user_query, conversation_history, deadline=deadline)
         else:
-            result = orchestrator.query_all_agents(user_query, conversation_history)
-            # Check if this was a general question (no agent coordination)
-            if result.get('query_type') == 'general':
-                communication_log.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'from': 'orchestrator',
-                    'to': 'user',
-                    'message': 'General question detected - answering directly',
-                    'type': 'direct_response'
-                })
-            else:
-                communication_log.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'from': 'orchestrator',
-                    'to': 'all_agents',
-                    'message': 'Broadcasting query to all agents',
-                    'type': 'broadcast'
-                })
+            result = orchestrator.query_all_agents(user_query, conversation_history, deadline=deadline)
         
-        # Add agent responses to log (for non-common_time queries)
-        if query_type != 'common_time':
-            for agent_name, response_data in result['agent_responses'].items():
-                communication_log.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'from': agent_name.lower().replace(' ', '_'),
-                    'to': 'orchestrator',
-                    'message': response_data['response'][:200] if response_data['status'] == 'success' else f"Error: {response_data.get('error', 'Unknown')}",
-                    'type': 'response' if response_data['status'] == 'success' else 'error'
-                })
-        
-        # Add aggregated response
-        communication_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'from': 'orchestrator',
-            'to': 'user',
-            'message': result['aggregated_response'],
-            'type': 'aggregated_response'
-        })
+        communication_log = build_communication_log(user_query, query_type, result)
         
         # Generate dynamic suggestions based on query and response
         suggestions = generate_dynamic_suggestions(
             user_query,
             result.get('aggregated_response', ''),
             query_type,
-            result.get('agent_responses', {})
+            result.get('agent_responses', {}),
+            deadline
         )
         
         return jsonify({
@@ -342,6 +373,88 @@ def query_agents():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.route('/api/query/stream', methods=['POST'])
+def query_agents_stream():
+    """
+    Streaming variant of /api/query (Server-Sent Events)
+    
+    Emits "routing" and "agent" events as the orchestrator makes progress,
+    "token" events with chunks of the final answer, and a final "done" event
+    with the same payload /api/query returns. Errors are sent as an "error" event.
+    """
+    data = request.json or {}
+    user_query = data.get('query', '')
+    query_type = data.get('type', 'all')
+    conversation_history = data.get('conversation_history', [])
+    response_mode = data.get('response_mode', 'llm')
+    
+    if not user_query:
+        return jsonify({'error': 'Query is required'}), 400
+    deadline = request_deadline()
+    
+    def generate():
+        try:
+            if query_type == 'all':
+                result = None
+                for event, payload in orchestrator.stream_query_all_agents(user_query, conversation_history, deadline=deadline):
+                    if event == 'done':
+                        result = payload
+                    else:
+                        yield sse_event(event, payload)
+            elif query_type == 'common_time':
+                # Common time is computed deterministically; only the final answer is sent
+                result = orchestrator.find_common_free_time(user_query, response_mode=response_mode, deadline=deadline)
+                yield sse_event('token', {'text': result['aggregated_response']})
+            else:
+                result = orchestrator.smart_query(user_query, conversation_history, deadline=deadline)
+                yield sse_event('token', {'text': result['aggregated_response']})
+            
+            suggestions = generate_dynamic_suggestions(
+                user_query,
+                result.get('aggregated_response', ''),
+                query_type,
+                result.get('agent_responses', {}),
+                deadline
+            )
+            yield sse_event('done', {
+                'result': result,
+                'communication_log': build_communication_log(user_query, query_type, result),
+                'suggestions': suggestions
+            })
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Per-stage LLM token, latency and cost accounting plus cache/limiter/breaker stats"""
+    try:
+        return jsonify({
+            'llm_calls': get_llm_metrics(),
+            'cache': get_llm_cache_stats(),
+            'single_flight': get_single_flight_stats(),
+            'rate_limiters': get_rate_limiter_stats(),
+            'key_pools': get_key_pool_stats(),
+            'concurrency': get_concurrency_stats(),
+            'hedging': get_hedge_stats(),
+            'circuit_breakers': get_circuit_breaker_stats(),
+            'cassette': get_cassette_stats(),
+            'intent_router': orchestrator.get_router_stats() if orchestrator else {},
+            'speculative_retrieval': orchestrator.get_speculation_stats() if orchestrator else {},
+            'bulkheads': orchestrator.get_bulkhead_stats() if orchestrator else {}
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/agents/<agent_name>/query', methods=['POST'])
 def query_single_agent(agent_name):
     """Query a single agent directly"""
@@ -350,7 +463,7 @@ def query_single_agent(agent_name):
         query = data.get('query', '')
         
         if agent_name == 'agent1' and agent1:
-            result = agent1.query_schedule(query)
+            result = agent1.query_schedule(query, deadline=request_deadline())
             return jsonify({
                 'agent': 'Agent 1',
                 'query': query,
@@ -358,7 +471,7 @@ def query_single_agent(agent_name):
                 'relevant_data': result['relevant_data']
             })
         elif agent_name == 'agent2' and agent2:
-            result = agent2.query_schedule(query)
+            result = agent2.query_schedule(query, deadline=request_deadline())
             return jsonify({
                 'agent': 'Agent 2',
                 'query': query,